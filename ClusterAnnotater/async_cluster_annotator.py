@@ -0,0 +1,186 @@
+import asyncio
+import configparser
+import functools
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Any, Callable, Iterable, List, Optional, Dict, Iterator, Set
+
+from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.relation import Relation
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
+from RelationSource.abstract_relation_source import RelationSourceError, RelationSourceUnavailableError
+from RelationSource.async_sparql_client import AsyncSparqlClient, SparqlUnavailableError
+from RelationSource.bisecting_retry import BisectingRetry, BisectionStatistics, OutageDetector
+from RelationSource.caching_wikidata_relation_source import CachingWikidataRelationSource
+from resources import constant
+from result_sink.abstract_result_sink import AbstractResultSink
+
+
+class AsyncClusterAnnotator:
+    CLUSTERS_IN_FLIGHT_PER_REQUEST = 2
+    CACHE_WORKERS = 4
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster],
+                 relation_cache: Optional[AbstractRelationCache] = None,
+                 result_sink: Optional[AbstractResultSink] = None,
+                 endpoint_config: Path = ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT):
+        self._linkings: EntityLinkings = linkings
+        self._clusters: Iterable[Cluster] = clusters
+        self._result_sink: Optional[AbstractResultSink] = result_sink
+        self._relation_cache: AbstractRelationCache = relation_cache or WriteBehindRelationCache(
+            SqliteRelationCache())
+        self._endpoint_configuration: configparser.ConfigParser = configparser.ConfigParser()
+        self._endpoint_configuration.read(str(endpoint_config))
+        self._chunk_size: int = CachingWikidataRelationSource.DEFAULT_CHUNK_SIZE
+        # the relation cache blocks, thus it is accessed from these threads instead of the event loop
+        self._cache_executor: Optional[ThreadPoolExecutor] = None
+        self._outage_detector: OutageDetector = OutageDetector()
+
+    def run(self) -> Iterable[RelationMetrics]:
+        try:
+            return asyncio.run(self._annotate_clusters())
+        finally:
+            self._relation_cache.flush()
+
+    async def _annotate_clusters(self) -> List[RelationMetrics]:
+        concurrent_requests: int = self._endpoint_configuration["LIMITING"].getint("concurrent_requests")
+        client: AsyncSparqlClient = AsyncSparqlClient(self._endpoint_configuration["REMOTE"]["url"])
+        semaphore: asyncio.Semaphore = asyncio.Semaphore(concurrent_requests)
+        clusters: Iterator[Cluster] = iter(self._clusters)
+        results: List[RelationMetrics] = []
+        self._cache_executor = ThreadPoolExecutor(AsyncClusterAnnotator.CACHE_WORKERS, thread_name_prefix="cache")
+
+        try:
+            await asyncio.gather(*(self._consume_clusters(clusters, results, client, semaphore) for _ in
+                                   range(concurrent_requests * AsyncClusterAnnotator.CLUSTERS_IN_FLIGHT_PER_REQUEST)))
+        finally:
+            await client.close()
+            self._cache_executor.shutdown()
+
+        return results
+
+    async def _consume_clusters(self, clusters: Iterator[Cluster], results: List[RelationMetrics],
+                                client: AsyncSparqlClient, semaphore: asyncio.Semaphore) -> None:
+        # all consumers share one iterator, which bounds the number of clusters in flight
+        for cluster in clusters:
+            metrics: RelationMetrics = await self._annotate_cluster(cluster, client, semaphore)
+
+            if self._result_sink is not None:
+                self._result_sink.persist(metrics)
+            else:
+                results.append(metrics)
+
+    async def _annotate_cluster(self, cluster: Cluster, client: AsyncSparqlClient,
+                                semaphore: asyncio.Semaphore) -> RelationMetrics:
+        metrics: RelationMetrics = RelationMetrics(cluster)
+        statistics: BisectionStatistics = BisectionStatistics()
+        chunks: List[List[str]] = [cluster.entities[index:index + self._chunk_size]
+                                   for index in range(0, len(cluster.entities), self._chunk_size)]
+
+        logging.info(f"Start analyzing cluster #{cluster.id}")
+        for relations in await asyncio.gather(*(self._relations_for(chunk, client, semaphore, statistics)
+                                                for chunk in chunks)):
+            metrics.add_relations(relations)
+
+        logging.info(f"[CLUSTER-{cluster.id}] {statistics}")
+        return metrics
+
+    async def _relations_for(self, embedding_tags: List[str], client: AsyncSparqlClient,
+                             semaphore: asyncio.Semaphore, statistics: BisectionStatistics) -> List[Relation]:
+        entities: List[str] = [self._linkings[tag] for tag in embedding_tags if tag in self._linkings]
+        cached_relations: Dict[str, List[Relation]] = await self._access_cache(self._relation_cache.relations_for,
+                                                                               entities)
+        relations: List[Relation] = [relation for entity in entities for relation in cached_relations.get(entity, [])]
+        uncached_entities: Set[str] = set(entities) - cached_relations.keys()
+        uncached_entities -= await self._access_cache(self._relation_cache.known_empty, uncached_entities)
+        uncached_entities -= await self._access_cache(self._relation_cache.quarantined, uncached_entities)
+
+        if len(uncached_entities) > 0:
+            relations.extend(await self._retrieve_with_bisection(list(uncached_entities), client, semaphore,
+                                                                 statistics))
+        return relations
+
+    async def _retrieve_with_bisection(self, entities: List[str], client: AsyncSparqlClient,
+                                       semaphore: asyncio.Semaphore, statistics: BisectionStatistics) -> List[Relation]:
+        try:
+            relations: List[Relation] = await self._bisect(entities, client, semaphore, statistics)
+        except RelationSourceUnavailableError as error:
+            statistics.skipped += len(entities)
+            self._outage_detector.record_unavailable(error)
+            logging.warning(f"Skipping {len(entities)} entities, the source is unavailable: {error}")
+            return []
+
+        self._outage_detector.record_success()
+        return relations
+
+    async def _bisect(self, entities: List[str], client: AsyncSparqlClient, semaphore: asyncio.Semaphore,
+                      statistics: BisectionStatistics) -> List[Relation]:
+        # same strategy as BisectingRetry, but both halves of a failed chunk are retrieved concurrently
+        failed_attempts: int = 0
+        while True:
+            try:
+                remote_relations: List[Relation] = await self._retrieve_relations_from_remote(entities, client,
+                                                                                              semaphore)
+            except RelationSourceUnavailableError as error:
+                logging.info(str(error))
+                failed_attempts += 1
+                if failed_attempts >= BisectingRetry.MAX_NUMBER_OF_RETRIES:
+                    raise
+                continue
+            except RelationSourceError as error:
+                logging.info(str(error))
+                failed_attempts += 1
+                if len(entities) > 1 or failed_attempts >= BisectingRetry.MAX_NUMBER_OF_RETRIES:
+                    break
+                continue
+
+            statistics.succeeded += 1
+            return remote_relations
+
+        if len(entities) > 1:
+            statistics.splits += 1
+            middle: int = len(entities) // 2
+            halves: List[List[Relation]] = await asyncio.gather(
+                self._bisect(entities[:middle], client, semaphore, statistics),
+                self._bisect(entities[middle:], client, semaphore, statistics))
+            return halves[0] + halves[1]
+
+        logging.info(f"Quarantining entity {entities[0]} which repeatedly failed")
+        await self._access_cache(self._relation_cache.add_quarantined, entities)
+        statistics.dropped += 1
+        return []
+
+    async def _retrieve_relations_from_remote(self, entities: List[str], client: AsyncSparqlClient,
+                                              semaphore: asyncio.Semaphore) -> List[Relation]:
+        query: str = constant.named_entity_relations_sparql_query(entities)
+
+        try:
+            async with semaphore:
+                records: List[Dict[str, str]] = await client.query(query)
+        except asyncio.TimeoutError as error:
+            # the query itself took too long, smaller queries may succeed
+            raise RelationSourceError(f"Timeout while retrieving relations for {len(entities)} entities") from error
+        except (SparqlUnavailableError, OSError, asyncio.IncompleteReadError) as error:
+            raise RelationSourceUnavailableError(
+                f"Endpoint unavailable while retrieving relations for {len(entities)} entities: {error}") from error
+        except Exception as error:
+            raise RelationSourceError(
+                f"Error while retrieving relations for {len(entities)} entities: {error}") from error
+
+        relations: List[Relation] = [Relation.from_wikidata_record(record) for record in records]
+        await self._access_cache(self._add_to_cache, entities, relations)
+        return relations
+
+    def _add_to_cache(self, entities: List[str], relations: List[Relation]) -> None:
+        self._relation_cache.add(relations)
+        self._relation_cache.add_empty(set(entities) - set(relation.source for relation in relations))
+
+    async def _access_cache(self, function: Callable[..., Any], *args: Any) -> Any:
+        return await asyncio.get_running_loop().run_in_executor(self._cache_executor,
+                                                                functools.partial(function, *args))
@@ -1,14 +1,27 @@
+import logging
 import os
 import queue
+import threading
 from pathlib import Path
-from typing import Iterable, List, Dict
+from typing import Iterable, List, Dict, Optional
 
 from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_scheduler import ClusterScheduler, WorkItem
 from ClusterAnnotater.cluster_worker import ClusterWorker
+from ClusterAnnotater.entity_chunk_worker import EntityChunkWorker
+from ClusterAnnotater.entity_plan import EntityPlan
 from EntityLinking.entity_linkings import EntityLinkings
+from Relation.cluster_aggregation_state import ClusterAggregationState
 from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
 from RelationSource.abstract_relation_source import AbstractRelationSource
 from RelationSource.caching_wikidata_relation_source import CachingWikidataRelationSource
+from RelationSource.local_relation_source import LocalRelationSource
+from RelationSource.request_controller import RequestController
+from RelationSource.sparql_session import SparqlSession
+from result_sink.abstract_result_sink import AbstractResultSink
 from wikidata_endpoint import WikidataEndpoint, WikidataEndpointConfiguration
 
 
@@ -16,46 +29,135 @@ class ClusterAnnotator:
     DEFAULT_CONFIG_WIKIDATA_ENDPOINT = Path(os.path.dirname(os.path.abspath(__file__)), "..", "resources",
                                             "wikidata_endpoint_config.ini")
 
-    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster], workers: int):
+    MAX_NUMBER_OF_QUEUED_CLUSTERS_PER_WORKER = 2
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster], workers: int,
+                 relation_cache: Optional[AbstractRelationCache] = None, deduplicate_entities: bool = False,
+                 result_sink: Optional[AbstractResultSink] = None, offline: bool = False,
+                 request_controller: Optional[RequestController] = None,
+                 endpoint_config: Path = DEFAULT_CONFIG_WIKIDATA_ENDPOINT, stream_responses: bool = False,
+                 schedule_clusters: bool = False,
+                 previous_states: Optional[Dict[int, ClusterAggregationState]] = None):
         self._linkings: EntityLinkings = linkings
         self._clusters: Iterable[Cluster] = clusters
-        self._wikidata_endpoint = ClusterAnnotator._create_wikidata_endpoint()
+        self._wikidata_endpoint: Optional[WikidataEndpoint] = None if offline else \
+            ClusterAnnotator.create_wikidata_endpoint(endpoint_config)
+        # one controller per endpoint, so that all workers share what it learned about the endpoint
+        self._request_controller: Optional[RequestController] = None if offline else \
+            request_controller or ClusterAnnotator.create_request_controller(self._wikidata_endpoint)
+        self._sparql_session: Optional[SparqlSession] = SparqlSession.from_config(endpoint_config) \
+            if stream_responses and not offline else None
+        self._relation_cache: AbstractRelationCache = relation_cache or WriteBehindRelationCache(
+            SqliteRelationCache())
         self._relation_sources: List[AbstractRelationSource] = []
-        self._working_queue: queue.Queue[Cluster] = queue.Queue()
-        self._workers: List[ClusterWorker] = []
+        self._result_sink: Optional[AbstractResultSink] = result_sink
+        self._number_of_workers: int = workers
+        # scheduling needs all clusters up front, thus it is not applicable to streamed clusters
+        self._schedule_clusters: bool = schedule_clusters
+        self._working_queue: queue.Queue[Optional[WorkItem]] = queue.Queue(
+            maxsize=workers * ClusterAnnotator.MAX_NUMBER_OF_QUEUED_CLUSTERS_PER_WORKER)
+        self._feeder: Optional[threading.Thread] = None
+        self._feeder_error: Optional[Exception] = None
+        self._workers: List[threading.Thread] = []
         self._annotated_clusters: Dict[Cluster, RelationMetrics] = {}
+        self._entity_plan: Optional[EntityPlan] = None
+        # aggregation states of a previous run, only the changes since then are annotated
+        self._previous_states: Optional[Dict[int, ClusterAggregationState]] = previous_states
 
-        self._fill_working_queue()
-        self._create_workers(workers)
+        if deduplicate_entities or previous_states is not None:
+            self._plan_entities()
+            self._create_entity_chunk_workers(workers)
+        else:
+            self._feeder = threading.Thread(target=self._fill_working_queue, name="feeder", daemon=True)
+            self._create_workers(workers)
 
     @staticmethod
-    def _create_wikidata_endpoint() -> WikidataEndpoint:
-        config: WikidataEndpointConfiguration = WikidataEndpointConfiguration(
-            ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT)
+    def create_wikidata_endpoint(endpoint_config: Path) -> WikidataEndpoint:
+        config: WikidataEndpointConfiguration = WikidataEndpointConfiguration(endpoint_config)
         return WikidataEndpoint(config)
 
+    @staticmethod
+    def create_request_controller(wikidata_endpoint: WikidataEndpoint, processes: int = 1) -> RequestController:
+        # processes annotating concurrently split the endpoint's limit, so that they stay within it together
+        return RequestController(max(1, wikidata_endpoint.config().concurrent_requests() // processes),
+                                 CachingWikidataRelationSource.DEFAULT_CHUNK_SIZE)
+
     def _fill_working_queue(self) -> None:
-        for cluster in self._clusters:
-            self._working_queue.put_nowait(cluster)
+        try:
+            if self._schedule_clusters:
+                work_items: Iterable[WorkItem] = ClusterScheduler(self._linkings, self._clusters,
+                                                                  self._number_of_workers,
+                                                                  self._relation_cache).work_items()
+            else:
+                work_items: Iterable[WorkItem] = (WorkItem.whole(cluster) for cluster in self._clusters)
+
+            for work_item in work_items:
+                self._working_queue.put(work_item)
+        except Exception as error:
+            self._feeder_error = error
+        finally:
+            for _ in self._workers:
+                self._working_queue.put(None)
 
     def _create_workers(self, workers: int) -> None:
         for i in range(workers):
-            self._workers.append(ClusterWorker(i, self._working_queue, self._create_relation_source()))
+            self._workers.append(ClusterWorker(i, self._working_queue, self._create_relation_source(),
+                                               self._result_sink))
+
+    def _plan_entities(self) -> None:
+        self._entity_plan = EntityPlan(self._linkings, self._clusters, self._previous_states)
+        logging.info(f"Planned {len(self._entity_plan)} distinct entities across "
+                     f"{self._entity_plan.changed_clusters} of {len(self._entity_plan.metrics)} clusters")
+
+    def _create_entity_chunk_workers(self, workers: int) -> None:
+        for i in range(workers):
+            self._workers.append(EntityChunkWorker(i, self._entity_plan, self._create_relation_source()))
 
     def _create_relation_source(self) -> AbstractRelationSource:
-        source: CachingWikidataRelationSource = CachingWikidataRelationSource(self._linkings, self._wikidata_endpoint)
+        if self._wikidata_endpoint is None:
+            source: AbstractRelationSource = LocalRelationSource(self._linkings, self._relation_cache)
+        else:
+            source: AbstractRelationSource = CachingWikidataRelationSource(self._linkings, self._wikidata_endpoint,
+                                                                           self._relation_cache,
+                                                                           self._request_controller,
+                                                                           self._sparql_session)
         self._relation_sources.append(source)
         return source
 
     def run(self) -> Iterable[RelationMetrics]:
-        for worker in self._workers:
-            worker.start()
+        try:
+            if self._feeder is not None:
+                self._feeder.start()
 
-        for worker in self._workers:
-            worker.join()
+            for worker in self._workers:
+                worker.start()
+
+            for worker in self._workers:
+                worker.join()
+
+            if self._feeder_error is not None:
+                raise self._feeder_error
+            for worker in self._workers:
+                if worker.error is not None:
+                    raise worker.error
+        finally:
+            self._relation_cache.flush()
+            if self._sparql_session is not None:
+                self._sparql_session.close()
+            if self._request_controller is not None:
+                logging.info(f"Request controller: {self._request_controller.state()}")
+
+        if self._entity_plan is not None and self._result_sink is not None:
+            for metrics in self._entity_plan.metrics:
+                self._result_sink.persist(metrics)
 
         return self._collect_results()
 
     def _collect_results(self) -> Iterable[RelationMetrics]:
+        if self._entity_plan is not None:
+            if self._result_sink is None:
+                yield from self._entity_plan.metrics
+            return
+
         for worker in self._workers:
             yield from worker.result
@@ -0,0 +1,113 @@
+import logging
+import math
+import threading
+from typing import Dict, Iterable, List, Optional, Set
+
+from Cluster.cluster import Cluster
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+
+
+class _SplitCluster:
+
+    def __init__(self, cluster: Cluster, parts: int):
+        self._lock: threading.Lock = threading.Lock()
+        self._cluster: Cluster = cluster
+        self._parts: int = parts
+        self._completed_parts: Dict[int, RelationMetrics] = {}
+
+    def complete(self, part_index: int, metrics: RelationMetrics) -> Optional[RelationMetrics]:
+        with self._lock:
+            self._completed_parts[part_index] = metrics
+            if len(self._completed_parts) < self._parts:
+                return None
+
+        # parts are merged in their original order, so ties between relations are broken as for the whole cluster
+        cluster_metrics: RelationMetrics = RelationMetrics(self._cluster)
+        for index in range(self._parts):
+            cluster_metrics.merge(self._completed_parts.pop(index))
+        return cluster_metrics
+
+
+class WorkItem:
+
+    def __init__(self, cluster: Cluster, entities: List[str], cost: float = 0.0,
+                 split_cluster: Optional[_SplitCluster] = None, part_index: int = 0):
+        self.cluster: Cluster = cluster
+        self.entities: List[str] = entities
+        self.cost: float = cost
+        self._split_cluster: Optional[_SplitCluster] = split_cluster
+        self._part_index: int = part_index
+
+    @staticmethod
+    def whole(cluster: Cluster, cost: float = 0.0) -> "WorkItem":
+        return WorkItem(cluster, cluster.entities, cost)
+
+    def complete(self, metrics: RelationMetrics) -> Optional[RelationMetrics]:
+        # the metrics of a split cluster are only available once its last part is completed
+        if self._split_cluster is None:
+            return metrics
+
+        return self._split_cluster.complete(self._part_index, metrics)
+
+
+class ClusterScheduler:
+    CACHE_HIT_COST = 1.0
+    # a remote request costs more than a cache lookup by orders of magnitude
+    CACHE_MISS_COST = 20.0
+    MIN_ENTITIES_PER_WORK_ITEM = 500
+    WORK_ITEMS_PER_WORKER = 2
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster], workers: int,
+                 relation_cache: Optional[AbstractRelationCache] = None):
+        self._linkings: EntityLinkings = linkings
+        self._clusters: List[Cluster] = list(clusters)
+        self._workers: int = workers
+        self._relation_cache: Optional[AbstractRelationCache] = relation_cache
+
+    def work_items(self) -> List[WorkItem]:
+        costs: List[float] = self._estimate_costs()
+        # no work item should take longer than a fraction of what every worker has to do
+        max_cost: float = sum(costs) / (self._workers * ClusterScheduler.WORK_ITEMS_PER_WORKER)
+        work_items: List[WorkItem] = []
+
+        for cluster, cost in zip(self._clusters, costs):
+            parts: int = min(self._workers, math.ceil(cost / max_cost) if max_cost > 0 else 1,
+                             max(1, len(cluster.entities) // ClusterScheduler.MIN_ENTITIES_PER_WORK_ITEM))
+            if parts < 2:
+                work_items.append(WorkItem.whole(cluster, cost))
+                continue
+
+            part_starts: range = range(0, len(cluster.entities), math.ceil(len(cluster.entities) / parts))
+            split_cluster: _SplitCluster = _SplitCluster(cluster, len(part_starts))
+            for part_index, index in enumerate(part_starts):
+                entities: List[str] = cluster.entities[index:index + part_starts.step]
+                work_items.append(WorkItem(cluster, entities, cost * len(entities) / len(cluster.entities),
+                                           split_cluster, part_index))
+
+        # longest processing time first, the cheap items fill the gaps at the end
+        work_items.sort(key=lambda work_item: work_item.cost, reverse=True)
+        logging.info(f"Scheduled {len(self._clusters)} clusters as {len(work_items)} work items")
+        return work_items
+
+    def ordered_clusters(self) -> List[Cluster]:
+        costs: List[float] = self._estimate_costs()
+        return [cluster for _, cluster in sorted(zip(costs, self._clusters), key=lambda pair: pair[0], reverse=True)]
+
+    def _estimate_costs(self) -> List[float]:
+        linked_entities: List[List[str]] = [[self._linkings[tag] for tag in cluster.entities if tag in self._linkings]
+                                            for cluster in self._clusters]
+        known_entities: Set[str] = set()
+        if self._relation_cache is not None:
+            distinct_entities: Set[str] = set(entity for entities in linked_entities for entity in entities)
+            known_entities = self._relation_cache.cached(distinct_entities) | \
+                self._relation_cache.known_empty(distinct_entities) | \
+                self._relation_cache.quarantined(distinct_entities)
+
+        costs: List[float] = []
+        for entities in linked_entities:
+            hits: int = sum(1 for entity in entities if entity in known_entities)
+            costs.append(hits * ClusterScheduler.CACHE_HIT_COST +
+                         (len(entities) - hits) * ClusterScheduler.CACHE_MISS_COST)
+        return costs
@@ -1,63 +1,90 @@
 import logging
 import queue
 import threading
-from typing import List
+from typing import List, Optional
 
 from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_scheduler import WorkItem
 from Relation.relation_metrics import RelationMetrics
 from RelationSource.abstract_relation_source import AbstractRelationSource
+from RelationSource.bisecting_retry import BisectingRetry, OutageDetector
+from result_sink.abstract_result_sink import AbstractResultSink
+from util.metrics import metrics
 
 
 class ClusterWorker(threading.Thread):
-    MAX_NUMBER_OF_RETRIES = 3
 
-    def __init__(self, id_: int, working_queue: queue.Queue, relation_source: AbstractRelationSource):
+    def __init__(self, id_: int, working_queue: queue.Queue, relation_source: AbstractRelationSource,
+                 result_sink: Optional[AbstractResultSink] = None):
         super(ClusterWorker, self).__init__(name=str(id_))
         self._working_queue: queue.Queue = working_queue
         self._relation_source: AbstractRelationSource = relation_source
+        self._result_sink: Optional[AbstractResultSink] = result_sink
         self._results: List[RelationMetrics] = []
+        self._outage_detector: OutageDetector = OutageDetector()
+        self.error: Optional[Exception] = None
 
     def run(self) -> None:
-        while self._analyze_cluster():
-            pass
+        try:
+            while self._analyze_cluster():
+                pass
+        except Exception as error:
+            # e.g. the endpoint became unavailable, the annotator raises the error once all workers stopped
+            logging.exception(f"Worker {self.name} failed")
+            self.error = error
 
     def _analyze_cluster(self) -> bool:
-        try:
-            cluster: Cluster = self._working_queue.get_nowait()
-            logging.info(f"Start analyzing cluster #{cluster.id}")
-            self._analyze_entities(cluster)
-            return True
-        except queue.Empty:
+        work_item: Optional[WorkItem] = self._working_queue.get()
+        if work_item is None:
+            # no more clusters will be enqueued
             return False
 
-    def _analyze_entities(self, cluster: Cluster) -> None:
-        index = 0
-        error_counter = 0
-        metrics = RelationMetrics(cluster)
+        logging.info(f"Start analyzing cluster #{work_item.cluster.id}")
+        self._analyze_entities(work_item)
+        return True
 
-        while index < len(cluster.entities):
-            self._chunk_size = min(len(cluster.entities), self._relation_source.chunk_size())
-            chunk = cluster.entities[index:index + self._chunk_size]
+    def _analyze_entities(self, work_item: WorkItem) -> None:
+        index = 0
+        cluster = work_item.cluster
+        entities = work_item.entities
+        cluster_metrics = RelationMetrics(cluster)
+        retry = BisectingRetry(lambda chunk: [self._aggregate_chunk(cluster, chunk)], self._relation_source.quarantine,
+                               self._relation_source.retry_scope, self._outage_detector)
 
-            logging.info(f"[CLUSTER-{cluster.id}] Getting relation for batch [{index},{index + len(chunk)}]")
-            relations = self._relation_source.relations_for(chunk)
+        while index < len(entities):
+            self._chunk_size = min(len(entities), self._relation_source.chunk_size())
+            chunk = entities[index:index + self._chunk_size]
 
-            if len(relations) > 0:
-                # request succeeded
-                error_counter = 0
-                index += len(chunk)
-                for relation in relations:
-                    metrics.add_relation(relation)
+            logging.debug(f"[CLUSTER-{cluster.id}] Getting relation for batch [{index},{index + len(chunk)}]")
+            # a bisected chunk yields the metrics of each of its parts
+            parts_metrics = retry.relations_for(chunk)
+            with metrics.timer("aggregation_seconds"):
+                for part_metrics in parts_metrics:
+                    cluster_metrics.merge(part_metrics)
+            index += len(chunk)
 
-            if len(relations) == 0:
-                # No relation has been fetched from cache AND remote source due to unsuccessful linking or remote error
-                error_counter += 1
+        logging.info(f"[CLUSTER-{cluster.id}] {retry.statistics}")
+        metrics.increment("chunk_splits_total", retry.statistics.splits)
+        metrics.increment("entities_dropped_total", retry.statistics.dropped)
+        metrics.increment("entities_skipped_total", retry.statistics.skipped)
+        with metrics.timer("aggregation_seconds"):
+            cluster_metrics = work_item.complete(cluster_metrics)
+        if cluster_metrics is None:
+            # other parts of the cluster are still being analyzed
+            return
 
-            if error_counter == ClusterWorker.MAX_NUMBER_OF_RETRIES:
-                error_counter = 0
-                index += self._chunk_size
+        metrics.increment("clusters_annotated_total")
+        with metrics.timer("output_seconds"):
+            if self._result_sink is not None:
+                self._result_sink.persist(cluster_metrics)
+            else:
+                self._results.append(cluster_metrics)
 
-        self._results.append(metrics)
+    def _aggregate_chunk(self, cluster: Cluster, chunk: List[str]) -> RelationMetrics:
+        # every attempt aggregates into its own metrics, which are only merged once the chunk succeeded
+        chunk_metrics = RelationMetrics(cluster)
+        self._relation_source.aggregate_relations_for(chunk, chunk_metrics)
+        return chunk_metrics
 
     @property
     def result(self) -> List[RelationMetrics]:
@@ -0,0 +1,38 @@
+import logging
+import threading
+from typing import List, Optional
+
+from ClusterAnnotater.entity_plan import EntityPlan
+from RelationSource.abstract_relation_source import AbstractRelationSource
+from RelationSource.bisecting_retry import BisectingRetry
+
+
+class EntityChunkWorker(threading.Thread):
+
+    def __init__(self, id_: int, entity_plan: EntityPlan, relation_source: AbstractRelationSource):
+        super(EntityChunkWorker, self).__init__(name=str(id_))
+        self._entity_plan: EntityPlan = entity_plan
+        self._relation_source: AbstractRelationSource = relation_source
+        self._retry: BisectingRetry = BisectingRetry(relation_source.relations_for_knowledgebase_ids,
+                                                     relation_source.quarantine_knowledgebase_ids,
+                                                     relation_source.retry_scope)
+        self.error: Optional[Exception] = None
+
+    def run(self) -> None:
+        try:
+            while self._analyze_chunk():
+                pass
+        except Exception as error:
+            logging.exception(f"Worker {self.name} failed")
+            self.error = error
+
+        logging.info(str(self._retry.statistics))
+
+    def _analyze_chunk(self) -> bool:
+        chunk: List[str] = self._entity_plan.next_chunk(self._relation_source.chunk_size())
+        if len(chunk) < 1:
+            return False
+
+        logging.info(f"Getting relations for {len(chunk)} planned entities")
+        self._entity_plan.distribute(self._retry.relations_for(chunk))
+        return True
@@ -0,0 +1,122 @@
+import threading
+from collections import Counter
+from typing import Iterable, List, Dict, Optional
+
+from Cluster.cluster import Cluster
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.cluster_aggregation_state import ClusterAggregationState
+from Relation.relation import Relation
+from Relation.relation_metrics import RelationMetrics
+
+
+class EntityPlan:
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster],
+                 previous_states: Optional[Dict[int, ClusterAggregationState]] = None):
+        self._metrics: List[RelationMetrics] = []
+        self._subscribers: Dict[str, List[RelationMetrics]] = {}
+        # the relations of every entity are kept per cluster, so that the entity can be removed in the next run
+        self._track_contributions: bool = previous_states is not None
+        self._next_index: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self.changed_clusters: int = 0
+
+        for cluster in clusters:
+            knowledgebase_ids: List[str] = [linkings[tag] for tag in cluster.entities if tag in linkings]
+            previous_state: Optional[ClusterAggregationState] = None if previous_states is None else \
+                previous_states.get(cluster.id)
+
+            if previous_state is None:
+                metrics: RelationMetrics = RelationMetrics(cluster)
+                if self._track_contributions:
+                    metrics.track_contributions()
+                EntityPlan._subscribe(self._subscribers, knowledgebase_ids, metrics)
+                self.changed_clusters += 1
+            else:
+                # only the difference to the membership of the previous run is aggregated
+                metrics: RelationMetrics = previous_state.restore(cluster)
+                if EntityPlan._apply_difference(self._subscribers, metrics, Counter(previous_state.entities),
+                                                Counter(knowledgebase_ids)):
+                    self.changed_clusters += 1
+
+            self._metrics.append(metrics)
+
+        self._knowledgebase_ids: List[str] = list(self._subscribers)
+
+    @staticmethod
+    def _apply_difference(subscribers: Dict[str, List[RelationMetrics]], metrics: RelationMetrics,
+                          previous_ids: Counter, current_ids: Counter) -> bool:
+        added_ids: Counter = current_ids - previous_ids
+        removed_ids: Counter = previous_ids - current_ids
+
+        for knowledgebase_id, occurrences in removed_ids.items():
+            # the contribution of the previous run is subtracted, the entity is not fetched again
+            metrics.remove_contribution(knowledgebase_id, occurrences, forget=knowledgebase_id not in current_ids)
+        for knowledgebase_id, occurrences in added_ids.items():
+            contribution: Optional[List[Relation]] = metrics.contribution(knowledgebase_id)
+            if contribution is not None:
+                # further occurrences of an entity repeat its contribution
+                metrics.add_relations(contribution * occurrences)
+            else:
+                EntityPlan._subscribe(subscribers, [knowledgebase_id] * occurrences, metrics)
+
+        return bool(added_ids or removed_ids)
+
+    @staticmethod
+    def _subscribe(subscribers: Dict[str, List[RelationMetrics]], knowledgebase_ids: List[str],
+                   metrics: RelationMetrics) -> None:
+        for knowledgebase_id in knowledgebase_ids:
+            if knowledgebase_id not in subscribers:
+                subscribers[knowledgebase_id] = []
+
+            subscribers[knowledgebase_id].append(metrics)
+
+    def next_chunk(self, chunk_size: int) -> List[str]:
+        with self._lock:
+            chunk: List[str] = self._knowledgebase_ids[self._next_index:self._next_index + chunk_size]
+            self._next_index += len(chunk)
+            return chunk
+
+    def distribute(self, relations: Iterable[Relation]) -> None:
+        relations = list(relations)
+        relations_per_metrics: Dict[RelationMetrics, List[Relation]] = EntityPlan._group(relations, self._subscribers)
+
+        with self._lock:
+            for metrics, metrics_relations in relations_per_metrics.items():
+                metrics.add_relations(metrics_relations)
+            if self._track_contributions:
+                self._record_contributions(relations)
+
+    def _record_contributions(self, relations: List[Relation]) -> None:
+        relations_per_source: Dict[str, List[Relation]] = {}
+        for relation in relations:
+            if relation.source not in relations_per_source:
+                relations_per_source[relation.source] = []
+
+            relations_per_source[relation.source].append(relation)
+
+        for source, source_relations in relations_per_source.items():
+            for metrics in self._subscribers.get(source, []):
+                metrics.record_contribution(source, source_relations)
+
+    @staticmethod
+    def _group(relations: List[Relation],
+               subscribers: Dict[str, List[RelationMetrics]]) -> Dict[RelationMetrics, List[Relation]]:
+        relations_per_metrics: Dict[RelationMetrics, List[Relation]] = {}
+        if not subscribers:
+            return relations_per_metrics
+
+        for relation in relations:
+            for metrics in subscribers.get(relation.source, []):
+                if metrics not in relations_per_metrics:
+                    relations_per_metrics[metrics] = []
+
+                relations_per_metrics[metrics].append(relation)
+        return relations_per_metrics
+
+    @property
+    def metrics(self) -> List[RelationMetrics]:
+        return self._metrics
+
+    def __len__(self):
+        return len(self._knowledgebase_ids)
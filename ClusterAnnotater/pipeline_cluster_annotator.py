@@ -0,0 +1,198 @@
+import functools
+import logging
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Set
+
+from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from ClusterAnnotater.cluster_scheduler import ClusterScheduler
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.relation import Relation
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
+from RelationSource.bisecting_retry import BisectingRetry, BisectionStatistics, OutageDetector
+from RelationSource.caching_wikidata_relation_source import CachingWikidataRelationSource
+from RelationSource.request_controller import RequestController
+from result_sink.abstract_result_sink import AbstractResultSink
+from util.metrics import metrics
+from util.pipeline import Pipeline, PipelineStage
+from wikidata_endpoint import WikidataEndpoint
+
+
+class _ClusterProgress:
+
+    def __init__(self, cluster: Cluster, chunks: int):
+        self._lock: threading.Lock = threading.Lock()
+        self.metrics: RelationMetrics = RelationMetrics(cluster)
+        self.statistics: BisectionStatistics = BisectionStatistics()
+        self._chunks: int = chunks
+        self._next_chunk_index: int = 0
+        self._completed_chunks: Dict[int, List[Relation]] = {}
+
+    def record(self, statistics: BisectionStatistics) -> None:
+        with self._lock:
+            self.statistics.succeeded += statistics.succeeded
+            self.statistics.splits += statistics.splits
+            self.statistics.dropped += statistics.dropped
+            self.statistics.skipped += statistics.skipped
+
+    def add(self, chunk_index: int, relations: List[Relation]) -> bool:
+        # chunks are aggregated in their original order, so ties between relations are broken as in the other modes
+        with self._lock:
+            self._completed_chunks[chunk_index] = relations
+            while self._next_chunk_index in self._completed_chunks:
+                self.metrics.add_relations(self._completed_chunks.pop(self._next_chunk_index))
+                self._next_chunk_index += 1
+            return self._next_chunk_index == self._chunks
+
+
+class _Chunk:
+
+    def __init__(self, progress: _ClusterProgress, index: int, embedding_tags: List[str]):
+        self.progress: _ClusterProgress = progress
+        self.index: int = index
+        self.embedding_tags: List[str] = embedding_tags
+        self.relations: List[Relation] = []
+        self.uncached_entities: Set[str] = set()
+        self.fetched_entities: Set[str] = set()
+        self.records: List[Dict[str, str]] = []
+
+
+class PipelineClusterAnnotator:
+    STAGES = ("plan", "lookup", "fetch", "parse", "aggregate", "output")
+    DEFAULT_STAGE_WORKERS = {"plan": 1, "lookup": 2, "parse": 2, "aggregate": 1, "output": 1}
+    MAX_NUMBER_OF_QUEUED_ITEMS_PER_WORKER = 2
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster],
+                 relation_cache: Optional[AbstractRelationCache] = None,
+                 result_sink: Optional[AbstractResultSink] = None,
+                 request_controller: Optional[RequestController] = None,
+                 endpoint_config: Path = ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT,
+                 schedule_clusters: bool = False, stage_workers: Optional[Dict[str, int]] = None):
+        self._linkings: EntityLinkings = linkings
+        self._clusters: Iterable[Cluster] = clusters
+        self._wikidata_endpoint: WikidataEndpoint = ClusterAnnotator.create_wikidata_endpoint(endpoint_config)
+        self._request_controller: RequestController = \
+            request_controller or ClusterAnnotator.create_request_controller(self._wikidata_endpoint)
+        self._relation_cache: AbstractRelationCache = relation_cache or WriteBehindRelationCache(
+            SqliteRelationCache())
+        self._result_sink: Optional[AbstractResultSink] = result_sink
+        self._schedule_clusters: bool = schedule_clusters
+        # by default as many fetch workers as the endpoint accepts concurrent requests
+        self._stage_workers: Dict[str, int] = dict(PipelineClusterAnnotator.DEFAULT_STAGE_WORKERS,
+                                                   fetch=self._wikidata_endpoint.config().concurrent_requests())
+        self._stage_workers.update(stage_workers or {})
+        self._results: List[RelationMetrics] = []
+        # shared by all fetch workers, each of them only sees a fraction of the chunks
+        self._outage_detector: OutageDetector = OutageDetector()
+
+    def run(self) -> Iterable[RelationMetrics]:
+        pipeline: Pipeline = Pipeline(self._create_stages())
+        pipeline.start()
+        try:
+            try:
+                for cluster in self._ordered_clusters():
+                    if not pipeline.put(cluster):
+                        break
+            finally:
+                pipeline.join()
+        finally:
+            self._relation_cache.flush()
+            logging.info(f"Request controller: {self._request_controller.state()}")
+
+        return self._results
+
+    def _ordered_clusters(self) -> Iterable[Cluster]:
+        if not self._schedule_clusters:
+            return self._clusters
+
+        return ClusterScheduler(self._linkings, self._clusters, self._stage_workers["fetch"],
+                                self._relation_cache).ordered_clusters()
+
+    def _create_stages(self) -> List[PipelineStage]:
+        handler_factories: Dict[str, Callable[[], Callable[[Any], List[Any]]]] = {
+            "plan": lambda: self._plan,
+            "lookup": lambda: functools.partial(self._look_up, self._create_relation_source()),
+            "fetch": lambda: functools.partial(self._fetch, self._create_relation_source(), self._outage_detector),
+            "parse": lambda: functools.partial(self._parse, self._create_relation_source()),
+            "aggregate": lambda: self._aggregate,
+            "output": lambda: self._output,
+        }
+        queued_items: int = PipelineClusterAnnotator.MAX_NUMBER_OF_QUEUED_ITEMS_PER_WORKER
+        return [PipelineStage(name, handler_factories[name], self._stage_workers[name],
+                              self._stage_workers[name] * queued_items) for name in PipelineClusterAnnotator.STAGES]
+
+    def _create_relation_source(self) -> CachingWikidataRelationSource:
+        return CachingWikidataRelationSource(self._linkings, self._wikidata_endpoint, self._relation_cache,
+                                             self._request_controller)
+
+    def _plan(self, cluster: Cluster) -> List[_Chunk]:
+        logging.info(f"Start analyzing cluster #{cluster.id}")
+        chunk_size: int = self._request_controller.chunk_size()
+        # a cluster without entities still needs a chunk, otherwise it would never be completed
+        chunk_starts: List[int] = list(range(0, len(cluster.entities), chunk_size)) or [0]
+        progress: _ClusterProgress = _ClusterProgress(cluster, len(chunk_starts))
+        return [_Chunk(progress, index, cluster.entities[start:start + chunk_size])
+                for index, start in enumerate(chunk_starts)]
+
+    def _look_up(self, relation_source: CachingWikidataRelationSource, chunk: _Chunk) -> List[_Chunk]:
+        entities: List[str] = [self._linkings[tag] for tag in chunk.embedding_tags if tag in self._linkings]
+        chunk.relations, chunk.uncached_entities = relation_source.relations_from_cache(entities)
+        return [chunk]
+
+    @staticmethod
+    def _fetch(relation_source: CachingWikidataRelationSource, outage_detector: OutageDetector,
+               chunk: _Chunk) -> List[_Chunk]:
+        if len(chunk.uncached_entities) < 1:
+            return [chunk]
+
+        dropped_entities: Set[str] = set()
+
+        def quarantine(entities: List[str]) -> None:
+            dropped_entities.update(entities)
+            relation_source.quarantine_knowledgebase_ids(entities)
+
+        retry: BisectingRetry[Dict[str, str]] = BisectingRetry(relation_source.records_from_remote, quarantine,
+                                                               relation_source.retry_scope, outage_detector,
+                                                               dropped_entities.update)
+        chunk.records = retry.relations_for(list(chunk.uncached_entities))
+        chunk.fetched_entities = chunk.uncached_entities - dropped_entities
+        chunk.progress.record(retry.statistics)
+        metrics.increment("chunk_splits_total", retry.statistics.splits)
+        metrics.increment("entities_dropped_total", retry.statistics.dropped)
+        metrics.increment("entities_skipped_total", retry.statistics.skipped)
+        return [chunk]
+
+    @staticmethod
+    def _parse(relation_source: CachingWikidataRelationSource, chunk: _Chunk) -> List[_Chunk]:
+        if len(chunk.uncached_entities) < 1:
+            return [chunk]
+
+        remote_relations: List[Relation] = CachingWikidataRelationSource.parse_records(chunk.records)
+        chunk.records = []
+        # dropped entities are quarantined or skipped, they must not be cached as entities without relations
+        relation_source.add_to_cache(chunk.fetched_entities, remote_relations)
+        chunk.relations.extend(remote_relations)
+        return [chunk]
+
+    @staticmethod
+    def _aggregate(chunk: _Chunk) -> List[RelationMetrics]:
+        with metrics.timer("aggregation_seconds"):
+            completed: bool = chunk.progress.add(chunk.index, chunk.relations)
+        if not completed:
+            return []
+
+        logging.info(f"[CLUSTER-{chunk.progress.metrics.cluster.id}] {chunk.progress.statistics}")
+        metrics.increment("clusters_annotated_total")
+        return [chunk.progress.metrics]
+
+    def _output(self, cluster_metrics: RelationMetrics) -> List[Any]:
+        with metrics.timer("output_seconds"):
+            if self._result_sink is not None:
+                self._result_sink.persist(cluster_metrics)
+            else:
+                self._results.append(cluster_metrics)
+        return []
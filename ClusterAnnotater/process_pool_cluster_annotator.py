@@ -0,0 +1,116 @@
+import logging
+import multiprocessing
+import threading
+from pathlib import Path
+from typing import Iterable, List, Optional, Callable, Iterator, Tuple, Dict
+
+from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from ClusterAnnotater.cluster_scheduler import ClusterScheduler
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationSource.request_controller import RequestController
+from result_sink.abstract_result_sink import AbstractResultSink
+from util.metrics import metrics
+from util.utils import bounded
+
+_worker_linkings: Optional[EntityLinkings] = None
+_worker_relation_cache: Optional[AbstractRelationCache] = None
+_worker_request_controller: Optional[RequestController] = None
+_worker_threads: int = 1
+_worker_offline: bool = False
+_worker_endpoint_config: Path = ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT
+_worker_stream_responses: bool = False
+_worker_schedule_clusters: bool = False
+
+
+def _initialize_worker(linkings: EntityLinkings, relation_cache_factory: Callable[[], AbstractRelationCache],
+                       threads: int, offline: bool, endpoint_config: Path, stream_responses: bool,
+                       schedule_clusters: bool, processes: int) -> None:
+    global _worker_linkings, _worker_relation_cache, _worker_request_controller, _worker_threads, _worker_offline, \
+        _worker_endpoint_config, _worker_stream_responses, _worker_schedule_clusters
+    # linkings are inherited from the parent, connections and writer threads must be created after the fork
+    _worker_linkings = linkings
+    _worker_relation_cache = relation_cache_factory()
+    _worker_request_controller = None if offline else ClusterAnnotator.create_request_controller(
+        ClusterAnnotator.create_wikidata_endpoint(endpoint_config), processes)
+    _worker_threads = threads
+    _worker_offline = offline
+    _worker_endpoint_config = endpoint_config
+    _worker_stream_responses = stream_responses
+    _worker_schedule_clusters = schedule_clusters
+
+
+def _annotate_shard(clusters: List[Cluster]) -> Tuple[List[RelationMetrics], Dict[str, Dict[str, object]]]:
+    # the annotator flushes the relation cache before it returns, so no writes are lost when the pool terminates
+    annotator: ClusterAnnotator = ClusterAnnotator(_worker_linkings, clusters, _worker_threads,
+                                                   _worker_relation_cache, offline=_worker_offline,
+                                                   request_controller=_worker_request_controller,
+                                                   endpoint_config=_worker_endpoint_config,
+                                                   stream_responses=_worker_stream_responses,
+                                                   schedule_clusters=_worker_schedule_clusters)
+    return list(annotator.run()), metrics.drain()
+
+
+class ProcessPoolClusterAnnotator:
+    CLUSTERS_PER_SHARD = 16
+    SHARDS_IN_FLIGHT_PER_PROCESS = 2
+
+    def __init__(self, linkings: EntityLinkings, clusters: Iterable[Cluster], processes: int,
+                 threads_per_process: int, relation_cache_factory: Callable[[], AbstractRelationCache],
+                 result_sink: Optional[AbstractResultSink] = None, offline: bool = False,
+                 endpoint_config: Path = ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT,
+                 stream_responses: bool = False, schedule_clusters: bool = False):
+        self._linkings: EntityLinkings = linkings
+        self._clusters: Iterable[Cluster] = clusters
+        self._processes: int = processes
+        self._threads_per_process: int = threads_per_process
+        self._relation_cache_factory: Callable[[], AbstractRelationCache] = relation_cache_factory
+        self._result_sink: Optional[AbstractResultSink] = result_sink
+        self._offline: bool = offline
+        self._endpoint_config: Path = endpoint_config
+        self._stream_responses: bool = stream_responses
+        self._schedule_clusters: bool = schedule_clusters
+
+    def run(self) -> Iterable[RelationMetrics]:
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() \
+            else multiprocessing.get_context()
+        # the pool would otherwise read all clusters into its task queue
+        shards_in_flight: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            self._processes * ProcessPoolClusterAnnotator.SHARDS_IN_FLIGHT_PER_PROCESS)
+        results: List[RelationMetrics] = []
+
+        logging.info(f"Annotating clusters with {self._processes} processes of {self._threads_per_process} threads")
+        with context.Pool(self._processes, initializer=_initialize_worker,
+                          initargs=(self._linkings, self._relation_cache_factory, self._threads_per_process,
+                                    self._offline, self._endpoint_config, self._stream_responses,
+                                    self._schedule_clusters, self._processes)) as pool:
+            for shard_results, shard_metrics in pool.imap_unordered(_annotate_shard,
+                                                                    bounded(self._shards(), shards_in_flight)):
+                shards_in_flight.release()
+                metrics.merge(shard_metrics)
+
+                for cluster_metrics in shard_results:
+                    if self._result_sink is not None:
+                        self._result_sink.persist(cluster_metrics)
+                    else:
+                        results.append(cluster_metrics)
+
+        return results
+
+    def _shards(self) -> Iterator[List[Cluster]]:
+        # the most expensive shards are started first, every process splits large clusters across its threads
+        clusters: Iterable[Cluster] = self._clusters
+        if self._schedule_clusters:
+            clusters = ClusterScheduler(self._linkings, self._clusters, self._processes).ordered_clusters()
+
+        shard: List[Cluster] = []
+        for cluster in clusters:
+            shard.append(cluster)
+            if len(shard) >= ProcessPoolClusterAnnotator.CLUSTERS_PER_SHARD:
+                yield shard
+                shard = []
+
+        if shard:
+            yield shard
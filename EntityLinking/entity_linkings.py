@@ -12,5 +12,8 @@ class EntityLinkings:
     def __contains__(self, embedding_tag):
         return embedding_tag in self._entity_mappings
 
+    def knowledgebase_ids(self):
+        return self._entity_mappings.values()
+
     def __len__(self):
         return len(self._entity_mappings)
@@ -0,0 +1,111 @@
+import array
+import csv
+import logging
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, Iterator
+
+from EntityLinking.entity_linkings import EntityLinkings
+
+
+class EntityLinkingsSnapshot(EntityLinkings):
+    # layout in native byte order: header | (count + 1) uint64 label offsets | count uint32 QIDs | sorted UTF-8 labels
+    MAGIC = b"ELSNAP01"
+    HEADER = struct.Struct("=8sQQ")
+    SUFFIX = ".snapshot"
+
+    def __init__(self, snapshot_file: Path):
+        super().__init__()
+        with snapshot_file.open("rb") as snapshot_stream:
+            self._snapshot: mmap.mmap = mmap.mmap(snapshot_stream.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self._count, labels_size = EntityLinkingsSnapshot.HEADER.unpack_from(self._snapshot)
+        if magic != EntityLinkingsSnapshot.MAGIC:
+            raise ValueError(f"{snapshot_file} is not an entity linkings snapshot")
+
+        offsets_start: int = EntityLinkingsSnapshot.HEADER.size
+        ids_start: int = offsets_start + (self._count + 1) * 8
+        labels_start: int = ids_start + self._count * 4
+
+        view: memoryview = memoryview(self._snapshot)
+        self._offsets: memoryview = view[offsets_start:ids_start].cast("Q")
+        self._ids: memoryview = view[ids_start:labels_start].cast("I")
+        self._labels: memoryview = view[labels_start:labels_start + labels_size]
+
+    @staticmethod
+    def snapshot_file_for(linkings_file: Path) -> Path:
+        return linkings_file.with_name(linkings_file.name + EntityLinkingsSnapshot.SUFFIX)
+
+    @staticmethod
+    def compile(linkings_file: Path, snapshot_file: Path) -> None:
+        mappings: Dict[bytes, int] = {}
+        skipped: int = 0
+
+        with linkings_file.open("r") as csv_stream:
+            csv_reader = csv.reader(csv_stream, delimiter=',')
+            next(csv_reader, None)  # skip header
+
+            for row in csv_reader:
+                if not row:
+                    continue
+
+                knowledgebase_id: str = row[1]
+                if not knowledgebase_id.startswith("Q") or not knowledgebase_id[1:].isdigit() or \
+                        int(knowledgebase_id[1:]) > 0xFFFFFFFF:
+                    skipped += 1
+                    continue
+
+                mappings[row[0].encode("utf-8")] = int(knowledgebase_id[1:])
+
+        labels: List[bytes] = sorted(mappings)
+        offsets: List[int] = [0]
+        for label in labels:
+            offsets.append(offsets[-1] + len(label))
+
+        temporary_file: Path = snapshot_file.with_name(snapshot_file.name + ".tmp")
+        with temporary_file.open("wb") as snapshot_stream:
+            snapshot_stream.write(EntityLinkingsSnapshot.HEADER.pack(EntityLinkingsSnapshot.MAGIC, len(labels),
+                                                                     offsets[-1]))
+            snapshot_stream.write(array.array("Q", offsets).tobytes())
+            snapshot_stream.write(array.array("I", (mappings[label] for label in labels)).tobytes())
+            for label in labels:
+                snapshot_stream.write(label)
+        os.replace(str(temporary_file), str(snapshot_file))
+
+        logging.info(f"Compiled {len(labels)} linkings into {snapshot_file}, skipped {skipped} non-item linkings")
+
+    def _find(self, embedding_tag) -> int:
+        label: bytes = str(embedding_tag).encode("utf-8")
+        low, high = 0, self._count
+
+        while low < high:
+            middle: int = (low + high) // 2
+            candidate: bytes = self._labels[self._offsets[middle]:self._offsets[middle + 1]].tobytes()
+            if candidate < label:
+                low = middle + 1
+            elif candidate > label:
+                high = middle
+            else:
+                return middle
+
+        return -1
+
+    def add(self, embedding_tag, knowledgebase_id):
+        raise TypeError("entity linkings snapshots are read-only")
+
+    def __getitem__(self, embedding_tag):
+        index: int = self._find(embedding_tag)
+        if index < 0:
+            raise KeyError(embedding_tag)
+        return f"Q{self._ids[index]}"
+
+    def __contains__(self, embedding_tag):
+        return self._find(embedding_tag) >= 0
+
+    def knowledgebase_ids(self) -> Iterator[str]:
+        return (f"Q{knowledgebase_id}" for knowledgebase_id in self._ids)
+
+    def __len__(self):
+        return self._count
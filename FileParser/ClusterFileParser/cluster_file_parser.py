@@ -1,6 +1,6 @@
 import csv
 from pathlib import Path
-from typing import Dict, Iterable
+from typing import Dict, Iterable, Iterator, Optional, Set
 
 from Cluster.cluster import Cluster
 from FileParser.abstract_file_parser import AbstractFileParser
@@ -30,3 +30,36 @@ class ClusterFileParser(AbstractFileParser):
                 clusters[cluster_id].entities.append(embedding_tag)
 
             return clusters.values()
+
+    @staticmethod
+    def stream_from_file(configuration_file: Path) -> Iterator[Cluster]:
+        with configuration_file.open("r") as csv_stream:
+            csv_reader = csv.reader(csv_stream, delimiter=',')
+            completed_cluster_ids: Set[str] = set()
+            cluster: Optional[Cluster] = None
+            cluster_id: Optional[str] = None
+
+            next(csv_reader, None)  # skip header
+            for row in csv_reader:
+                if not row:
+                    continue
+
+                row_cluster_id = row[ClusterFileParser.COLUMN_INDEX_CLUSTER_ID]
+                embedding_tag = row[ClusterFileParser.COLUMN_INDEX_EMBEDDING_LABEL]
+
+                if row_cluster_id != cluster_id:
+                    if cluster is not None:
+                        completed_cluster_ids.add(cluster_id)
+                        yield cluster
+
+                    if row_cluster_id in completed_cluster_ids:
+                        raise ValueError(f"{configuration_file} is not grouped by cluster id, "
+                                         f"cluster {row_cluster_id} occurs more than once")
+
+                    cluster_id = row_cluster_id
+                    cluster = Cluster(int(cluster_id))
+
+                cluster.entities.append(embedding_tag)
+
+            if cluster is not None:
+                yield cluster
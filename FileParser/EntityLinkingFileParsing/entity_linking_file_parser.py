@@ -1,6 +1,9 @@
 import csv
+import logging
+from pathlib import Path
 
 from EntityLinking.entity_linkings import EntityLinkings
+from EntityLinking.entity_linkings_snapshot import EntityLinkingsSnapshot
 from FileParser.abstract_file_parser import AbstractFileParser
 
 
@@ -24,3 +27,12 @@ class EntityLinkingFileParser(AbstractFileParser):
                 linkings.add(embedding_tag, knowledgebase_id)
 
             return linkings
+
+    @staticmethod
+    def create_from_snapshot_or_file(configuration_file: Path):
+        snapshot_file = EntityLinkingsSnapshot.snapshot_file_for(configuration_file)
+        if snapshot_file.exists() and snapshot_file.stat().st_mtime >= configuration_file.stat().st_mtime:
+            logging.info(f"Using linkings snapshot {snapshot_file}")
+            return EntityLinkingsSnapshot(snapshot_file)
+
+        return EntityLinkingFileParser.create_from_file(configuration_file)
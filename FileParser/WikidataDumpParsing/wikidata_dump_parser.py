@@ -0,0 +1,220 @@
+import bz2
+import gzip
+import json
+import re
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import List, Tuple, Iterator, IO, Set, Optional, Dict, Match
+
+# (source entity, property id, value, whether the value is an entity id whose label has to be resolved)
+Statement = Tuple[str, str, str, bool]
+
+
+class AbstractWikidataDumpParser(ABC):
+    LINES_PER_BATCH = 1000
+
+    def __init__(self, dump_file: Path):
+        self._dump_file: Path = dump_file
+
+    @staticmethod
+    def for_file(dump_file: Path, use_direct_claims: bool = False) -> "AbstractWikidataDumpParser":
+        suffixes: List[str] = [suffix for suffix in dump_file.suffixes if suffix not in (".gz", ".bz2")]
+        if suffixes and suffixes[-1] == ".json":
+            return JsonWikidataDumpParser(dump_file)
+        if suffixes and suffixes[-1] == ".nt":
+            return NTriplesWikidataDumpParser(dump_file, use_direct_claims)
+        raise ValueError(f"{dump_file} is neither a JSON nor a N-Triples dump")
+
+    def batches(self) -> Iterator[List[bytes]]:
+        with self._open() as dump_stream:
+            batch: List[bytes] = []
+            for line in dump_stream:
+                batch.append(line)
+                if len(batch) >= self.LINES_PER_BATCH:
+                    yield batch
+                    batch = []
+
+            if batch:
+                yield batch
+
+    def _open(self) -> IO[bytes]:
+        if self._dump_file.suffix == ".gz":
+            return gzip.open(self._dump_file, "rb")
+        if self._dump_file.suffix == ".bz2":
+            return bz2.open(self._dump_file, "rb")
+        return self._dump_file.open("rb")
+
+    @abstractmethod
+    def parse_statements(self, lines: List[bytes], entities: Set[str]) -> Tuple[List[Statement], Set[str]]:
+        # returns the statements of the requested entities and all requested entities found in the lines
+        raise NotImplementedError
+
+    @abstractmethod
+    def parse_labels(self, lines: List[bytes], ids: Set[str]) -> Dict[str, str]:
+        raise NotImplementedError
+
+
+class JsonWikidataDumpParser(AbstractWikidataDumpParser):
+    LINES_PER_BATCH = 100
+    ID_EXTRACTION_REGEX = re.compile(rb'"id":"([QPL]\d+)"')
+
+    def parse_statements(self, lines: List[bytes], entities: Set[str]) -> Tuple[List[Statement], Set[str]]:
+        statements: List[Statement] = []
+        found_entities: Set[str] = set()
+
+        for entity in JsonWikidataDumpParser._entities(lines, entities):
+            found_entities.add(entity["id"])
+            for property_id, claims in entity.get("claims", {}).items():
+                for claim in claims:
+                    value: Optional[Tuple[str, bool]] = JsonWikidataDumpParser._value(claim["mainsnak"])
+                    if value is not None:
+                        statements.append((entity["id"], property_id, value[0], value[1]))
+
+        return statements, found_entities
+
+    def parse_labels(self, lines: List[bytes], ids: Set[str]) -> Dict[str, str]:
+        labels: Dict[str, str] = {}
+        for entity in JsonWikidataDumpParser._entities(lines, ids):
+            if "en" in entity.get("labels", {}):
+                labels[entity["id"]] = entity["labels"]["en"]["value"]
+        return labels
+
+    @staticmethod
+    def _entities(lines: List[bytes], ids: Set[str]) -> Iterator[Dict]:
+        for line in lines:
+            # the id is one of the first keys, only decode entities that are of interest
+            match: Optional[Match] = JsonWikidataDumpParser.ID_EXTRACTION_REGEX.search(line, 0, 200)
+            if match is None or match.group(1).decode() not in ids:
+                continue
+
+            yield json.loads(line.rstrip(b",\r\n"))
+
+    @staticmethod
+    def _value(snak: Dict) -> Optional[Tuple[str, bool]]:
+        if snak.get("snaktype") != "value":
+            return None  # unknown and missing values have no ps: triple either
+
+        datatype: str = snak["datavalue"]["type"]
+        value = snak["datavalue"]["value"]
+
+        if datatype == "wikibase-entityid":
+            return value["id"], True
+        if datatype == "string":
+            return value, False
+        if datatype == "monolingualtext":
+            return value["text"], False
+        if datatype == "quantity":
+            return value["amount"].lstrip("+"), False
+        if datatype == "time":
+            return value["time"].lstrip("+"), False
+        if datatype == "globecoordinate":
+            return f"Point({value['longitude']} {value['latitude']})", False
+        return None
+
+
+class NTriplesWikidataDumpParser(AbstractWikidataDumpParser):
+    LINES_PER_BATCH = 20000
+    ENTITY_PREFIX = "http://www.wikidata.org/entity/"
+    STATEMENT_PREFIX = "http://www.wikidata.org/entity/statement/"
+    STATEMENT_PROPERTY_PREFIX = "http://www.wikidata.org/prop/statement/"
+    DIRECT_PROPERTY_PREFIX = "http://www.wikidata.org/prop/direct/"
+    LABEL_PREDICATE = "http://www.w3.org/2000/01/rdf-schema#label"
+    TRIPLE_REGEX = re.compile(r'^<([^>]*)> <([^>]*)> (.*) \.\s*$')
+    LITERAL_REGEX = re.compile(r'^"(.*)"(?:@([\w-]+)|\^\^<([^>]*)>)?$')
+    SIGNED_DATATYPES = ("http://www.w3.org/2001/XMLSchema#decimal", "http://www.w3.org/2001/XMLSchema#dateTime")
+    STATEMENT_ENTITY_REGEX = re.compile(r'^([QqPpLl]\d+)-')
+    # ps:value/P569 and ps:value-normalized/P569 share the ps: prefix, but hold full value nodes
+    PROPERTY_ID_REGEX = re.compile(r'^P\d+$')
+    ESCAPE_REGEX = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)')
+    ESCAPES = {"t": "\t", "b": "\b", "n": "\n", "r": "\r", "f": "\f", '"': '"', "'": "'", "\\": "\\"}
+
+    def __init__(self, dump_file: Path, use_direct_claims: bool = False):
+        super().__init__(dump_file)
+        # the SPARQL query uses ps: statement values, truthy dumps only contain wdt: triples
+        self._property_prefix: str = NTriplesWikidataDumpParser.DIRECT_PROPERTY_PREFIX if use_direct_claims \
+            else NTriplesWikidataDumpParser.STATEMENT_PROPERTY_PREFIX
+
+    def parse_statements(self, lines: List[bytes], entities: Set[str]) -> Tuple[List[Statement], Set[str]]:
+        statements: List[Statement] = []
+        found_entities: Set[str] = set()
+
+        for subject, predicate, term in NTriplesWikidataDumpParser._triples(lines):
+            source: Optional[str] = NTriplesWikidataDumpParser._source(subject)
+            if source is None or source not in entities:
+                continue
+
+            found_entities.add(source)
+            if not predicate.startswith(self._property_prefix):
+                continue
+
+            property_id: str = predicate[len(self._property_prefix):]
+            if NTriplesWikidataDumpParser.PROPERTY_ID_REGEX.match(property_id) is None:
+                continue
+
+            value: Optional[Tuple[str, bool]] = NTriplesWikidataDumpParser._value(term)
+            if value is not None:
+                statements.append((source, property_id, value[0], value[1]))
+
+        return statements, found_entities
+
+    def parse_labels(self, lines: List[bytes], ids: Set[str]) -> Dict[str, str]:
+        labels: Dict[str, str] = {}
+        for subject, predicate, term in NTriplesWikidataDumpParser._triples(lines):
+            if predicate != NTriplesWikidataDumpParser.LABEL_PREDICATE or \
+                    not subject.startswith(NTriplesWikidataDumpParser.ENTITY_PREFIX):
+                continue
+
+            entity: str = subject[len(NTriplesWikidataDumpParser.ENTITY_PREFIX):]
+            if entity not in ids:
+                continue
+
+            match: Optional[Match] = NTriplesWikidataDumpParser.LITERAL_REGEX.match(term)
+            if match is not None and match.group(2) == "en":
+                labels[entity] = NTriplesWikidataDumpParser._unescape(match.group(1))
+
+        return labels
+
+    @staticmethod
+    def _triples(lines: List[bytes]) -> Iterator[Tuple[str, str, str]]:
+        for line in lines:
+            match: Optional[Match] = NTriplesWikidataDumpParser.TRIPLE_REGEX.match(line.decode("utf-8"))
+            if match is not None:
+                yield match.group(1), match.group(2), match.group(3)
+
+    @staticmethod
+    def _source(subject: str) -> Optional[str]:
+        if subject.startswith(NTriplesWikidataDumpParser.STATEMENT_PREFIX):
+            # statement ids start with the id of their entity, e.g. Q42-F078E5B3-...
+            match: Optional[Match] = NTriplesWikidataDumpParser.STATEMENT_ENTITY_REGEX.match(
+                subject[len(NTriplesWikidataDumpParser.STATEMENT_PREFIX):])
+            return match.group(1).upper() if match is not None else None
+        if subject.startswith(NTriplesWikidataDumpParser.ENTITY_PREFIX):
+            return subject[len(NTriplesWikidataDumpParser.ENTITY_PREFIX):]
+        return None
+
+    @staticmethod
+    def _value(term: str) -> Optional[Tuple[str, bool]]:
+        if term.startswith("<"):
+            iri: str = term[1:-1]
+            if iri.startswith(NTriplesWikidataDumpParser.ENTITY_PREFIX):
+                return iri[len(NTriplesWikidataDumpParser.ENTITY_PREFIX):], True
+            return iri, False
+
+        match: Optional[Match] = NTriplesWikidataDumpParser.LITERAL_REGEX.match(term)
+        if match is None:
+            return None  # blank nodes of unknown values
+
+        literal: str = NTriplesWikidataDumpParser._unescape(match.group(1))
+        if match.group(3) in NTriplesWikidataDumpParser.SIGNED_DATATYPES:
+            literal = literal.lstrip("+")
+        return literal, False
+
+    @staticmethod
+    def _unescape(literal: str) -> str:
+        def replace(match: Match) -> str:
+            escape: str = match.group(1)
+            if escape[0] in "uU" and len(escape) > 1:
+                return chr(int(escape[1:], 16))
+            return NTriplesWikidataDumpParser.ESCAPES.get(escape, escape)
+
+        return NTriplesWikidataDumpParser.ESCAPE_REGEX.sub(replace, literal)
@@ -0,0 +1,15 @@
+from typing import Dict, List
+
+from Cluster.cluster import Cluster
+from Relation.relation_metrics import RelationMetrics
+
+
+class ClusterAggregationState:
+
+    def __init__(self, entities: List[str], state: Dict[str, Dict]):
+        # linked entities of the cluster in the previous run, entities linked several times occur several times
+        self.entities: List[str] = entities
+        self._state: Dict[str, Dict] = state
+
+    def restore(self, cluster: Cluster) -> RelationMetrics:
+        return RelationMetrics.from_state_json_object(cluster, self._state)
@@ -0,0 +1,99 @@
+import struct
+import sys
+import zlib
+from array import array
+from itertools import accumulate
+from typing import BinaryIO, Dict, Iterator, List, Tuple
+
+from Relation.relation import Relation
+
+
+class ColumnarRelations:
+    MAGIC = b"RCOL"
+    VERSION = 1
+    # magic, version, number of relations, length of the compressed columns
+    BLOCK_HEADER = struct.Struct("<4sBII")
+    # number of distinct values, bytes of the encoded values, bytes per index
+    COLUMN_HEADER = struct.Struct("<IIB")
+    INDEX_TYPECODES = {1: "B", 2: "H", 4: "I"}
+    COMPRESSION_LEVEL = 6
+
+    @staticmethod
+    def encode(relations: List[Relation]) -> bytes:
+        # a block stores sources, names and targets as separate columns, which compress far better than rows
+        columns: bytes = b"".join([ColumnarRelations._encode_column([relation.source for relation in relations]),
+                                   ColumnarRelations._encode_column([relation.name for relation in relations]),
+                                   ColumnarRelations._encode_column([relation.target for relation in relations])])
+        payload: bytes = zlib.compress(columns, ColumnarRelations.COMPRESSION_LEVEL)
+        return ColumnarRelations.BLOCK_HEADER.pack(ColumnarRelations.MAGIC, ColumnarRelations.VERSION,
+                                                   len(relations), len(payload)) + payload
+
+    @staticmethod
+    def read_blocks(input_stream: BinaryIO) -> Iterator[List[Relation]]:
+        while True:
+            header: bytes = input_stream.read(ColumnarRelations.BLOCK_HEADER.size)
+            if len(header) < ColumnarRelations.BLOCK_HEADER.size:
+                # a block cut off by an aborted write is ignored, just like an incomplete line of a CSV file
+                return
+
+            magic, version, number_of_relations, length = ColumnarRelations.BLOCK_HEADER.unpack(header)
+            if magic != ColumnarRelations.MAGIC or version != ColumnarRelations.VERSION:
+                raise ValueError(f"Unsupported block of columnar relations (magic {magic!r}, version {version})")
+
+            payload: bytes = input_stream.read(length)
+            if len(payload) < length:
+                return
+
+            yield ColumnarRelations._decode(zlib.decompress(payload), number_of_relations)
+
+    @staticmethod
+    def _encode_column(values: List[str]) -> bytes:
+        # every distinct value is stored once, the column itself only holds indices into this dictionary
+        dictionary: Dict[str, int] = {}
+        indices: List[int] = [dictionary.setdefault(value, len(dictionary)) for value in values]
+        index_width: int = 1 if len(dictionary) <= 0xFF else 2 if len(dictionary) <= 0xFFFF else 4
+        # the values are decoded at once and split by their lengths in characters
+        encoded_values: bytes = "".join(dictionary).encode("utf-8")
+
+        return ColumnarRelations.COLUMN_HEADER.pack(len(dictionary), len(encoded_values), index_width) + \
+            ColumnarRelations._little_endian(array("I", map(len, dictionary))) + encoded_values + \
+            ColumnarRelations._little_endian(array(ColumnarRelations.INDEX_TYPECODES[index_width], indices))
+
+    @staticmethod
+    def _decode(columns: bytes, number_of_relations: int) -> List[Relation]:
+        view: memoryview = memoryview(columns)
+        sources, offset = ColumnarRelations._decode_column(view, 0, number_of_relations)
+        names, offset = ColumnarRelations._decode_column(view, offset, number_of_relations)
+        targets, _ = ColumnarRelations._decode_column(view, offset, number_of_relations)
+        return list(map(Relation, sources, names, targets))
+
+    @staticmethod
+    def _decode_column(view: memoryview, offset: int, number_of_relations: int) -> Tuple[List[str], int]:
+        number_of_values, values_length, index_width = ColumnarRelations.COLUMN_HEADER.unpack_from(view, offset)
+        offset += ColumnarRelations.COLUMN_HEADER.size
+
+        lengths: array = ColumnarRelations._from_little_endian("I", view[offset:offset + 4 * number_of_values])
+        offset += 4 * number_of_values
+        values: str = str(view[offset:offset + values_length], "utf-8")
+        offset += values_length
+        ends: List[int] = list(accumulate(lengths))
+        dictionary: List[str] = [values[end - length:end] for end, length in zip(ends, lengths)]
+
+        indices: array = ColumnarRelations._from_little_endian(
+            ColumnarRelations.INDEX_TYPECODES[index_width], view[offset:offset + index_width * number_of_relations])
+        offset += index_width * number_of_relations
+        return list(map(dictionary.__getitem__, indices)), offset
+
+    @staticmethod
+    def _little_endian(values: array) -> bytes:
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values.tobytes()
+
+    @staticmethod
+    def _from_little_endian(typecode: str, data: memoryview) -> array:
+        values: array = array(typecode)
+        values.frombytes(data)
+        if sys.byteorder == "big":
+            values.byteswap()
+        return values
@@ -1,17 +1,20 @@
 import re
+import sys
 from typing import Match, List, Dict
 
 from resources import constant
 
 
 class Relation:
+    __slots__ = ("source", "name", "target")
 
     ID_EXTRACTION_REGEX = re.compile(r"^.+(Q\d+)$")
 
     def __init__(self, source: str, name: str, target: str):
-        self.source: str = source
-        self.name: str = name
-        self.target: str = target
+        # labels repeat across millions of relations, interning lets the cache and all metrics share one copy
+        self.source: str = sys.intern(source)
+        self.name: str = sys.intern(name)
+        self.target: str = sys.intern(target)
 
     @staticmethod
     def from_wikidata_record(record: Dict[str, str]) -> "Relation":
@@ -1,7 +1,10 @@
 from collections import Counter
-from typing import List, Tuple
+from itertools import groupby
+from operator import attrgetter
+from typing import List, Tuple, Dict, Set, Optional, Iterable
 
 from Cluster.cluster import Cluster
+from Relation.relation import Relation
 from resources import constant
 
 
@@ -12,16 +15,127 @@ class RelationMetrics:
         self._value_per_relation = {}
         self._unique_relations_counter = Counter()
         self._cluster: Cluster = cluster
+        # relations (name and target) per entity, only kept for metrics whose aggregation state is persisted
+        self._contributions: Optional[Dict[str, List[Tuple[str, str]]]] = None
 
     def add_relation(self, relation):
         if relation.name not in self._unique_relation_participants:
-            self._unique_relation_participants[relation.name] = set()
+            self._unique_relation_participants[relation.name] = Counter()
             self._value_per_relation[relation.name] = Counter()
         if relation.source not in self._unique_relation_participants[relation.name]:
             self._unique_relations_counter[relation.name] += 1
-            self._unique_relation_participants[relation.name].add(relation.source)
+        # participants are counted per relation, so that removing the relations again restores the previous state
+        self._unique_relation_participants[relation.name][relation.source] += 1
         self._value_per_relation[relation.name][relation.target] += 1
 
+    def add_relations(self, relations: List[Relation]) -> None:
+        # group by name in C so that counting happens per name instead of per relation.
+        # names are visited in order of first occurrence, thus ties in most_common match add_relation
+        get_name, get_source, get_target = attrgetter("name"), attrgetter("source"), attrgetter("target")
+        relations_per_name: Dict[str, List[Relation]] = {
+            name: list(group) for name, group in groupby(sorted(relations, key=get_name), get_name)}
+
+        for name in dict.fromkeys(map(get_name, relations)):
+            if name not in self._unique_relation_participants:
+                self._unique_relation_participants[name] = Counter()
+                self._value_per_relation[name] = Counter()
+
+            participants: Counter = self._unique_relation_participants[name]
+            number_of_participants: int = len(participants)
+            participants.update(map(get_source, relations_per_name[name]))
+            if len(participants) > number_of_participants:
+                self._unique_relations_counter[name] += len(participants) - number_of_participants
+
+            self._value_per_relation[name].update(map(get_target, relations_per_name[name]))
+
+    def remove_relation(self, relation):
+        self.remove_relations([relation])
+
+    def remove_relations(self, relations: List[Relation]) -> None:
+        # the relations must have been added before, e.g. a contribution, otherwise other entities lose counts
+        get_name, get_source, get_target = attrgetter("name"), attrgetter("source"), attrgetter("target")
+        relations_per_name: Dict[str, List[Relation]] = {
+            name: list(group) for name, group in groupby(sorted(relations, key=get_name), get_name)}
+
+        for name, name_relations in relations_per_name.items():
+            if name not in self._unique_relation_participants:
+                continue
+
+            participants: Counter = self._unique_relation_participants[name]
+            values: Counter = self._value_per_relation[name]
+            participants.subtract(map(get_source, name_relations))
+            values.subtract(map(get_target, name_relations))
+            RelationMetrics._drop_non_positive(participants, set(map(get_source, name_relations)))
+            RelationMetrics._drop_non_positive(values, set(map(get_target, name_relations)))
+
+            if participants:
+                self._unique_relations_counter[name] = len(participants)
+            else:
+                del self._unique_relation_participants[name]
+                del self._value_per_relation[name]
+                del self._unique_relations_counter[name]
+
+    def track_contributions(self) -> None:
+        if self._contributions is None:
+            self._contributions = {}
+
+    def record_contribution(self, entity: str, relations: Iterable[Relation]) -> None:
+        # the relations are added separately, once per occurrence of the entity in the cluster
+        self._contributions[entity] = [(relation.name, relation.target) for relation in relations]
+
+    def contribution(self, entity: str) -> Optional[List[Relation]]:
+        if self._contributions is None or entity not in self._contributions:
+            return None
+
+        return [Relation(entity, name, target) for name, target in self._contributions[entity]]
+
+    def remove_contribution(self, entity: str, occurrences: int = 1, forget: bool = True) -> None:
+        # exactly the relations which were added for the entity are subtracted, whatever the source returns now
+        relations: List[Relation] = self.contribution(entity) or []
+        self.remove_relations(relations * occurrences)
+        if forget:
+            self._contributions.pop(entity, None)
+
+    @staticmethod
+    def _drop_non_positive(counter: Counter, keys: Set[str]) -> None:
+        for key in keys:
+            if counter[key] <= 0:
+                del counter[key]
+
+    def merge(self, other: "RelationMetrics") -> None:
+        # participants are unioned, an entity annotated in both metrics still counts once per relation
+        for name, participants in other._unique_relation_participants.items():
+            if name not in self._unique_relation_participants:
+                self._unique_relation_participants[name] = Counter()
+                self._value_per_relation[name] = Counter()
+
+            self._unique_relation_participants[name].update(participants)
+            self._unique_relations_counter[name] = len(self._unique_relation_participants[name])
+            self._value_per_relation[name].update(other._value_per_relation[name])
+
+    def to_state_json_object(self) -> object:
+        # the intermediate aggregation, from which further relations can be added or removed later on
+        state = {
+            "participants": {name: dict(participants)
+                             for name, participants in self._unique_relation_participants.items()},
+            "values": {name: dict(values) for name, values in self._value_per_relation.items()}
+        }
+        if self._contributions is not None:
+            state["contributions"] = self._contributions
+        return state
+
+    @staticmethod
+    def from_state_json_object(cluster: Cluster, state: Dict[str, Dict]) -> "RelationMetrics":
+        metrics: RelationMetrics = RelationMetrics(cluster)
+        if "contributions" in state:
+            metrics._contributions = {entity: [(name, target) for name, target in relations]
+                                      for entity, relations in state["contributions"].items()}
+        for name, participants in state["participants"].items():
+            metrics._unique_relation_participants[name] = Counter(participants)
+            metrics._value_per_relation[name] = Counter(state["values"][name])
+            metrics._unique_relations_counter[name] = len(participants)
+        return metrics
+
     def top_relations(self, max_relations, min_occurrence_factor=0.3) -> List[Tuple[str, int]]:
         return list(filter(lambda x: x[1] > self.number_of_entities * min_occurrence_factor,
                            self._unique_relations_counter.most_common(max_relations)))
@@ -40,10 +154,18 @@ class RelationMetrics:
                 representation.append("\t↳ {:5.2f}% {}".format(value_percentage, value))
         return "\n".join(representation)
 
+    @property
+    def cluster(self) -> Cluster:
+        return self._cluster
+
     @property
     def number_of_entities(self) -> int:
         return len(self._cluster.entities)
 
+    @property
+    def entities_with_relations(self) -> Set[str]:
+        return set().union(*self._unique_relation_participants.values())
+
     def to_json_object(self) -> object:
 
         def top_relations_json_object() -> object:
@@ -0,0 +1,44 @@
+from abc import ABC, abstractmethod
+from typing import Iterable, Dict, List, Set
+
+from Relation.relation import Relation
+
+
+class AbstractRelationCache(ABC):
+
+    @abstractmethod
+    def relations_for(self, entities: Iterable[str]) -> Dict[str, List[Relation]]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add(self, relations: Iterable[Relation]) -> None:
+        raise NotImplementedError
+
+    def cached(self, entities: Iterable[str]) -> Set[str]:
+        return set(self.relations_for(entities).keys())
+
+    @abstractmethod
+    def known_empty(self, entities: Iterable[str]) -> Set[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_empty(self, entities: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def quarantined(self, entities: Iterable[str]) -> Set[str]:
+        raise NotImplementedError
+
+    @abstractmethod
+    def add_quarantined(self, entities: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear_quarantined(self) -> int:
+        raise NotImplementedError
+
+    def flush(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.flush()
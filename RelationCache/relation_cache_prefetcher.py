@@ -0,0 +1,112 @@
+import logging
+import threading
+import time
+from typing import Callable, Iterable, List, Optional
+
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationSource.abstract_relation_source import AbstractRelationSource
+from RelationSource.bisecting_retry import BisectingRetry
+from util.rate_limiter import RateLimiter
+
+
+class RelationCachePrefetcher:
+    PROGRESS_INTERVAL = 10.0
+
+    def __init__(self, entities: Iterable[str], relation_cache: AbstractRelationCache,
+                 relation_source_factory: Callable[[], AbstractRelationSource], threads: int,
+                 rate_limiter: Optional[RateLimiter] = None):
+        self._relation_cache: AbstractRelationCache = relation_cache
+        self._rate_limiter: Optional[RateLimiter] = rate_limiter
+        self._entities: List[str] = self._missing_entities(list(dict.fromkeys(entities)))
+        self._next_index: int = 0
+        self._prefetched_entities: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._stopped: threading.Event = threading.Event()
+        self._error: Optional[Exception] = None
+        # every thread needs its own relation source, as a source keeps the state of its current request
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._prefetch, args=(relation_source_factory(),), name=str(i), daemon=True)
+            for i in range(threads)]
+
+    def _missing_entities(self, entities: List[str]) -> List[str]:
+        # everything the cache already answers is skipped, which makes an interrupted prefetch resumable
+        known_entities = self._relation_cache.cached(entities) | self._relation_cache.known_empty(entities) | \
+            self._relation_cache.quarantined(entities)
+        missing_entities: List[str] = [entity for entity in entities if entity not in known_entities]
+
+        logging.info(f"{len(entities) - len(missing_entities)} of {len(entities)} entities are already cached")
+        return missing_entities
+
+    def run(self) -> None:
+        if len(self._entities) < 1:
+            return
+
+        start_time: float = time.perf_counter()
+        for worker in self._workers:
+            worker.start()
+
+        try:
+            for worker in self._workers:
+                while worker.is_alive():
+                    worker.join(RelationCachePrefetcher.PROGRESS_INTERVAL)
+                    self._log_progress(start_time)
+        finally:
+            # running requests are completed, so that everything fetched so far ends up in the cache
+            self._stopped.set()
+            for worker in self._workers:
+                worker.join()
+
+        if self._error is not None:
+            raise self._error
+
+    def _prefetch(self, relation_source: AbstractRelationSource) -> None:
+        try:
+            self._prefetch_chunks(relation_source)
+        except Exception as error:
+            # e.g. the endpoint became unavailable, the other workers stop after their current chunk
+            logging.exception("Prefetching failed")
+            with self._lock:
+                if self._error is None:
+                    self._error = error
+            self._stopped.set()
+
+    def _prefetch_chunks(self, relation_source: AbstractRelationSource) -> None:
+        retry: BisectingRetry = BisectingRetry(self._rate_limited(relation_source.relations_for_knowledgebase_ids),
+                                               relation_source.quarantine_knowledgebase_ids,
+                                               relation_source.retry_scope)
+
+        while not self._stopped.is_set():
+            chunk: List[str] = self._next_chunk(relation_source.chunk_size())
+            if len(chunk) < 1:
+                break
+
+            retry.relations_for(chunk)
+            with self._lock:
+                self._prefetched_entities += len(chunk)
+
+        logging.info(str(retry.statistics))
+
+    def _rate_limited(self, retrieve: Callable[[List[str]], List[Relation]]) -> Callable[[List[str]], List[Relation]]:
+        if self._rate_limiter is None:
+            return retrieve
+
+        def rate_limited_retrieve(entities: List[str]) -> List[Relation]:
+            self._rate_limiter.acquire()
+            return retrieve(entities)
+
+        return rate_limited_retrieve
+
+    def _next_chunk(self, chunk_size: int) -> List[str]:
+        with self._lock:
+            chunk: List[str] = self._entities[self._next_index:self._next_index + chunk_size]
+            self._next_index += len(chunk)
+            return chunk
+
+    def _log_progress(self, start_time: float) -> None:
+        with self._lock:
+            prefetched_entities: int = self._prefetched_entities
+
+        seconds: float = time.perf_counter() - start_time
+        logging.info(f"Prefetched {prefetched_entities} of {len(self._entities)} entities "
+                     f"({prefetched_entities / seconds:.1f} entities/s)")
@@ -0,0 +1,471 @@
+import csv
+import fcntl
+import heapq
+import io
+import logging
+import os
+import struct
+import threading
+import time
+import uuid
+import zlib
+from itertools import groupby
+from operator import attrgetter, itemgetter
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, Iterator, Dict, List, Optional, Set, Tuple, TextIO, TypeVar
+
+from Relation.columnar_relations import ColumnarRelations
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+
+T = TypeVar("T")
+
+
+class _Shard:
+
+    def __init__(self, directory: Path):
+        self.directory: Path = directory
+        self.lock: threading.Lock = threading.Lock()
+        # the entity index of every segment of relations, relations are only read once they are requested
+        self.indexes: Dict[str, Dict[str, Tuple[int, int]]] = {}
+        self.marker_segments: Set[str] = set()
+        self.empty_entities: Dict[str, float] = {}
+        self.quarantined_entities: Dict[str, float] = {}
+        self.refreshed_at: float = 0.0
+
+    @property
+    def segments(self) -> Set[str]:
+        return set(self.indexes) | self.marker_segments
+
+    def has_relations(self, entity: str) -> bool:
+        return any(entity in index for index in self.indexes.values())
+
+    def reset_markers(self) -> None:
+        self.marker_segments.clear()
+        self.empty_entities.clear()
+        self.quarantined_entities.clear()
+
+
+class ShardedRelationCache(AbstractRelationCache):
+    DEFAULT_SHARDS = 64
+    SHARDS_FILE = "shards"
+    LOCK_FILE = ".lock"
+    # segments of relations sorted by entity and followed by an entity index of their blocks
+    RELATIONS_SUFFIX = ".relations.icsv"
+    COLUMNAR_RELATIONS_SUFFIX = ".relations.ircol"
+    EMPTY_SUFFIX = ".empty.csv"
+    QUARANTINED_SUFFIX = ".quarantined.csv"
+    # the smallest half of a shard's segments is merged once it consists of this many segments
+    COMPACTION_THRESHOLD = 32
+    DEFAULT_REFRESH_INTERVAL = 1.0
+    # a lookup decodes a single block, which holds the relations of a few entities
+    RELATIONS_PER_BLOCK = 256
+    # magic and offset of the entity index at the end of a segment of relations
+    INDEX_TRAILER = struct.Struct("<4sQ")
+    INDEX_MAGIC = b"SIDX"
+
+    def __init__(self, cache_directory: Path, shards: int = DEFAULT_SHARDS,
+                 empty_entity_ttl: Optional[float] = None, refresh_interval: float = DEFAULT_REFRESH_INTERVAL,
+                 columnar_segments: bool = False):
+        self._cache_directory: Path = cache_directory
+        self._empty_entity_ttl: Optional[float] = empty_entity_ttl
+        self._refresh_interval: float = refresh_interval
+        # segments of either format are read, the format only decides how new segments are written
+        self._columnar_segments: bool = columnar_segments
+        self._cache_directory.mkdir(parents=True, exist_ok=True)
+        self._shards: List[_Shard] = [_Shard(Path(self._cache_directory, f"{index:03d}"))
+                                      for index in range(self._initialize_number_of_shards(shards))]
+
+        for shard in self._shards:
+            shard.directory.mkdir(exist_ok=True)
+
+    def _initialize_number_of_shards(self, shards: int) -> int:
+        # the number of shards is fixed once the directory is created, all later runs have to hash alike
+        shards_file: Path = Path(self._cache_directory, ShardedRelationCache.SHARDS_FILE)
+        if not shards_file.exists():
+            ShardedRelationCache._write_atomically(shards_file, ShardedRelationCache._csv_content([(shards,)]))
+
+        return int(shards_file.read_text())
+
+    def relations_for(self, entities: Iterable[str]) -> Dict[str, List[Relation]]:
+        relations: Dict[str, List[Relation]] = {}
+
+        for shard, shard_entities in self._entities_per_shard(entities).items():
+            with shard.lock:
+                relations.update(self._read_relations(shard, shard_entities))
+
+        return relations
+
+    def cached(self, entities: Iterable[str]) -> Set[str]:
+        cached_entities: Set[str] = set()
+
+        for shard, shard_entities in self._entities_per_shard(entities).items():
+            with shard.lock:
+                self._refresh(shard)
+                cached_entities.update(entity for entity in shard_entities if shard.has_relations(entity))
+
+        return cached_entities
+
+    def add(self, relations: Iterable[Relation]) -> None:
+        relations_per_shard: Dict[_Shard, Dict[str, List[Relation]]] = {}
+        for relation in relations:
+            shard_relations: Dict[str, List[Relation]] = relations_per_shard.setdefault(
+                self._shard(relation.source), {})
+            if relation.source not in shard_relations:
+                shard_relations[relation.source] = []
+
+            shard_relations[relation.source].append(relation)
+
+        for shard, shard_relations in relations_per_shard.items():
+            with shard.lock:
+                self._refresh(shard)
+                new_relations: Dict[str, List[Relation]] = {entity: entity_relations for entity, entity_relations
+                                                            in shard_relations.items()
+                                                            if not shard.has_relations(entity)}
+                if len(new_relations) < 1:
+                    continue
+
+                self._write_relations_segment(shard, sorted(new_relations.items(), key=itemgetter(0)))
+
+            self._compact_if_fragmented(shard)
+
+    def known_empty(self, entities: Iterable[str]) -> Set[str]:
+        oldest_check: float = time.time() - self._empty_entity_ttl if self._empty_entity_ttl is not None else 0.0
+        known_empty_entities: Set[str] = set()
+
+        for shard, shard_entities in self._entities_per_shard(entities).items():
+            with shard.lock:
+                self._refresh(shard)
+                known_empty_entities.update(entity for entity in shard_entities
+                                            if shard.empty_entities.get(entity, -1.0) >= oldest_check)
+
+        return known_empty_entities
+
+    def add_empty(self, entities: Iterable[str]) -> None:
+        self._add_marked_entities(entities, ShardedRelationCache.EMPTY_SUFFIX)
+
+    def quarantined(self, entities: Iterable[str]) -> Set[str]:
+        quarantined_entities: Set[str] = set()
+
+        for shard, shard_entities in self._entities_per_shard(entities).items():
+            with shard.lock:
+                self._refresh(shard)
+                quarantined_entities.update(entity for entity in shard_entities
+                                            if entity in shard.quarantined_entities)
+
+        return quarantined_entities
+
+    def add_quarantined(self, entities: Iterable[str]) -> None:
+        self._add_marked_entities(entities, ShardedRelationCache.QUARANTINED_SUFFIX)
+
+    def clear_quarantined(self) -> int:
+        released: int = 0
+
+        for shard in self._shards:
+            with shard.lock, ShardedRelationCache._shard_file_lock(shard, blocking=True):
+                self._refresh(shard, force=True)
+                released += len(shard.quarantined_entities)
+                for segment in list(shard.marker_segments):
+                    if segment.endswith(ShardedRelationCache.QUARANTINED_SUFFIX):
+                        Path(shard.directory, segment).unlink()
+                        shard.marker_segments.discard(segment)
+                shard.quarantined_entities.clear()
+
+        return released
+
+    def compact(self) -> None:
+        for shard in self._shards:
+            self._compact(shard, blocking=True, merge_all=True)
+
+    def _add_marked_entities(self, entities: Iterable[str], suffix: str) -> None:
+        marked_at: float = time.time()
+
+        for shard, shard_entities in self._entities_per_shard(entities).items():
+            with shard.lock:
+                ShardedRelationCache._write_segment(shard, suffix, [(entity, marked_at) for entity in shard_entities])
+                marked_entities: Dict[str, float] = shard.empty_entities \
+                    if suffix == ShardedRelationCache.EMPTY_SUFFIX else shard.quarantined_entities
+                marked_entities.update((entity, marked_at) for entity in shard_entities)
+
+            self._compact_if_fragmented(shard)
+
+    def _shard(self, entity: str) -> _Shard:
+        # crc32 is stable across processes and hosts, unlike hash()
+        return self._shards[zlib.crc32(entity.encode("utf-8")) % len(self._shards)]
+
+    def _entities_per_shard(self, entities: Iterable[str]) -> Dict[_Shard, Set[str]]:
+        entities_per_shard: Dict[_Shard, Set[str]] = {}
+        for entity in entities:
+            entities_per_shard.setdefault(self._shard(entity), set()).add(entity)
+        return entities_per_shard
+
+    def _refresh(self, shard: _Shard, force: bool = False) -> None:
+        # picks up segments written by other processes, the shard's own writes are applied to it directly
+        if not force and time.monotonic() - shard.refreshed_at < self._refresh_interval:
+            return
+
+        while True:
+            segments: Set[str] = ShardedRelationCache._segments(shard.directory)
+            # segments have been merged by a compaction, their contents are part of a new segment
+            for segment in set(shard.indexes) - segments:
+                del shard.indexes[segment]
+            if not shard.marker_segments <= segments:
+                shard.reset_markers()
+
+            try:
+                for segment in sorted(segments - shard.segments):
+                    ShardedRelationCache._load_segment(shard, segment)
+                break
+            except FileNotFoundError:
+                continue
+
+        shard.refreshed_at = time.monotonic()
+
+    @staticmethod
+    def _segments(directory: Path) -> Set[str]:
+        # temporary and lock files start with a dot, a segment only appears once it is complete
+        return set(entry.name for entry in os.scandir(str(directory)) if not entry.name.startswith("."))
+
+    @staticmethod
+    def _load_segment(shard: _Shard, segment: str) -> None:
+        path: Path = Path(shard.directory, segment)
+        if segment.endswith((ShardedRelationCache.RELATIONS_SUFFIX,
+                             ShardedRelationCache.COLUMNAR_RELATIONS_SUFFIX)):
+            shard.indexes[segment] = ShardedRelationCache._read_index(path)
+            return
+
+        with path.open("r", newline="") as input_stream:
+            rows: List[List[str]] = list(csv.reader(input_stream))
+
+        marked_entities: Dict[str, float] = shard.empty_entities \
+            if segment.endswith(ShardedRelationCache.EMPTY_SUFFIX) else shard.quarantined_entities
+        for entity, marked_at in rows:
+            marked_entities[entity] = max(float(marked_at), marked_entities.get(entity, 0.0))
+        shard.marker_segments.add(segment)
+
+    def _read_relations(self, shard: _Shard, entities: Set[str]) -> Dict[str, List[Relation]]:
+        force: bool = False
+        while True:
+            self._refresh(shard, force)
+            try:
+                return ShardedRelationCache._lookup(shard, entities)
+            except FileNotFoundError:
+                # the segment has been merged by a compaction of another process since the last refresh
+                force = True
+
+    @staticmethod
+    def _lookup(shard: _Shard, entities: Set[str]) -> Dict[str, List[Relation]]:
+        relations: Dict[str, List[Relation]] = {}
+        # every block is read once, however many of the requested entities it holds
+        blocks_per_segment: Dict[str, Dict[Tuple[int, int], Set[str]]] = {}
+        for entity in entities:
+            for segment, index in shard.indexes.items():
+                if entity in index:
+                    blocks_per_segment.setdefault(segment, {}).setdefault(index[entity], set()).add(entity)
+                    break
+
+        for segment, blocks in blocks_per_segment.items():
+            with Path(shard.directory, segment).open("rb") as input_stream:
+                for (offset, length), block_entities in blocks.items():
+                    for relation in ShardedRelationCache._read_block(input_stream, segment, offset, length):
+                        if relation.source in block_entities:
+                            relations.setdefault(relation.source, []).append(relation)
+
+        return relations
+
+    @staticmethod
+    def _read_index(path: Path) -> Dict[str, Tuple[int, int]]:
+        with path.open("rb") as input_stream:
+            input_stream.seek(-ShardedRelationCache.INDEX_TRAILER.size, os.SEEK_END)
+            magic, index_offset = ShardedRelationCache.INDEX_TRAILER.unpack(
+                input_stream.read(ShardedRelationCache.INDEX_TRAILER.size))
+            if magic != ShardedRelationCache.INDEX_MAGIC:
+                raise ValueError(f"Segment {path} does not end with an entity index")
+
+            input_stream.seek(index_offset)
+            content: bytes = input_stream.read()[:-ShardedRelationCache.INDEX_TRAILER.size]
+
+        # every row holds the offset and length of a block followed by the entities it holds
+        index: Dict[str, Tuple[int, int]] = {}
+        for row in csv.reader(io.StringIO(zlib.decompress(content).decode("utf-8"), newline="")):
+            index.update(dict.fromkeys(row[2:], (int(row[0]), int(row[1]))))
+        return index
+
+    @staticmethod
+    def _read_block(input_stream: BinaryIO, segment: str, offset: int, length: int) -> List[Relation]:
+        input_stream.seek(offset)
+        content: bytes = input_stream.read(length)
+        if segment.endswith(ShardedRelationCache.COLUMNAR_RELATIONS_SUFFIX):
+            return next(ColumnarRelations.read_blocks(io.BytesIO(content)))
+
+        return [Relation.from_csv_record(row) for row in csv.reader(io.StringIO(content.decode("utf-8"), newline=""))]
+
+    @staticmethod
+    def _segment_relations(path: Path) -> Iterator[Tuple[str, List[Relation]]]:
+        # the relations of a segment in order of their entities, read one block at a time
+        blocks: List[Tuple[int, int]] = sorted(set(ShardedRelationCache._read_index(path).values()))
+        with path.open("rb") as input_stream:
+            for offset, length in blocks:
+                block: List[Relation] = ShardedRelationCache._read_block(input_stream, path.name, offset, length)
+                for entity, entity_relations in groupby(block, attrgetter("source")):
+                    yield entity, list(entity_relations)
+
+    def _write_relations_segment(self, shard: _Shard, relations: Iterable[Tuple[str, List[Relation]]]) -> str:
+        # the relations have to be sorted by their entity
+        suffix: str = ShardedRelationCache.COLUMNAR_RELATIONS_SUFFIX if self._columnar_segments \
+            else ShardedRelationCache.RELATIONS_SUFFIX
+        segment: str = f"{uuid.uuid4().hex}{suffix}"
+        shard.indexes[segment] = ShardedRelationCache._stream_atomically(
+            Path(shard.directory, segment),
+            lambda output_stream: self._write_indexed_relations(output_stream, relations))
+        return segment
+
+    def _write_indexed_relations(self, output_stream: BinaryIO,
+                                 relations: Iterable[Tuple[str, List[Relation]]]) -> Dict[str, Tuple[int, int]]:
+        blocks: List[Tuple[int, int, List[str]]] = []
+        offset: int = 0
+        block_entities: List[str] = []
+        block: List[Relation] = []
+
+        for entity, entity_relations in relations:
+            block_entities.append(entity)
+            block.extend(entity_relations)
+            if len(block) >= ShardedRelationCache.RELATIONS_PER_BLOCK:
+                blocks.append((offset, output_stream.write(self._encode_block(block)), block_entities))
+                offset += blocks[-1][1]
+                block_entities, block = [], []
+
+        if block_entities:
+            blocks.append((offset, output_stream.write(self._encode_block(block)), block_entities))
+            offset += blocks[-1][1]
+
+        output_stream.write(zlib.compress(ShardedRelationCache._csv_content(
+            [(block_offset, length, *entities) for block_offset, length, entities in blocks])))
+        output_stream.write(ShardedRelationCache.INDEX_TRAILER.pack(ShardedRelationCache.INDEX_MAGIC, offset))
+        return {entity: (block_offset, length) for block_offset, length, entities in blocks for entity in entities}
+
+    def _encode_block(self, relations: List[Relation]) -> bytes:
+        if self._columnar_segments:
+            return ColumnarRelations.encode(relations)
+
+        return ShardedRelationCache._csv_content([(relation.source, relation.name, relation.target)
+                                                  for relation in relations])
+
+    @staticmethod
+    def _write_segment(shard: _Shard, suffix: str, rows: List[Tuple]) -> None:
+        if len(rows) < 1:
+            return
+
+        segment: str = f"{uuid.uuid4().hex}{suffix}"
+        ShardedRelationCache._write_atomically(Path(shard.directory, segment),
+                                               ShardedRelationCache._csv_content(rows))
+        shard.marker_segments.add(segment)
+
+    @staticmethod
+    def _csv_content(rows: List[Tuple]) -> bytes:
+        output_stream: io.StringIO = io.StringIO(newline="")
+        csv.writer(output_stream).writerows(rows)
+        return output_stream.getvalue().encode("utf-8")
+
+    @staticmethod
+    def _write_atomically(path: Path, content: bytes) -> None:
+        ShardedRelationCache._stream_atomically(path, lambda output_stream: output_stream.write(content))
+
+    @staticmethod
+    def _stream_atomically(path: Path, write: Callable[[BinaryIO], T]) -> T:
+        # written under a temporary name and renamed, which is atomic on local and network filesystems
+        temporary_path: Path = Path(path.parent, f".{uuid.uuid4().hex}.tmp")
+        with temporary_path.open("wb") as output_stream:
+            result: T = write(output_stream)
+            output_stream.flush()
+            os.fsync(output_stream.fileno())
+        os.rename(str(temporary_path), str(path))
+        return result
+
+    def _compact_if_fragmented(self, shard: _Shard) -> None:
+        if len(shard.segments) >= ShardedRelationCache.COMPACTION_THRESHOLD:
+            self._compact(shard, blocking=False)
+
+    def _compact(self, shard: _Shard, blocking: bool, merge_all: bool = False) -> None:
+        with shard.lock, ShardedRelationCache._shard_file_lock(shard, blocking) as locked:
+            if not locked:
+                # another process is compacting this shard right now
+                return
+
+            self._refresh(shard, force=True)
+            # merging the smallest segments rewrites every relation only a logarithmic number of times
+            relations_segments: List[str] = sorted(shard.indexes,
+                                                   key=lambda segment: Path(shard.directory, segment).stat().st_size)
+            if not merge_all:
+                relations_segments = relations_segments[:max(2, ShardedRelationCache.COMPACTION_THRESHOLD // 2)]
+
+            merged_segments: List[str] = relations_segments if len(relations_segments) > 1 else []
+            if merged_segments:
+                self._merge_relations_segments(shard, merged_segments)
+            if len(shard.marker_segments) > 2:
+                merged_segments.extend(ShardedRelationCache._merge_marker_segments(shard))
+
+            for segment in merged_segments:
+                Path(shard.directory, segment).unlink()
+
+        if merged_segments:
+            logging.info(f"Merged {len(merged_segments)} segments of relation cache shard {shard.directory.name}")
+
+    def _merge_relations_segments(self, shard: _Shard, segments: List[str]) -> None:
+        sorted_relations: List[Iterator[Tuple[str, List[Relation]]]] = [
+            ShardedRelationCache._segment_relations(Path(shard.directory, segment)) for segment in segments]
+        self._write_relations_segment(shard, ShardedRelationCache._unique_entities(
+            heapq.merge(*sorted_relations, key=itemgetter(0))))
+
+        for segment in segments:
+            del shard.indexes[segment]
+
+    @staticmethod
+    def _unique_entities(relations: Iterable[Tuple[str, List[Relation]]]) -> Iterator[Tuple[str, List[Relation]]]:
+        # an entity's relations are always written at once, another segment holding them is a duplicate
+        previous_entity: Optional[str] = None
+        for entity, entity_relations in relations:
+            if entity != previous_entity:
+                yield entity, entity_relations
+            previous_entity = entity
+
+    @staticmethod
+    def _merge_marker_segments(shard: _Shard) -> List[str]:
+        # entities that turned out to have relations are no longer empty
+        empty_entities: Dict[str, float] = {entity: checked_at for entity, checked_at
+                                            in shard.empty_entities.items() if not shard.has_relations(entity)}
+        merged_segments: List[str] = list(shard.marker_segments)
+        shard.marker_segments.clear()
+        ShardedRelationCache._write_segment(shard, ShardedRelationCache.EMPTY_SUFFIX, list(empty_entities.items()))
+        ShardedRelationCache._write_segment(shard, ShardedRelationCache.QUARANTINED_SUFFIX,
+                                            list(shard.quarantined_entities.items()))
+        shard.empty_entities = empty_entities
+        return merged_segments
+
+    @staticmethod
+    def _shard_file_lock(shard: _Shard, blocking: bool) -> "_ShardFileLock":
+        return _ShardFileLock(Path(shard.directory, ShardedRelationCache.LOCK_FILE), blocking)
+
+
+class _ShardFileLock:
+
+    def __init__(self, path: Path, blocking: bool):
+        self._path: Path = path
+        self._blocking: bool = blocking
+        self._file: Optional[TextIO] = None
+
+    def __enter__(self) -> bool:
+        # only compactions lock a shard, writers never wait as every segment is published atomically
+        self._file = self._path.open("a")
+        try:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX | (0 if self._blocking else fcntl.LOCK_NB))
+        except BlockingIOError:
+            self._file.close()
+            self._file = None
+            return False
+        return True
+
+    def __exit__(self, exception_type, exception, traceback):
+        if self._file is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            self._file.close()
@@ -0,0 +1,206 @@
+import csv
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Iterable, Dict, List, Optional, Iterator, Tuple, Set
+
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+
+
+class SqliteRelationCache(AbstractRelationCache):
+    DEFAULT_CACHE_FILE = Path(os.path.dirname(os.path.abspath(__file__)), "..", ".cached_relations.sqlite")
+    LEGACY_CACHE_FILE = Path(os.path.dirname(os.path.abspath(__file__)), "..", ".cached_relations.csv")
+    MAX_QUERY_PARAMETERS = 900
+    IMPORT_BATCH_SIZE = 50000
+    LEGACY_IMPORT_MARKER = "legacy_cache_imported"
+
+    def __init__(self, cache_file: Path = DEFAULT_CACHE_FILE, legacy_cache_file: Optional[Path] = LEGACY_CACHE_FILE,
+                 empty_entity_ttl: Optional[float] = None):
+        self._cache_file: Path = cache_file
+        self._empty_entity_ttl: Optional[float] = empty_entity_ttl
+        self._local: threading.local = threading.local()
+        self._connections: List[sqlite3.Connection] = []
+        self._connections_lock: threading.Lock = threading.Lock()
+        self._write_lock: threading.Lock = threading.Lock()
+
+        self._initialize_schema(legacy_cache_file)
+
+    def _connection(self) -> sqlite3.Connection:
+        connection: Optional[sqlite3.Connection] = getattr(self._local, "connection", None)
+        if connection is not None:
+            return connection
+
+        connection = sqlite3.connect(str(self._cache_file), timeout=60, check_same_thread=False)
+        connection.execute("PRAGMA journal_mode=WAL")
+        connection.execute("PRAGMA synchronous=NORMAL")
+        self._local.connection = connection
+
+        with self._connections_lock:
+            self._connections.append(connection)
+        return connection
+
+    def _initialize_schema(self, legacy_cache_file: Optional[Path]) -> None:
+        self._cache_file.parent.mkdir(parents=True, exist_ok=True)
+        connection: sqlite3.Connection = self._connection()
+
+        with self._write_lock, connection:
+            # the schema, the legacy import and its completion marker are created in one transaction
+            connection.execute("BEGIN IMMEDIATE")
+            connection.execute("CREATE TABLE IF NOT EXISTS relations (source TEXT NOT NULL, name TEXT NOT NULL, "
+                               "target TEXT NOT NULL)")
+            # the unique index starts with the source, thus it also serves the lookups by source
+            connection.execute("CREATE UNIQUE INDEX IF NOT EXISTS relations_unique ON relations (source, name, target)")
+            connection.execute("CREATE TABLE IF NOT EXISTS empty_entities (entity TEXT PRIMARY KEY, "
+                               "checked_at REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS quarantined_entities (entity TEXT PRIMARY KEY, "
+                               "quarantined_at REAL NOT NULL)")
+            connection.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)")
+
+            imported: bool = connection.execute("SELECT 1 FROM meta WHERE key = ?",
+                                                (SqliteRelationCache.LEGACY_IMPORT_MARKER,)).fetchone() is not None
+            if not imported:
+                if legacy_cache_file is not None and legacy_cache_file.exists():
+                    self._import_legacy_cache(connection, legacy_cache_file)
+                connection.execute("INSERT INTO meta (key, value) VALUES (?, '1')",
+                                   (SqliteRelationCache.LEGACY_IMPORT_MARKER,))
+
+    @staticmethod
+    def _import_legacy_cache(connection: sqlite3.Connection, legacy_cache_file: Path) -> None:
+        logging.info(f"Importing legacy relation cache {legacy_cache_file}...")
+        imported: int = 0
+
+        with legacy_cache_file.open("r") as input_stream:
+            csv_reader: Iterator[List[str]] = csv.reader(input_stream)
+            next(csv_reader, None)  # skip header
+
+            batch: List[Tuple[str, str, str]] = []
+            for row in csv_reader:
+                if not row:
+                    continue  # ignore blank lines
+
+                relation: Relation = Relation.from_csv_record(row)
+                batch.append((relation.source, relation.name, relation.target))
+                if len(batch) >= SqliteRelationCache.IMPORT_BATCH_SIZE:
+                    SqliteRelationCache._insert_relations(connection, batch)
+                    imported += len(batch)
+                    batch = []
+
+            SqliteRelationCache._insert_relations(connection, batch)
+            imported += len(batch)
+
+        logging.info(f"Done importing legacy relation cache... {imported} relations imported")
+
+    def relations_for(self, entities: Iterable[str]) -> Dict[str, List[Relation]]:
+        relations: Dict[str, List[Relation]] = {}
+        connection: sqlite3.Connection = self._connection()
+
+        for chunk in SqliteRelationCache._chunks(list(set(entities))):
+            # in insertion order, the unique index would return them sorted, which breaks ties unlike a cold run
+            rows: Iterable[Tuple[str, str, str]] = connection.execute(
+                f"SELECT source, name, target FROM relations WHERE source IN ({','.join('?' * len(chunk))}) "
+                f"ORDER BY rowid", chunk)
+
+            for source, name, target in rows:
+                if source not in relations:
+                    relations[source] = []
+
+                relations[source].append(Relation(source, name, target))
+
+        return relations
+
+    def add(self, relations: Iterable[Relation]) -> None:
+        rows: List[Tuple[str, str, str]] = [(relation.source, relation.name, relation.target) for relation in relations]
+        if len(rows) < 1:
+            return
+
+        connection: sqlite3.Connection = self._connection()
+        with self._write_lock, connection:
+            SqliteRelationCache._insert_relations(connection, rows)
+
+    def cached(self, entities: Iterable[str]) -> Set[str]:
+        cached_entities: Set[str] = set()
+        connection: sqlite3.Connection = self._connection()
+
+        for chunk in SqliteRelationCache._chunks(list(set(entities))):
+            rows: Iterable[Tuple[str]] = connection.execute(
+                f"SELECT DISTINCT source FROM relations WHERE source IN ({','.join('?' * len(chunk))})", chunk)
+            cached_entities.update(entity for entity, in rows)
+
+        return cached_entities
+
+    def known_empty(self, entities: Iterable[str]) -> Set[str]:
+        known_empty_entities: Set[str] = set()
+        connection: sqlite3.Connection = self._connection()
+        oldest_check: float = time.time() - self._empty_entity_ttl if self._empty_entity_ttl is not None else 0.0
+
+        for chunk in SqliteRelationCache._chunks(list(set(entities))):
+            rows: Iterable[Tuple[str]] = connection.execute(
+                f"SELECT entity FROM empty_entities WHERE checked_at >= ? AND entity IN ({','.join('?' * len(chunk))})",
+                [oldest_check] + chunk)
+            known_empty_entities.update(entity for entity, in rows)
+
+        return known_empty_entities
+
+    def add_empty(self, entities: Iterable[str]) -> None:
+        checked_at: float = time.time()
+        rows: List[Tuple[str, float]] = [(entity, checked_at) for entity in entities]
+        if len(rows) < 1:
+            return
+
+        connection: sqlite3.Connection = self._connection()
+        with self._write_lock, connection:
+            connection.executemany("INSERT OR REPLACE INTO empty_entities (entity, checked_at) VALUES (?, ?)", rows)
+
+    def quarantined(self, entities: Iterable[str]) -> Set[str]:
+        quarantined_entities: Set[str] = set()
+        connection: sqlite3.Connection = self._connection()
+
+        for chunk in SqliteRelationCache._chunks(list(set(entities))):
+            rows: Iterable[Tuple[str]] = connection.execute(
+                f"SELECT entity FROM quarantined_entities WHERE entity IN ({','.join('?' * len(chunk))})", chunk)
+            quarantined_entities.update(entity for entity, in rows)
+
+        return quarantined_entities
+
+    def add_quarantined(self, entities: Iterable[str]) -> None:
+        quarantined_at: float = time.time()
+        rows: List[Tuple[str, float]] = [(entity, quarantined_at) for entity in entities]
+        if len(rows) < 1:
+            return
+
+        connection: sqlite3.Connection = self._connection()
+        with self._write_lock, connection:
+            connection.executemany("INSERT OR REPLACE INTO quarantined_entities (entity, quarantined_at) "
+                                   "VALUES (?, ?)", rows)
+
+    def clear_quarantined(self) -> int:
+        connection: sqlite3.Connection = self._connection()
+        with self._write_lock, connection:
+            return connection.execute("DELETE FROM quarantined_entities").rowcount
+
+    def flush(self) -> None:
+        connection: sqlite3.Connection = self._connection()
+        with self._write_lock:
+            connection.execute("PRAGMA wal_checkpoint(FULL)")
+
+    def close(self) -> None:
+        self.flush()
+
+        with self._connections_lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections.clear()
+        self._local = threading.local()
+
+    @staticmethod
+    def _insert_relations(connection: sqlite3.Connection, rows: List[Tuple[str, str, str]]) -> None:
+        connection.executemany("INSERT OR IGNORE INTO relations (source, name, target) VALUES (?, ?, ?)", rows)
+
+    @staticmethod
+    def _chunks(entities: List[str]) -> Iterator[List[str]]:
+        for index in range(0, len(entities), SqliteRelationCache.MAX_QUERY_PARAMETERS):
+            yield entities[index:index + SqliteRelationCache.MAX_QUERY_PARAMETERS]
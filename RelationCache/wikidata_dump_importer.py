@@ -0,0 +1,118 @@
+import logging
+import multiprocessing
+import sqlite3
+import tempfile
+import threading
+from pathlib import Path
+from typing import Set, List, Iterator, Iterable, Tuple, Dict, Optional
+
+from FileParser.WikidataDumpParsing.wikidata_dump_parser import AbstractWikidataDumpParser, Statement
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from util.utils import bounded
+
+_worker_parser: Optional[AbstractWikidataDumpParser] = None
+_worker_ids: Set[str] = set()
+
+
+def _initialize_worker(parser: AbstractWikidataDumpParser, ids: Set[str]) -> None:
+    global _worker_parser, _worker_ids
+    _worker_parser = parser
+    _worker_ids = ids
+
+
+def _parse_statements(lines: List[bytes]) -> Tuple[List[Statement], Set[str]]:
+    return _worker_parser.parse_statements(lines, _worker_ids)
+
+
+def _parse_labels(lines: List[bytes]) -> Dict[str, str]:
+    return _worker_parser.parse_labels(lines, _worker_ids)
+
+
+class WikidataDumpImporter:
+    BATCHES_IN_FLIGHT_PER_PROCESS = 4
+    RELATIONS_PER_WRITE = 100000
+
+    def __init__(self, dump_parser: AbstractWikidataDumpParser, entities: Set[str],
+                 relation_cache: AbstractRelationCache, processes: int):
+        self._dump_parser: AbstractWikidataDumpParser = dump_parser
+        self._entities: Set[str] = entities
+        self._relation_cache: AbstractRelationCache = relation_cache
+        self._processes: int = processes
+
+    def run(self) -> None:
+        with tempfile.TemporaryDirectory() as temporary_directory:
+            # intermediate statements and labels are kept on disk, so memory does not grow with the dump
+            connection: sqlite3.Connection = sqlite3.connect(str(Path(temporary_directory, "import.sqlite")))
+            connection.execute("CREATE TABLE statements (source TEXT, property TEXT, value TEXT, is_entity INTEGER)")
+            connection.execute("CREATE TABLE found_entities (entity TEXT PRIMARY KEY)")
+            connection.execute("CREATE TABLE labels (id TEXT PRIMARY KEY, label TEXT)")
+
+            try:
+                logging.info(f"Collecting statements of {len(self._entities)} entities...")
+                self._collect_statements(connection)
+
+                logging.info("Collecting labels of properties and values...")
+                self._collect_labels(connection)
+
+                logging.info("Writing relations...")
+                self._write_relations(connection)
+            finally:
+                connection.close()
+
+        self._relation_cache.flush()
+
+    def _collect_statements(self, connection: sqlite3.Connection) -> None:
+        for statements, found_entities in self._parse_in_parallel(_parse_statements, self._entities):
+            with connection:
+                connection.executemany("INSERT INTO statements VALUES (?, ?, ?, ?)", statements)
+                connection.executemany("INSERT OR IGNORE INTO found_entities VALUES (?)",
+                                       ((entity,) for entity in found_entities))
+
+    def _collect_labels(self, connection: sqlite3.Connection) -> None:
+        ids: Set[str] = set(row[0] for row in connection.execute(
+            "SELECT property FROM statements UNION SELECT value FROM statements WHERE is_entity"))
+        logging.info(f"Resolving labels of {len(ids)} properties and values...")
+
+        for labels in self._parse_in_parallel(_parse_labels, ids):
+            with connection:
+                connection.executemany("INSERT OR REPLACE INTO labels VALUES (?, ?)", labels.items())
+
+    def _write_relations(self, connection: sqlite3.Connection) -> None:
+        # unresolved labels fall back to the id, just like the wikibase:label service does
+        rows: Iterable[Tuple[str, str, str]] = connection.execute(
+            "SELECT DISTINCT statements.source, COALESCE(property_labels.label, statements.property), "
+            "CASE WHEN statements.is_entity THEN COALESCE(value_labels.label, statements.value) "
+            "ELSE statements.value END "
+            "FROM statements "
+            "LEFT JOIN labels AS property_labels ON property_labels.id = statements.property "
+            "LEFT JOIN labels AS value_labels ON value_labels.id = statements.value")
+
+        written: int = 0
+        batch: List[Relation] = []
+        for source, name, target in rows:
+            batch.append(Relation(source, name, target))
+            if len(batch) >= WikidataDumpImporter.RELATIONS_PER_WRITE:
+                self._relation_cache.add(batch)
+                written += len(batch)
+                batch = []
+
+        self._relation_cache.add(batch)
+        written += len(batch)
+
+        empty_entities: List[str] = [row[0] for row in connection.execute(
+            "SELECT entity FROM found_entities WHERE entity NOT IN (SELECT source FROM statements)")]
+        self._relation_cache.add_empty(empty_entities)
+        logging.info(f"Wrote {written} relations and {len(empty_entities)} entities without relations")
+
+    def _parse_in_parallel(self, parse, ids: Set[str]) -> Iterator:
+        context = multiprocessing.get_context("fork") if "fork" in multiprocessing.get_all_start_methods() \
+            else multiprocessing.get_context()
+        # the pool would otherwise read the whole dump into its task queue
+        batches_in_flight: threading.BoundedSemaphore = threading.BoundedSemaphore(
+            self._processes * WikidataDumpImporter.BATCHES_IN_FLIGHT_PER_PROCESS)
+
+        with context.Pool(self._processes, initializer=_initialize_worker, initargs=(self._dump_parser, ids)) as pool:
+            for result in pool.imap_unordered(parse, bounded(self._dump_parser.batches(), batches_in_flight)):
+                batches_in_flight.release()
+                yield result
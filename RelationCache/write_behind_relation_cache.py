@@ -0,0 +1,170 @@
+import logging
+import threading
+from typing import Iterable, Dict, List, Optional, Set
+
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+
+
+class WriteBehindRelationCache(AbstractRelationCache):
+    DEFAULT_MAX_PENDING_RELATIONS = 100000
+    DEFAULT_FLUSH_INTERVAL = 10.0
+    DEFAULT_HIGH_WATER_MARK = 4 * DEFAULT_MAX_PENDING_RELATIONS
+
+    def __init__(self, relation_cache: AbstractRelationCache,
+                 max_pending_relations: int = DEFAULT_MAX_PENDING_RELATIONS,
+                 flush_interval: float = DEFAULT_FLUSH_INTERVAL, high_water_mark: int = DEFAULT_HIGH_WATER_MARK):
+        self._relation_cache: AbstractRelationCache = relation_cache
+        self._max_pending_relations: int = max_pending_relations
+        self._flush_interval: float = flush_interval
+        self._high_water_mark: int = max(high_water_mark, max_pending_relations)
+        self._condition: threading.Condition = threading.Condition()
+        self._pending_relations: Dict[str, List[Relation]] = {}
+        self._number_of_pending_relations: int = 0
+        self._in_flight_relations: Dict[str, List[Relation]] = {}
+        self._pending_empty_entities: Set[str] = set()
+        self._in_flight_empty_entities: Set[str] = set()
+        self._requested_flushes: int = 0
+        self._completed_flushes: int = 0
+        self._closed: bool = False
+        self._error: Optional[Exception] = None
+
+        self._writer: threading.Thread = threading.Thread(target=self._write_behind, name="cache-writer", daemon=True)
+        self._writer.start()
+
+    def relations_for(self, entities: Iterable[str]) -> Dict[str, List[Relation]]:
+        requested_entities: Set[str] = set(entities)
+        relations: Dict[str, List[Relation]] = {}
+
+        # an entity's relations are always added at once, so they are either buffered here or already persisted
+        with self._condition:
+            for entity in requested_entities:
+                if entity in self._pending_relations:
+                    relations[entity] = list(self._pending_relations[entity])
+                elif entity in self._in_flight_relations:
+                    relations[entity] = list(self._in_flight_relations[entity])
+
+        relations.update(self._relation_cache.relations_for(requested_entities - relations.keys()))
+        return relations
+
+    def add(self, relations: Iterable[Relation]) -> None:
+        with self._condition:
+            # the writer fell behind, callers wait instead of buffering an unbounded number of relations
+            while self._number_of_pending_relations >= self._high_water_mark and self._error is None and \
+                    self._writer.is_alive():
+                self._condition.wait()
+            self._raise_write_error()
+
+            for relation in relations:
+                if relation.source not in self._pending_relations:
+                    self._pending_relations[relation.source] = []
+
+                self._pending_relations[relation.source].append(relation)
+                self._number_of_pending_relations += 1
+
+            if self._number_of_pending_relations >= self._max_pending_relations:
+                self._condition.notify_all()
+
+    def cached(self, entities: Iterable[str]) -> Set[str]:
+        requested_entities: Set[str] = set(entities)
+
+        with self._condition:
+            cached_entities: Set[str] = requested_entities & (self._pending_relations.keys() |
+                                                              self._in_flight_relations.keys())
+
+        return cached_entities | self._relation_cache.cached(requested_entities - cached_entities)
+
+    def known_empty(self, entities: Iterable[str]) -> Set[str]:
+        requested_entities: Set[str] = set(entities)
+
+        with self._condition:
+            known_empty_entities: Set[str] = requested_entities & (self._pending_empty_entities |
+                                                                   self._in_flight_empty_entities)
+
+        return known_empty_entities | self._relation_cache.known_empty(requested_entities - known_empty_entities)
+
+    def add_empty(self, entities: Iterable[str]) -> None:
+        with self._condition:
+            self._pending_empty_entities.update(entities)
+
+    def quarantined(self, entities: Iterable[str]) -> Set[str]:
+        return self._relation_cache.quarantined(entities)
+
+    def add_quarantined(self, entities: Iterable[str]) -> None:
+        # quarantined entities are rare, thus they are written through
+        self._relation_cache.add_quarantined(entities)
+
+    def clear_quarantined(self) -> int:
+        return self._relation_cache.clear_quarantined()
+
+    def flush(self) -> None:
+        with self._condition:
+            self._requested_flushes += 1
+            requested_flush: int = self._requested_flushes
+            self._condition.notify_all()
+
+            while self._completed_flushes < requested_flush and self._writer.is_alive():
+                self._condition.wait()
+            self._raise_write_error()
+
+    def close(self) -> None:
+        try:
+            self.flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+
+            self._writer.join()
+            self._relation_cache.close()
+
+    def _raise_write_error(self) -> None:
+        # relations which failed to be written are lost, thus every later add, flush and close fails as well
+        if self._error is not None:
+            raise self._error
+
+    def _write_behind(self) -> None:
+        while True:
+            with self._condition:
+                if self._completed_flushes == self._requested_flushes and not self._closed and \
+                        self._number_of_pending_relations < self._max_pending_relations:
+                    self._condition.wait(self._flush_interval)
+
+                requested_flush: int = self._requested_flushes
+                closed: bool = self._closed
+                self._in_flight_relations = self._pending_relations
+                self._pending_relations = {}
+                self._number_of_pending_relations = 0
+                self._in_flight_empty_entities = self._pending_empty_entities
+                self._pending_empty_entities = set()
+                self._condition.notify_all()
+
+            self._write_in_flight_relations(requested_flush > self._completed_flushes)
+
+            with self._condition:
+                self._in_flight_relations = {}
+                self._in_flight_empty_entities = set()
+                self._completed_flushes = requested_flush
+                self._condition.notify_all()
+
+            if closed:
+                return
+
+    def _write_in_flight_relations(self, durable: bool) -> None:
+        try:
+            if self._in_flight_relations:
+                batch: List[Relation] = [relation for relations in self._in_flight_relations.values()
+                                         for relation in relations]
+                self._relation_cache.add(batch)
+                logging.info(f"Flushed {len(batch)} relations to the relation cache")
+
+            if self._in_flight_empty_entities:
+                self._relation_cache.add_empty(self._in_flight_empty_entities)
+
+            if durable:
+                self._relation_cache.flush()
+        except Exception as error:
+            logging.exception("Failed to flush relations to the relation cache")
+            with self._condition:
+                if self._error is None:
+                    self._error = error
@@ -1,19 +1,71 @@
+import contextlib
 from abc import ABC, abstractmethod
-from typing import List
+from typing import ContextManager, List
 
 from Relation.relation import Relation
-from util.utils import measure
+from Relation.relation_metrics import RelationMetrics
+from util.metrics import metrics
+
+
+class RelationSourceError(Exception):
+    pass
+
+
+class RelationSourceUnavailableError(RelationSourceError):
+    # the source could not be reached or is overloaded, which says nothing about the requested entities
+    pass
 
 
 class AbstractRelationSource(ABC):
 
     def relations_for(self, entities) -> List[Relation]:
-        return measure(f"Retrieving relations for {len(entities)} entities", self._retrieve_relations_for, entities)
+        with metrics.timer("relation_source_seconds"):
+            relations: List[Relation] = self._retrieve_relations_for(entities)
+
+        metrics.increment("relation_source_entities_total", len(entities))
+        metrics.increment("relation_source_relations_total", len(relations))
+        return relations
+
+    def aggregate_relations_for(self, entities, relation_metrics: RelationMetrics) -> None:
+        with metrics.timer("relation_source_seconds"):
+            number_of_relations: int = self._aggregate_relations_for(entities, relation_metrics)
+
+        metrics.increment("relation_source_entities_total", len(entities))
+        metrics.increment("relation_source_relations_total", number_of_relations)
+
+    def relations_for_knowledgebase_ids(self, knowledgebase_ids) -> List[Relation]:
+        with metrics.timer("relation_source_seconds"):
+            relations: List[Relation] = self._retrieve_relations_for_knowledgebase_ids(knowledgebase_ids)
+
+        metrics.increment("relation_source_entities_total", len(knowledgebase_ids))
+        metrics.increment("relation_source_relations_total", len(relations))
+        return relations
+
+    def quarantine(self, entities) -> None:
+        # sources without remote requests never fail, so there is nothing to quarantine
+        pass
+
+    def quarantine_knowledgebase_ids(self, knowledgebase_ids) -> None:
+        pass
+
+    def retry_scope(self) -> ContextManager:
+        # sources without remote requests have no request controller which could take retries into account
+        return contextlib.nullcontext()
+
+    def _aggregate_relations_for(self, entities, relation_metrics: RelationMetrics) -> int:
+        # sources which receive their relations piecemeal override this to aggregate them as they arrive
+        relations: List[Relation] = self._retrieve_relations_for(entities)
+        relation_metrics.add_relations(relations)
+        return len(relations)
 
     @abstractmethod
     def _retrieve_relations_for(self, entities) -> List[Relation]:
         raise NotImplementedError
 
+    @abstractmethod
+    def _retrieve_relations_for_knowledgebase_ids(self, knowledgebase_ids) -> List[Relation]:
+        raise NotImplementedError
+
     @abstractmethod
     def chunk_size(self) -> int:
         raise NotImplementedError
@@ -0,0 +1,115 @@
+import asyncio
+import gzip
+import json
+import ssl
+import urllib.parse
+from typing import List, Dict, Optional, Tuple
+
+
+class SparqlRequestError(Exception):
+
+    @staticmethod
+    def for_status(status: int) -> "SparqlRequestError":
+        error_type = SparqlUnavailableError if status in SparqlUnavailableError.STATUSES else SparqlRequestError
+        return error_type(f"SPARQL endpoint responded with status {status}")
+
+
+class SparqlUnavailableError(SparqlRequestError):
+    # the endpoint could not be reached or is overloaded, any other query would have failed just as well
+    STATUSES = (429, 502, 503, 504)
+
+
+class AsyncSparqlClient:
+    USER_AGENT = "cluster_interpreter/1.0 (https://github.com/mpss2019fn1/cluster_interpreter)"
+    DEFAULT_TIMEOUT = 60.0
+
+    def __init__(self, url: str, timeout: float = DEFAULT_TIMEOUT):
+        self._url: urllib.parse.SplitResult = urllib.parse.urlsplit(url)
+        self._timeout: float = timeout
+        self._ssl_context: Optional[ssl.SSLContext] = \
+            ssl.create_default_context() if self._url.scheme == "https" else None
+        self._port: int = self._url.port or (443 if self._ssl_context else 80)
+        self._idle_connections: List[Tuple[asyncio.StreamReader, asyncio.StreamWriter]] = []
+
+    async def query(self, query: str) -> List[Dict[str, str]]:
+        body: bytes = await asyncio.wait_for(self._post(urllib.parse.urlencode({"query": query}).encode()),
+                                             self._timeout)
+        bindings: List[Dict[str, Dict[str, str]]] = json.loads(body)["results"]["bindings"]
+        return [{name: value["value"] for name, value in binding.items()} for binding in bindings]
+
+    async def close(self) -> None:
+        while self._idle_connections:
+            _, writer = self._idle_connections.pop()
+            writer.close()
+
+    async def _post(self, payload: bytes) -> bytes:
+        while self._idle_connections:
+            reader, writer = self._idle_connections.pop()
+            try:
+                return await self._exchange(reader, writer, payload)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()  # stale keep-alive connection, try the next one
+            except BaseException:
+                writer.close()
+                raise
+
+        reader, writer = await asyncio.open_connection(self._url.hostname, self._port, ssl=self._ssl_context)
+        try:
+            return await self._exchange(reader, writer, payload)
+        except BaseException:
+            writer.close()
+            raise
+
+    async def _exchange(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter, payload: bytes) -> bytes:
+        path: str = self._url.path or "/"
+        writer.write((f"POST {path} HTTP/1.1\r\n"
+                      f"Host: {self._url.netloc}\r\n"
+                      f"User-Agent: {AsyncSparqlClient.USER_AGENT}\r\n"
+                      f"Accept: application/sparql-results+json\r\n"
+                      f"Accept-Encoding: gzip\r\n"
+                      f"Content-Type: application/x-www-form-urlencoded\r\n"
+                      f"Content-Length: {len(payload)}\r\n"
+                      f"Connection: keep-alive\r\n\r\n").encode("latin-1") + payload)
+        await writer.drain()
+
+        status_line: bytes = await reader.readuntil(b"\r\n")
+        status: int = int(status_line.split(b" ", 2)[1])
+        headers: Dict[str, str] = {}
+        while True:
+            line: bytes = await reader.readuntil(b"\r\n")
+            if line == b"\r\n":
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if headers.get("transfer-encoding", "").lower() == "chunked":
+            body: bytes = await AsyncSparqlClient._read_chunked(reader)
+        elif "content-length" in headers:
+            body = await reader.readexactly(int(headers["content-length"]))
+        else:
+            body = await reader.read()
+            headers["connection"] = "close"
+
+        if status != 200:
+            raise SparqlRequestError.for_status(status)
+
+        if headers.get("connection", "").lower() == "close":
+            writer.close()
+        else:
+            self._idle_connections.append((reader, writer))
+
+        if headers.get("content-encoding", "").lower() == "gzip":
+            body = gzip.decompress(body)
+        return body
+
+    @staticmethod
+    async def _read_chunked(reader: asyncio.StreamReader) -> bytes:
+        chunks: List[bytes] = []
+        while True:
+            size: int = int((await reader.readuntil(b"\r\n")).split(b";")[0], 16)
+            if size == 0:
+                await reader.readuntil(b"\r\n")  # trailing CRLF, trailers are not supported
+                return b"".join(chunks)
+
+            chunks.append(await reader.readexactly(size))
+            await reader.readexactly(2)
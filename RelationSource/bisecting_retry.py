@@ -0,0 +1,112 @@
+import contextlib
+import logging
+import threading
+from typing import Callable, ContextManager, Generic, List, Optional, Tuple, TypeVar
+
+from RelationSource.abstract_relation_source import RelationSourceError, RelationSourceUnavailableError
+
+T = TypeVar("T")
+
+
+class BisectionStatistics:
+
+    def __init__(self):
+        self.succeeded: int = 0
+        self.splits: int = 0
+        self.dropped: int = 0
+        self.skipped: int = 0
+
+    def __str__(self):
+        return f"{self.succeeded} chunks succeeded, {self.splits} failed chunks split, " \
+               f"{self.dropped} entities dropped, {self.skipped} entities skipped while the source was unavailable"
+
+
+class OutageDetector:
+    # an outage fails every chunk, an overloaded endpoint or a lost connection only a few of them
+    MAX_UNAVAILABLE_CHUNKS = 3
+
+    def __init__(self):
+        self._lock: threading.Lock = threading.Lock()
+        self._unavailable_chunks: int = 0
+
+    def record_success(self) -> None:
+        with self._lock:
+            self._unavailable_chunks = 0
+
+    def record_unavailable(self, error: RelationSourceUnavailableError) -> None:
+        with self._lock:
+            self._unavailable_chunks += 1
+            if self._unavailable_chunks >= OutageDetector.MAX_UNAVAILABLE_CHUNKS:
+                raise error
+
+
+class BisectingRetry(Generic[T]):
+    MAX_NUMBER_OF_RETRIES = 3
+
+    def __init__(self, retrieve: Callable[[List[str]], List[T]], quarantine: Callable[[List[str]], None],
+                 scope: Callable[[], ContextManager] = contextlib.nullcontext,
+                 outage_detector: Optional[OutageDetector] = None,
+                 skip: Optional[Callable[[List[str]], None]] = None):
+        self._retrieve: Callable[[List[str]], List[T]] = retrieve
+        self._quarantine: Callable[[List[str]], None] = quarantine
+        # every chunk and the retries of its parts are retrieved within one scope
+        self._scope: Callable[[], ContextManager] = scope
+        # shared by all chunks of a worker, only unavailability across several chunks aborts the worker
+        self._outage_detector: OutageDetector = outage_detector or OutageDetector()
+        # receives the entities which were neither retrieved nor quarantined, they are requested again next time
+        self._skip: Optional[Callable[[List[str]], None]] = skip
+        self.statistics: BisectionStatistics = BisectionStatistics()
+
+    def relations_for(self, entities: List[str]) -> List[T]:
+        with self._scope():
+            return self._bisect(entities)
+
+    def _bisect(self, entities: List[str]) -> List[T]:
+        # failed chunks are halved until the failing entities are isolated, so they do not drop the whole chunk
+        relations: List[T] = []
+        pending: List[List[str]] = [entities]
+
+        while pending:
+            chunk: List[str] = pending.pop()
+            failed_attempts: int = 0
+            while True:
+                try:
+                    relations.extend(self._retrieve(chunk))
+                except RelationSourceUnavailableError as error:
+                    # splitting does not help when the source is unreachable or overloaded, the chunk is retried
+                    logging.info(str(error))
+                    failed_attempts += 1
+                    if failed_attempts >= BisectingRetry.MAX_NUMBER_OF_RETRIES:
+                        self._skip_unavailable([chunk] + pending, error)
+                        return relations
+                    continue
+                except RelationSourceError as error:
+                    # e.g. the query timed out, which is caused by the requested entities
+                    logging.info(str(error))
+                    failed_attempts += 1
+                    if len(chunk) > 1:
+                        middle: int = len(chunk) // 2
+                        pending.append(chunk[middle:])
+                        pending.append(chunk[:middle])
+                        self.statistics.splits += 1
+                    elif failed_attempts >= BisectingRetry.MAX_NUMBER_OF_RETRIES:
+                        self._quarantine(chunk)
+                        self.statistics.dropped += 1
+                    else:
+                        continue
+                    break
+
+                self.statistics.succeeded += 1
+                self._outage_detector.record_success()
+                break
+
+        return relations
+
+    def _skip_unavailable(self, chunks: List[List[str]], error: RelationSourceUnavailableError) -> None:
+        skipped_entities: List[str] = [entity for chunk in chunks for entity in chunk]
+        self.statistics.skipped += len(skipped_entities)
+        self._outage_detector.record_unavailable(error)
+
+        logging.warning(f"Skipping {len(skipped_entities)} entities, the source is unavailable: {error}")
+        if self._skip is not None:
+            self._skip(skipped_entities)
@@ -1,178 +1,200 @@
-import csv
 import logging
-import os
-import threading
-from pathlib import Path
-from typing import List, Dict, Iterator, Generator, Any, Iterable, Optional
+import urllib.error
+from typing import List, Dict, Any, Iterable, Set, Optional, Tuple, Callable, ContextManager
+
+import requests
 
 from EntityLinking.entity_linkings import EntityLinkings
 from Relation.relation import Relation
-from RelationSource.abstract_relation_source import AbstractRelationSource
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationSource.abstract_relation_source import AbstractRelationSource, RelationSourceError, \
+    RelationSourceUnavailableError
+from RelationSource.async_sparql_client import SparqlRequestError, SparqlUnavailableError
+from RelationSource.request_controller import RequestController
+from RelationSource.sparql_session import SparqlSession, SparqlTimeoutError
 from resources import constant
+from util.metrics import metrics
 from wikidata_endpoint import WikidataEndpoint, WikidataRequestExecutor
 
 
 class CachingWikidataRelationSource(AbstractRelationSource):
     DEFAULT_CHUNK_SIZE = 500
 
-    def __init__(self, linkings: EntityLinkings, wikidata_endpoint: WikidataEndpoint):
+    def __init__(self, linkings: EntityLinkings, wikidata_endpoint: WikidataEndpoint,
+                 relation_cache: AbstractRelationCache, request_controller: RequestController,
+                 sparql_session: Optional[SparqlSession] = None):
         self._linkings: EntityLinkings = linkings
         self._wikidata_endpoint: WikidataEndpoint = wikidata_endpoint
-        self._chunk_size: int = CachingWikidataRelationSource.DEFAULT_CHUNK_SIZE
+        self._relation_cache: AbstractRelationCache = relation_cache
+        self._request_controller: RequestController = request_controller
+        # streams the responses through a shared keep-alive session instead of the endpoint's request executor
+        self._sparql_session: Optional[SparqlSession] = sparql_session
+        self._request_failed: bool = False
+        self._request_timed_out: bool = False
+        self._request_unavailable: bool = False
 
     def _retrieve_relations_for(self, embedding_tags: List[str]) -> List[Relation]:
-        self._chunk_size = len(embedding_tags)
-        entities: List[str] = [self._linkings[tag] for tag in embedding_tags if tag in self._linkings]
-        relations: List[Relation] = []
-
-        relations.extend(CachingWikidataRelationSource._retrieve_relations_from_cache(entities))
-        uncached_entities: List[str] = list(set(entities) - set([relation.source for relation in relations]))
-
-        logging.info(f"Cache-Hit for {len(entities) - len(uncached_entities)} (out of {len(entities)}) entities")
-
-        remote_relations: List[Relation] = self._retrieve_relations_from_remote(uncached_entities)
+        return self._retrieve_relations_for_entities(
+            [self._linkings[tag] for tag in embedding_tags if tag in self._linkings])
+
+    def _aggregate_relations_for(self, embedding_tags: List[str], relation_metrics: RelationMetrics) -> int:
+        if self._sparql_session is None:
+            return super()._aggregate_relations_for(embedding_tags, relation_metrics)
+
+        relations, uncached_entities = self.relations_from_cache(
+            [self._linkings[tag] for tag in embedding_tags if tag in self._linkings])
+        relation_metrics.add_relations(relations)
+        if len(uncached_entities) < 1:
+            return len(relations)
+
+        # streamed relations are aggregated while the response is still being downloaded
+        remote_relations: List[Relation] = self._request_remote(
+            list(uncached_entities), lambda request, query: self._stream_relations(query, relation_metrics))
+        self.add_to_cache(uncached_entities, remote_relations)
+        return len(relations) + len(remote_relations)
+
+    def _retrieve_relations_for_knowledgebase_ids(self, knowledgebase_ids: List[str]) -> List[Relation]:
+        return self._retrieve_relations_for_entities(knowledgebase_ids)
+
+    def _retrieve_relations_for_entities(self, entities: List[str]) -> List[Relation]:
+        relations, uncached_entities = self.relations_from_cache(entities)
+        if len(uncached_entities) < 1:
+            return relations
 
-        CachingWikidataRelationSource._add_to_cache(remote_relations)
+        remote_relations: List[Relation] = self._retrieve_relations_from_remote(list(uncached_entities))
+        self.add_to_cache(uncached_entities, remote_relations)
         relations.extend(remote_relations)
         return relations
 
-    def _retrieve_relations_from_remote(self, entities: List[str]) -> List[Relation]:
-        query = constant.named_entity_relations_sparql_query(entities)
-
-        with self._wikidata_endpoint.request() as request:
-            relations = [Relation.from_wikidata_record(record) for record in
-                         request.post(query,
-                                      on_timeout=self._on_timeout_wikidata_endpoint,
-                                      on_error=self._on_error_wikidata_endpoint)]
+    def relations_from_cache(self, entities: List[str]) -> Tuple[List[Relation], Set[str]]:
+        # returns the cached relations and the entities which have to be requested from the endpoint
+        relations: List[Relation] = []
 
-            if len(relations) > 0:
-                self._increase_chunk_size()
+        with metrics.timer("cache_lookup_seconds"):
+            relations.extend(self._retrieve_relations_from_cache(entities))
+            uncached_entities: Set[str] = set(entities) - set([relation.source for relation in relations])
+            uncached_entities -= self._relation_cache.known_empty(uncached_entities)
+            uncached_entities -= self._relation_cache.quarantined(uncached_entities)
 
-            return relations
+        metrics.increment("cache_hits_total", len(set(entities)) - len(uncached_entities))
+        metrics.increment("cache_misses_total", len(uncached_entities))
+        logging.debug(f"Cache-Hit for {len(set(entities)) - len(uncached_entities)} (out of {len(set(entities))}) "
+                      f"entities")
+        return relations, uncached_entities
 
-    def _on_timeout_wikidata_endpoint(self, request: WikidataRequestExecutor) -> None:
-        self._decrease_chunk_size()
+    def add_to_cache(self, requested_entities: Set[str], relations: List[Relation]) -> None:
+        with metrics.timer("cache_write_seconds"):
+            self._relation_cache.add(relations)
+            self._relation_cache.add_empty(requested_entities - set([relation.source for relation in relations]))
 
-    def _on_error_wikidata_endpoint(self, request: WikidataRequestExecutor, error: Any) -> None:
-        pass
-
-    def _increase_chunk_size(self) -> None:
-        with CachingWikidataRelationSource.__chunk_size_lock:
-            if self._chunk_size < CachingWikidataRelationSource.__chunk_size:
-                # __chunk_size has not fully been utilized
-                return
-
-            CachingWikidataRelationSource.__succeeded_requests += 1
-            if CachingWikidataRelationSource.__succeeded_requests > self._wikidata_endpoint.config().concurrent_requests():
-                CachingWikidataRelationSource.__chunk_size = int(self._chunk_size * 1.25)
-                CachingWikidataRelationSource.__succeeded_requests = 0
-                logging.info(f"Increased chunk size to {CachingWikidataRelationSource.__chunk_size}")
-
-    def _decrease_chunk_size(self) -> None:
-        with CachingWikidataRelationSource.__chunk_size_lock:
-            if self._chunk_size > CachingWikidataRelationSource.__chunk_size:
-                # __chunk_size has already been decreased by another thread
-                return
-
-            CachingWikidataRelationSource.__chunk_size = int(self._chunk_size * 0.75)
-            CachingWikidataRelationSource.__succeeded_requests = 0
-            logging.info(f"Decreasing chunk size to {CachingWikidataRelationSource.__chunk_size}")
-
-    __chunk_size_lock: threading.Lock = threading.Lock()
-    __chunk_size: int = DEFAULT_CHUNK_SIZE
-    __succeeded_requests: int = 0
-    __cache_lock: threading.Lock = threading.Lock()
-    __cached_relations: Optional[Dict[str, List[Relation]]] = None
-    __new_cached_relations: List[Relation] = []
-    __caching_file_lock: threading.Lock = threading.Lock()
-    __cache_file: Path = Path(os.path.dirname(os.path.abspath(__file__)), "..", ".cached_relations.csv")
+    def quarantine(self, embedding_tags: List[str]) -> None:
+        self.quarantine_knowledgebase_ids([self._linkings[tag] for tag in embedding_tags if tag in self._linkings])
 
-    def chunk_size(self) -> int:
-        return CachingWikidataRelationSource._synchronized_chunk_size()
+    def quarantine_knowledgebase_ids(self, knowledgebase_ids: List[str]) -> None:
+        logging.info(f"Quarantining {len(knowledgebase_ids)} entities which repeatedly failed: "
+                     f"{', '.join(knowledgebase_ids)}")
+        self._relation_cache.add_quarantined(knowledgebase_ids)
 
-    @staticmethod
-    def _synchronized_chunk_size() -> int:
-        with CachingWikidataRelationSource.__chunk_size_lock:
-            return CachingWikidataRelationSource.__chunk_size
+    def retry_scope(self) -> ContextManager:
+        return self._request_controller.retry_scope()
 
-    @staticmethod
-    def _retrieve_relations_from_cache(entities: List[str]) -> Iterable[Relation]:
-        cached_relations: Optional[Generator[List[Relation]]] = None
-
-        with CachingWikidataRelationSource.__cache_lock:
-            CachingWikidataRelationSource.__initialize_cache()
-
-            cached_entities: Iterator[str] = filter(lambda x: x in CachingWikidataRelationSource.__cached_relations,
-                                                    entities)
-            cached_relations = (CachingWikidataRelationSource.__cached_relations[entity] for
-                                entity in cached_entities)
+    def _retrieve_relations_from_remote(self, entities: List[str]) -> List[Relation]:
+        if self._sparql_session is not None:
+            return self._request_remote(entities, lambda request, query: self._stream_relations(query))
 
-        if cached_relations is None:
-            raise StopIteration
+        return CachingWikidataRelationSource.parse_records(self.records_from_remote(entities))
 
-        for list_of_relations in cached_relations:
-            yield from list_of_relations
+    def records_from_remote(self, entities: List[str]) -> List[Dict[str, str]]:
+        return self._request_remote(entities, self._post)
 
     @staticmethod
-    def _add_to_cache(relations: Iterable[Relation]) -> None:
-        with CachingWikidataRelationSource.__cache_lock:
-            CachingWikidataRelationSource.__initialize_cache()
-
-            for relation in relations:
-                if relation.source not in CachingWikidataRelationSource.__cached_relations:
-                    CachingWikidataRelationSource.__cached_relations[relation.source] = []
+    def parse_records(records: List[Dict[str, str]]) -> List[Relation]:
+        with metrics.timer("parsing_seconds"):
+            return [Relation.from_wikidata_record(record) for record in records]
 
-                CachingWikidataRelationSource.__cached_relations[relation.source].append(relation)
-                CachingWikidataRelationSource.__new_cached_relations.append(relation)
-
-        CachingWikidataRelationSource._save_cached_relations()
-
-    @staticmethod
-    def __initialize_cache() -> None:
-        if CachingWikidataRelationSource.__cached_relations is not None:
-            return
+    def _request_remote(self, entities: List[str],
+                        perform: Callable[[WikidataRequestExecutor, str], Optional[List]]) -> List:
+        query = constant.named_entity_relations_sparql_query(entities)
 
-        CachingWikidataRelationSource.__cached_relations = {}
+        with self._request_controller.request(len(entities)) as measurement:
+            with metrics.timer("remote_fetch_seconds"), self._wikidata_endpoint.request() as request:
+                results: Optional[List] = perform(request, query)
+
+            metrics.increment("remote_requests_total")
+            if results is None:
+                metrics.increment("remote_timeouts_total" if self._request_timed_out else "remote_errors_total")
+                measurement.fail(timed_out=self._request_timed_out)
+                if self._request_unavailable:
+                    raise RelationSourceUnavailableError(f"Request for relations of {len(entities)} entities failed, "
+                                                         f"the endpoint is unavailable")
+                raise RelationSourceError(f"Request for relations of {len(entities)} entities "
+                                          f"{'timed out' if self._request_timed_out else 'failed'}")
+
+            measurement.succeed(len(results))
+
+        return results
+
+    def _post(self, request: WikidataRequestExecutor, query: str) -> Optional[List[Dict[str, str]]]:
+        self._request_failed = False
+        self._request_timed_out = False
+        self._request_unavailable = False
+
+        records: List[Dict[str, str]] = list(request.post(query,
+                                                          on_timeout=self._on_timeout_wikidata_endpoint,
+                                                          on_error=self._on_error_wikidata_endpoint))
+        if self._request_failed:
+            return None
+
+        return records
+
+    def _stream_relations(self, query: str,
+                          relation_metrics: Optional[RelationMetrics] = None) -> Optional[List[Relation]]:
+        self._request_timed_out = False
+        self._request_unavailable = False
+        # the relations are still collected for the cache
+        relations: List[Relation] = []
 
-        if not CachingWikidataRelationSource.__cache_file.exists():
-            return
+        try:
+            for relation in self._sparql_session.relations(query):
+                relations.append(relation)
+                if relation_metrics is not None:
+                    relation_metrics.add_relation(relation)
+            return relations
+        except SparqlTimeoutError:
+            self._request_timed_out = True
+        except SparqlUnavailableError as error:
+            self._request_unavailable = True
+            logging.info(f"Error while streaming relations: {error}")
+        except SparqlRequestError as error:
+            logging.info(f"Error while streaming relations: {error}")
+        return None
 
-        with CachingWikidataRelationSource.__cache_file.open("r") as input_stream:
-            csv_reader: csv.reader = csv.reader(input_stream)
-            header_row: bool = True
+    def _on_timeout_wikidata_endpoint(self, request: WikidataRequestExecutor) -> None:
+        self._request_failed = True
+        self._request_timed_out = True
 
-            for row in csv_reader:
-                if header_row:
-                    header_row = False
-                    continue
+    def _on_error_wikidata_endpoint(self, request: WikidataRequestExecutor, error: Any) -> None:
+        self._request_failed = True
+        self._request_unavailable = CachingWikidataRelationSource._is_unavailable(error)
 
-                if not row:
-                    continue  # ignore blank lines
+    @staticmethod
+    def _is_unavailable(error: Any) -> bool:
+        # an error response to this very query is worth bisecting, an unreachable or overloaded endpoint is not
+        response = getattr(error, "response", None)
+        status: Optional[int] = getattr(response, "status_code", None) if response is not None \
+            else getattr(error, "code", None)
+        if isinstance(status, int):
+            return status in SparqlUnavailableError.STATUSES
 
-                relation: Relation = Relation.from_csv_record(row)
-                if relation.source not in CachingWikidataRelationSource.__cached_relations:
-                    CachingWikidataRelationSource.__cached_relations[relation.source] = []
+        # a read timeout is specific to the query, a connection which cannot be established is not
+        return isinstance(error, (ConnectionError, requests.ConnectionError, urllib.error.URLError))
 
-                CachingWikidataRelationSource.__cached_relations[relation.source].append(relation)
+    def chunk_size(self) -> int:
+        return self._request_controller.chunk_size()
 
-        logging.info(f"Done loading cached relations... "
-                     f"{len(CachingWikidataRelationSource.__cached_relations)} relations loaded")
+    def _retrieve_relations_from_cache(self, entities: List[str]) -> Iterable[Relation]:
+        cached_relations: Dict[str, List[Relation]] = self._relation_cache.relations_for(entities)
 
-    @staticmethod
-    def _save_cached_relations() -> None:
-        new_relations: List[Relation] = []
-        with CachingWikidataRelationSource.__cache_lock:
-            new_relations.extend(CachingWikidataRelationSource.__new_cached_relations)
-            CachingWikidataRelationSource.__new_cached_relations.clear()
-
-        if len(new_relations) < 1:
-            return
-
-        with CachingWikidataRelationSource.__caching_file_lock:
-            if not CachingWikidataRelationSource.__cache_file.exists():
-                with CachingWikidataRelationSource.__cache_file.open("w+") as output_stream:
-                    print("source,name,target", file=output_stream)
-
-            with CachingWikidataRelationSource.__cache_file.open("a") as output_stream:
-                for relation in new_relations:
-                    print(f"{relation.source},{relation.name},{relation.target}", file=output_stream)
+        for entity in entities:
+            yield from cached_relations.get(entity, [])
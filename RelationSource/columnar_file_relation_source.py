@@ -0,0 +1,34 @@
+from pathlib import Path
+from typing import Dict, List
+
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.columnar_relations import ColumnarRelations
+from Relation.relation import Relation
+from RelationSource.abstract_relation_source import AbstractRelationSource
+
+
+class ColumnarFileRelationSource(AbstractRelationSource):
+    DEFAULT_CHUNK_SIZE = 5000
+
+    def __init__(self, linkings: EntityLinkings, relations_file: Path):
+        self._linkings: EntityLinkings = linkings
+        self._relations: Dict[str, List[Relation]] = {}
+
+        # written by ColumnarRelationSink, the whole file is kept in memory
+        with Path(relations_file).open("rb") as input_stream:
+            for block in ColumnarRelations.read_blocks(input_stream):
+                for relation in block:
+                    if relation.source not in self._relations:
+                        self._relations[relation.source] = []
+
+                    self._relations[relation.source].append(relation)
+
+    def _retrieve_relations_for(self, embedding_tags: List[str]) -> List[Relation]:
+        return self._retrieve_relations_for_knowledgebase_ids(
+            [self._linkings[tag] for tag in embedding_tags if tag in self._linkings])
+
+    def _retrieve_relations_for_knowledgebase_ids(self, knowledgebase_ids: List[str]) -> List[Relation]:
+        return [relation for entity in knowledgebase_ids for relation in self._relations.get(entity, [])]
+
+    def chunk_size(self) -> int:
+        return ColumnarFileRelationSource.DEFAULT_CHUNK_SIZE
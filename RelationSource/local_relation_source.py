@@ -0,0 +1,25 @@
+from typing import List, Dict
+
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.relation import Relation
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationSource.abstract_relation_source import AbstractRelationSource
+
+
+class LocalRelationSource(AbstractRelationSource):
+    DEFAULT_CHUNK_SIZE = 5000
+
+    def __init__(self, linkings: EntityLinkings, relation_cache: AbstractRelationCache):
+        self._linkings: EntityLinkings = linkings
+        self._relation_cache: AbstractRelationCache = relation_cache
+
+    def _retrieve_relations_for(self, embedding_tags: List[str]) -> List[Relation]:
+        return self._retrieve_relations_for_knowledgebase_ids(
+            [self._linkings[tag] for tag in embedding_tags if tag in self._linkings])
+
+    def _retrieve_relations_for_knowledgebase_ids(self, knowledgebase_ids: List[str]) -> List[Relation]:
+        relations: Dict[str, List[Relation]] = self._relation_cache.relations_for(knowledgebase_ids)
+        return [relation for entity in knowledgebase_ids for relation in relations.get(entity, [])]
+
+    def chunk_size(self) -> int:
+        return LocalRelationSource.DEFAULT_CHUNK_SIZE
@@ -0,0 +1,184 @@
+import contextlib
+import logging
+import threading
+import time
+from collections import deque
+from typing import Deque, Iterator, Optional
+
+
+class RequestControllerState:
+
+    def __init__(self, chunk_size: int, concurrency_limit: int, in_flight: int, p50_latency: float,
+                 p95_latency: float, error_rate: float, mean_result_size: float):
+        self.chunk_size: int = chunk_size
+        self.concurrency_limit: int = concurrency_limit
+        self.in_flight: int = in_flight
+        self.p50_latency: float = p50_latency
+        self.p95_latency: float = p95_latency
+        self.error_rate: float = error_rate
+        self.mean_result_size: float = mean_result_size
+
+    def __str__(self):
+        return f"chunk size {self.chunk_size}, {self.in_flight}/{self.concurrency_limit} requests in flight, " \
+               f"p50 {self.p50_latency:.2f} s, p95 {self.p95_latency:.2f} s, error rate {self.error_rate:.0%}, " \
+               f"{self.mean_result_size:.1f} records per entity"
+
+
+class RequestMeasurement:
+
+    def __init__(self, entities: int, generation: int):
+        self.entities: int = entities
+        self.generation: int = generation
+        self.started_at: float = time.perf_counter()
+        self.result_size: Optional[int] = None
+        self.timed_out: bool = False
+
+    def succeed(self, result_size: int) -> None:
+        self.result_size = result_size
+
+    def fail(self, timed_out: bool = False) -> None:
+        self.result_size = None
+        self.timed_out = timed_out
+
+
+class RequestController:
+    DEFAULT_TARGET_LATENCY = 10.0
+    MIN_CHUNK_SIZE = 10
+    MAX_CHUNK_SIZE = 5000
+    MAX_CHUNK_GROWTH = 1.25
+    MAX_CHUNK_SHRINKAGE = 0.75
+    CONCURRENCY_BACKOFF = 0.75
+    # latency above this multiple of the target is taken as a sign of an overloaded endpoint
+    OVERLOAD_FACTOR = 1.5
+    WINDOW = 100
+
+    def __init__(self, max_concurrent_requests: int, initial_chunk_size: int,
+                 target_latency: float = DEFAULT_TARGET_LATENCY):
+        self._condition: threading.Condition = threading.Condition()
+        self._max_concurrent_requests: int = max_concurrent_requests
+        self._target_latency: float = target_latency
+        self._chunk_size: int = initial_chunk_size
+        self._concurrency_limit: int = max_concurrent_requests
+        self._in_flight: int = 0
+        self._generation: int = 0
+        self._successes_since_adjustment: int = 0
+        self._latencies: Deque[float] = deque(maxlen=RequestController.WINDOW)
+        self._result_sizes: Deque[float] = deque(maxlen=RequestController.WINDOW)
+        self._outcomes: Deque[bool] = deque(maxlen=RequestController.WINDOW)
+        self._local: threading.local = threading.local()
+
+    def chunk_size(self) -> int:
+        with self._condition:
+            return self._chunk_size
+
+    @contextlib.contextmanager
+    def request(self, entities: int) -> Iterator[RequestMeasurement]:
+        with self._condition:
+            while self._in_flight >= self._concurrency_limit:
+                self._condition.wait()
+            self._in_flight += 1
+            measurement: RequestMeasurement = RequestMeasurement(entities, self._pinned_generation())
+
+        try:
+            yield measurement
+        finally:
+            latency: float = time.perf_counter() - measurement.started_at
+            with self._condition:
+                self._in_flight -= 1
+                if measurement.result_size is None:
+                    self._on_failure(measurement, latency)
+                else:
+                    self._on_success(measurement, latency)
+                self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def retry_scope(self) -> Iterator[None]:
+        # retries of the parts of a failed chunk belong to the generation of that chunk, so the chunk backs off once
+        # no matter how many of its parts fail while a bad entity is isolated
+        self._local.in_retry_scope = True
+        self._local.generation = None
+        try:
+            yield
+        finally:
+            self._local.in_retry_scope = False
+
+    def _pinned_generation(self) -> int:
+        if not getattr(self._local, "in_retry_scope", False):
+            return self._generation
+
+        if self._local.generation is None:
+            # the first request within a retry scope is the original chunk
+            self._local.generation = self._generation
+        return self._local.generation
+
+    def state(self) -> RequestControllerState:
+        with self._condition:
+            latencies = sorted(self._latencies)
+            return RequestControllerState(
+                self._chunk_size, self._concurrency_limit, self._in_flight,
+                RequestController._percentile(latencies, 0.5), RequestController._percentile(latencies, 0.95),
+                self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0,
+                sum(self._result_sizes) / len(self._result_sizes) if self._result_sizes else 0.0)
+
+    def _on_success(self, measurement: RequestMeasurement, latency: float) -> None:
+        self._latencies.append(latency)
+        self._outcomes.append(True)
+        if measurement.entities > 0:
+            self._result_sizes.append(measurement.result_size / measurement.entities)
+
+        previous_chunk_size, previous_concurrency_limit = self._chunk_size, self._concurrency_limit
+        desired_chunk_size: float = self._target_latency / max(latency, 1e-3) * measurement.entities
+
+        if latency > self._target_latency:
+            self._back_off(measurement, max(self._chunk_size * RequestController.MAX_CHUNK_SHRINKAGE,
+                                            min(self._chunk_size, desired_chunk_size)),
+                           latency > self._target_latency * RequestController.OVERLOAD_FACTOR)
+        else:
+            if measurement.entities >= self._chunk_size:
+                # only requests which utilized the whole chunk tell whether a larger one would still meet the target
+                self._chunk_size = self._bounded_chunk_size(min(self._chunk_size * RequestController.MAX_CHUNK_GROWTH,
+                                                                max(self._chunk_size, desired_chunk_size)))
+
+            self._successes_since_adjustment += 1
+            if self._successes_since_adjustment >= self._concurrency_limit and \
+                    self._concurrency_limit < self._max_concurrent_requests:
+                self._concurrency_limit += 1
+                self._successes_since_adjustment = 0
+
+        self._log_adjustment(previous_chunk_size, previous_concurrency_limit)
+
+    def _on_failure(self, measurement: RequestMeasurement, latency: float) -> None:
+        self._latencies.append(latency)
+        self._outcomes.append(False)
+
+        previous_chunk_size, previous_concurrency_limit = self._chunk_size, self._concurrency_limit
+        slow: bool = measurement.timed_out or latency > self._target_latency
+        self._back_off(measurement, self._chunk_size * RequestController.MAX_CHUNK_SHRINKAGE if slow else None, True)
+        self._log_adjustment(previous_chunk_size, previous_concurrency_limit)
+
+    def _back_off(self, measurement: RequestMeasurement, chunk_size: Optional[float],
+                  reduce_concurrency: bool) -> None:
+        self._successes_since_adjustment = 0
+        if measurement.generation < self._generation:
+            # started before the latest back off, which has already accounted for this slowdown
+            return
+
+        self._generation += 1
+        if chunk_size is not None:
+            self._chunk_size = min(self._chunk_size, self._bounded_chunk_size(chunk_size))
+        if reduce_concurrency:
+            self._concurrency_limit = max(1, int(self._concurrency_limit * RequestController.CONCURRENCY_BACKOFF))
+
+    def _bounded_chunk_size(self, chunk_size: float) -> int:
+        return min(RequestController.MAX_CHUNK_SIZE, max(RequestController.MIN_CHUNK_SIZE, int(chunk_size)))
+
+    def _log_adjustment(self, previous_chunk_size: int, previous_concurrency_limit: int) -> None:
+        if self._chunk_size != previous_chunk_size or self._concurrency_limit != previous_concurrency_limit:
+            logging.info(f"Adjusted chunk size from {previous_chunk_size} to {self._chunk_size} and concurrent "
+                         f"requests from {previous_concurrency_limit} to {self._concurrency_limit}")
+
+    @staticmethod
+    def _percentile(sorted_values, percentile: float) -> float:
+        if not sorted_values:
+            return 0.0
+        return sorted_values[min(len(sorted_values) - 1, int(len(sorted_values) * percentile))]
@@ -0,0 +1,92 @@
+import configparser
+import re
+from pathlib import Path
+from typing import Dict, Iterator, List
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from Relation.relation import Relation
+from RelationSource.async_sparql_client import AsyncSparqlClient, SparqlRequestError, SparqlUnavailableError
+from resources import constant
+
+
+class SparqlTimeoutError(SparqlRequestError):
+    # the endpoint did not answer this very query in time, smaller queries may still succeed
+    pass
+
+
+class SparqlSession:
+    DEFAULT_TIMEOUT = 60.0
+    ESCAPE_REGEX = re.compile(r"\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)")
+    ESCAPED_CHARACTERS = {"t": "\t", "n": "\n", "r": "\r", "b": "\b", "f": "\f"}
+
+    def __init__(self, url: str, pool_size: int, timeout: float = DEFAULT_TIMEOUT):
+        self._url: str = url
+        self._timeout: float = timeout
+        # one keep-alive connection per concurrent request, shared by all workers
+        self._session: requests.Session = requests.Session()
+        self._session.mount("http://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._session.mount("https://", HTTPAdapter(pool_connections=1, pool_maxsize=pool_size))
+        self._session.headers.update({"User-Agent": AsyncSparqlClient.USER_AGENT,
+                                      "Accept": "text/tab-separated-values"})
+
+    @staticmethod
+    def from_config(endpoint_config: Path) -> "SparqlSession":
+        config: configparser.ConfigParser = configparser.ConfigParser()
+        config.read(str(endpoint_config))
+        return SparqlSession(config["REMOTE"]["url"], config["LIMITING"].getint("concurrent_requests"))
+
+    def relations(self, query: str) -> Iterator[Relation]:
+        # relations are built while the response is still being downloaded, the body is never held as a whole
+        try:
+            with self._session.post(self._url, data={"query": query}, timeout=self._timeout,
+                                    stream=True) as response:
+                if response.status_code != 200:
+                    raise SparqlRequestError.for_status(response.status_code)
+
+                lines: Iterator[bytes] = response.iter_lines(chunk_size=64 * 1024)
+                columns: Dict[str, int] = {name.lstrip("?"): index for index, name in
+                                           enumerate(next(lines, b"").decode("utf-8").split("\t"))}
+                source_column: int = columns[constant.RELATION_SOURCE_LABEL]
+                name_column: int = columns[constant.RELATION_NAME_LABEL]
+                target_column: int = columns[constant.RELATION_TARGET_LABEL]
+
+                for line in lines:
+                    if not line:
+                        continue
+
+                    terms: List[str] = line.decode("utf-8").split("\t")
+                    yield Relation.from_wikidata_record({
+                        constant.RELATION_SOURCE_LABEL: SparqlSession._parse_term(terms[source_column]),
+                        constant.RELATION_NAME_LABEL: SparqlSession._parse_term(terms[name_column]),
+                        constant.RELATION_TARGET_LABEL: SparqlSession._parse_term(terms[target_column])
+                    })
+        except requests.ConnectionError as error:
+            # includes timeouts while connecting, unlike timeouts while reading the response
+            raise SparqlUnavailableError(str(error)) from error
+        except requests.Timeout as error:
+            raise SparqlTimeoutError(str(error)) from error
+        except (requests.RequestException, KeyError) as error:
+            raise SparqlRequestError(str(error)) from error
+
+    def close(self) -> None:
+        self._session.close()
+
+    @staticmethod
+    def _parse_term(term: str) -> str:
+        # terms are encoded like in Turtle: <iri>, "literal"@language, "literal"^^<datatype> or plain numbers
+        if term.startswith("<") and term.endswith(">"):
+            return term[1:-1]
+
+        if term.startswith('"'):
+            return SparqlSession.ESCAPE_REGEX.sub(SparqlSession._unescape, term[1:term.rindex('"')])
+
+        return term
+
+    @staticmethod
+    def _unescape(match) -> str:
+        escaped: str = match.group(1)
+        if len(escaped) > 1:
+            return chr(int(escaped[1:], 16))
+        return SparqlSession.ESCAPED_CHARACTERS.get(escaped, escaped)
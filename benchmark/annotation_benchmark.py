@@ -0,0 +1,158 @@
+import argparse
+import json
+import random
+import resource
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from Cluster.cluster import Cluster
+from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from EntityLinking.entity_linkings import EntityLinkings
+from FileParser.ClusterFileParser.cluster_file_parser import ClusterFileParser
+from FileParser.EntityLinkingFileParsing.entity_linking_file_parser import EntityLinkingFileParser
+from Relation.relation_metrics import RelationMetrics
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
+from benchmark.fake_sparql_server import FakeSparqlServer
+
+
+def main():
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    server: FakeSparqlServer = FakeSparqlServer(relations_per_entity=args.relations_per_entity,
+                                                base_latency=args.base_latency,
+                                                latency_per_entity=args.latency_per_entity,
+                                                capacity=args.capacity, query_timeout=args.query_timeout,
+                                                timeout_rate=args.timeout_rate, value_length=args.value_length,
+                                                seed=args.seed).start()
+    phases: Dict[str, float] = {}
+    runs: List[Dict[str, object]] = []
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        directory: Path = Path(temporary_directory)
+        endpoint_config: Path = Path(directory, "wikidata_endpoint_config.ini")
+        endpoint_config.write_text(f"[REMOTE]\nurl = {server.url}\n\n[LIMITING]\n"
+                                   f"concurrent_requests = {args.concurrent_requests}\n")
+
+        start_time = time.perf_counter()
+        _generate_csv_files(args, Path(directory, "clusters.csv"), Path(directory, "linkings.csv"))
+        phases["generate"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        linkings: EntityLinkings = EntityLinkingFileParser.create_from_file(Path(directory, "linkings.csv"))
+        phases["load_linkings"] = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        clusters: List[Cluster] = list(ClusterFileParser.create_from_file(Path(directory, "clusters.csv")))
+        phases["load_clusters"] = time.perf_counter() - start_time
+
+        for name in ["cold", "warm"]:
+            run: Dict[str, object] = _measure_run(name, linkings, clusters, Path(directory, "cache.sqlite"),
+                                                  endpoint_config, server, args.threads, args.stream_responses)
+            phases[name] = run["seconds"]
+            runs.append(run)
+
+    server.stop()
+    print(json.dumps({
+        "clusters": args.clusters,
+        "entities_per_cluster": args.entities_per_cluster,
+        "threads": args.threads,
+        "stream_responses": args.stream_responses,
+        "phases": {name: round(seconds, 3) for name, seconds in phases.items()},
+        "runs": runs,
+        "peak_rss_mib": round(_peak_rss_mib(), 1)
+    }, indent=2))
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(description='Annotate synthetic clusters end to end against a local fake '
+                                                         'SPARQL endpoint, with a cold and a warm relation cache')
+    general_parser.add_argument("--clusters", help='Number of synthetic clusters', type=int, required=False,
+                                default=200)
+    general_parser.add_argument("--entities-per-cluster", help='Number of entities per cluster', type=int,
+                                required=False, default=500)
+    general_parser.add_argument("--distinct-entities", help='Number of distinct linked entities, clusters overlap if '
+                                                            'this is lower than the total number of entities',
+                                type=int, required=False, default=100000)
+    general_parser.add_argument("--unlinked-rate", help='Fraction of cluster entities without a linking', type=float,
+                                required=False, default=0.1)
+    general_parser.add_argument("--threads", help='Number of ClusterAnnotator threads', type=int, required=False,
+                                default=8)
+    general_parser.add_argument("--concurrent-requests", help='Concurrent requests allowed by the endpoint config',
+                                type=int, required=False, default=5)
+    general_parser.add_argument("--relations-per-entity", help='Relations returned per entity', type=int,
+                                required=False, default=20)
+    general_parser.add_argument("--value-length", help='Minimum length of value labels, controls the response size',
+                                type=int, required=False, default=0)
+    general_parser.add_argument("--base-latency", help='Seconds every request takes', type=float, required=False,
+                                default=0.05)
+    general_parser.add_argument("--latency-per-entity", help='Additional seconds per requested entity', type=float,
+                                required=False, default=0.0005)
+    general_parser.add_argument("--capacity", help='Concurrent requests the endpoint handles without slowing down',
+                                type=int, required=False, default=5)
+    general_parser.add_argument("--timeout-rate", help='Fraction of queries which fail with a timeout', type=float,
+                                required=False, default=0.0)
+    general_parser.add_argument("--query-timeout", help='Seconds until a query fails with a timeout', type=float,
+                                required=False, default=2.0)
+    general_parser.add_argument("--stream-responses", help='Stream tab-separated responses through a keep-alive '
+                                                           'session', action="store_true")
+    general_parser.add_argument("--seed", help='Random seed', type=int, required=False, default=0)
+    return general_parser
+
+
+def _generate_csv_files(args, clusters_file: Path, linkings_file: Path) -> None:
+    generator: random.Random = random.Random(args.seed)
+
+    with linkings_file.open("w") as linkings_stream:
+        print("embedding_label,knowledgebase_id", file=linkings_stream)
+        for entity in range(1, args.distinct_entities + 1):
+            print(f"entity {entity},Q{entity}", file=linkings_stream)
+
+    with clusters_file.open("w") as clusters_stream:
+        print("cluster_id,embedding_label", file=clusters_stream)
+        for cluster in range(args.clusters):
+            for _ in range(args.entities_per_cluster):
+                if generator.random() < args.unlinked_rate:
+                    print(f"{cluster},unlinked {generator.randrange(args.distinct_entities)}", file=clusters_stream)
+                else:
+                    print(f"{cluster},entity {generator.randint(1, args.distinct_entities)}", file=clusters_stream)
+
+
+def _measure_run(name: str, linkings: EntityLinkings, clusters: List[Cluster], cache_file: Path,
+                 endpoint_config: Path, server: FakeSparqlServer, threads: int,
+                 stream_responses: bool) -> Dict[str, object]:
+    requests_before, timeouts_before, bytes_before = server.requests, server.timeouts, server.bytes_sent
+    relation_cache: WriteBehindRelationCache = WriteBehindRelationCache(
+        SqliteRelationCache(cache_file, legacy_cache_file=None))
+
+    start_time = time.perf_counter()
+    annotator: ClusterAnnotator = ClusterAnnotator(linkings, clusters, threads, relation_cache,
+                                                   endpoint_config=endpoint_config, stream_responses=stream_responses)
+    results: List[RelationMetrics] = list(annotator.run())
+    relation_cache.close()
+    seconds: float = time.perf_counter() - start_time
+
+    entities: int = sum(len(cluster.entities) for cluster in clusters)
+    return {
+        "run": name,
+        "seconds": round(seconds, 3),
+        "annotated_clusters": len(results),
+        "clusters_per_second": round(len(clusters) / seconds, 1),
+        "entities_per_second": round(entities / seconds, 1),
+        "remote_requests": server.requests - requests_before,
+        "remote_timeouts": server.timeouts - timeouts_before,
+        "bytes_transferred": server.bytes_sent - bytes_before,
+        "peak_rss_mib": round(_peak_rss_mib(), 1)
+    }
+
+
+def _peak_rss_mib() -> float:
+    # ru_maxrss is reported in KiB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,182 @@
+import argparse
+import json
+import random
+import re
+import threading
+import time
+import urllib.parse
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from typing import List, Dict
+
+from resources import constant
+
+
+class FakeSparqlServer:
+    ENTITY_REGEX = re.compile(r"wd:(Q\d+)")
+
+    def __init__(self, port: int = 0, relations_per_entity: int = 10, base_latency: float = 0.05,
+                 latency_per_entity: float = 0.002, capacity: int = 4, query_timeout: float = 60.0,
+                 timeout_rate: float = 0.0, value_length: int = 0, seed: int = 0):
+        self.relations_per_entity: int = relations_per_entity
+        self.base_latency: float = base_latency
+        self.latency_per_entity: float = latency_per_entity
+        # requests beyond the capacity slow down all requests in flight, like an overloaded endpoint
+        self.capacity: int = capacity
+        self.query_timeout: float = query_timeout
+        self.timeout_rate: float = timeout_rate
+        # padding of every value label, which controls the size of the responses
+        self.value_length: int = value_length
+        self.slowdown: float = 1.0
+        self.requests: int = 0
+        self.timeouts: int = 0
+        self.bytes_sent: int = 0
+        self._random: random.Random = random.Random(seed)
+        self._in_flight: int = 0
+        self._lock: threading.Lock = threading.Lock()
+        self._server: ThreadingHTTPServer = ThreadingHTTPServer(("127.0.0.1", port), _FakeSparqlRequestHandler)
+        self._server.daemon_threads = True
+        self._server.fake_sparql_server = self
+        self._thread: threading.Thread = threading.Thread(target=self._server.serve_forever, name="fake-sparql",
+                                                          daemon=True)
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self._server.server_port}/sparql"
+
+    def start(self) -> "FakeSparqlServer":
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._server.shutdown()
+        self._server.server_close()
+
+    def answer(self, query: str, tab_separated: bool = False) -> (int, bytes):
+        entities: List[str] = FakeSparqlServer.ENTITY_REGEX.findall(query)
+
+        with self._lock:
+            self.requests += 1
+            self._in_flight += 1
+            overload: float = max(1.0, self._in_flight / self.capacity)
+            times_out: bool = self._random.random() < self.timeout_rate
+
+        try:
+            latency: float = (self.base_latency + self.latency_per_entity * len(entities)) * self.slowdown * overload
+            if times_out or latency > self.query_timeout:
+                time.sleep(self.query_timeout)
+                with self._lock:
+                    self.timeouts += 1
+                return 500, b"java.util.concurrent.TimeoutException"
+
+            time.sleep(latency)
+            body: bytes = self._tab_separated_results_for(entities) if tab_separated else \
+                json.dumps(self._results_for(entities)).encode("utf-8")
+            with self._lock:
+                self.bytes_sent += len(body)
+            return 200, body
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+
+    def _results_for(self, entities: List[str]) -> Dict[str, object]:
+        bindings: List[Dict[str, Dict[str, str]]] = []
+        for entity in entities:
+            number: int = int(entity[1:])
+            for relation in range(self.relations_per_entity):
+                bindings.append({
+                    constant.RELATION_SOURCE_LABEL: {"type": "uri",
+                                                     "value": f"http://www.wikidata.org/entity/{entity}"},
+                    constant.RELATION_NAME_LABEL: {"type": "literal", "value": f"property {relation}"},
+                    constant.RELATION_TARGET_LABEL: {"type": "literal",
+                                                     "value": f"value {(number * (relation + 1)) % 17}".ljust(
+                                                         self.value_length, ".")}
+                })
+
+        return {"head": {"vars": [constant.RELATION_SOURCE_LABEL, constant.RELATION_NAME_LABEL,
+                                  constant.RELATION_TARGET_LABEL]},
+                "results": {"bindings": bindings}}
+
+    def _tab_separated_results_for(self, entities: List[str]) -> bytes:
+        def literal(value: str) -> str:
+            return '"' + value.replace("\\", "\\\\").replace('"', '\\"').replace("\t", "\\t") + '"@en'
+
+        variables: List[str] = [constant.RELATION_SOURCE_LABEL, constant.RELATION_NAME_LABEL,
+                                constant.RELATION_TARGET_LABEL]
+        lines: List[str] = ["\t".join(f"?{variable}" for variable in variables)]
+        for binding in self._results_for(entities)["results"]["bindings"]:
+            lines.append("\t".join(f"<{binding[variable]['value']}>" if binding[variable]["type"] == "uri"
+                                   else literal(binding[variable]["value"]) for variable in variables))
+        return ("\n".join(lines) + "\n").encode("utf-8")
+
+
+class _FakeSparqlRequestHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self._answer(urllib.parse.urlparse(self.path).query)
+
+    def do_POST(self):
+        self._answer(self.rfile.read(int(self.headers.get("Content-Length", 0))).decode("utf-8"))
+
+    def _answer(self, parameters: str) -> None:
+        query: str = urllib.parse.parse_qs(parameters).get("query", [""])[0]
+        tab_separated: bool = "text/tab-separated-values" in self.headers.get("Accept", "")
+        status, body = self.server.fake_sparql_server.answer(query, tab_separated)
+
+        self.send_response(status)
+        if status != 200:
+            self.send_header("Content-Type", "text/plain")
+        else:
+            self.send_header("Content-Type",
+                             "text/tab-separated-values" if tab_separated else "application/sparql-results+json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def main():
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    server: FakeSparqlServer = FakeSparqlServer(args.port, args.relations_per_entity, args.base_latency,
+                                                args.latency_per_entity, args.capacity, args.query_timeout,
+                                                args.timeout_rate, args.value_length)
+    server.slowdown = args.slowdown
+    server.start()
+    print(f"Serving fake SPARQL endpoint at {server.url}")
+
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(description='Local SPARQL endpoint answering relation queries with '
+                                                         'synthetic relations and simulated latency')
+    general_parser.add_argument("--port", help='Port to listen on', type=int, required=False, default=8000)
+    general_parser.add_argument("--relations-per-entity", help='Relations returned per entity', type=int,
+                                required=False, default=10)
+    general_parser.add_argument("--base-latency", help='Seconds every request takes', type=float, required=False,
+                                default=0.05)
+    general_parser.add_argument("--latency-per-entity", help='Additional seconds per requested entity', type=float,
+                                required=False, default=0.002)
+    general_parser.add_argument("--capacity", help='Concurrent requests before all requests slow down', type=int,
+                                required=False, default=4)
+    general_parser.add_argument("--query-timeout", help='Seconds after which a query fails with a timeout',
+                                type=float, required=False, default=60.0)
+    general_parser.add_argument("--timeout-rate", help='Fraction of queries which fail with a timeout', type=float,
+                                required=False, default=0.0)
+    general_parser.add_argument("--value-length", help='Minimum length of value labels, pads the responses',
+                                type=int, required=False, default=0)
+    general_parser.add_argument("--slowdown", help='Factor applied to all latencies', type=float, required=False,
+                                default=1.0)
+    return general_parser
+
+
+if __name__ == "__main__":
+    main()
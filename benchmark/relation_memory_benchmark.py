@@ -0,0 +1,70 @@
+import argparse
+import gc
+import json
+import time
+import tracemalloc
+from typing import List, Callable, Dict
+
+from Relation.relation import Relation
+
+
+class _UnslottedRelation:
+
+    def __init__(self, source: str, name: str, target: str):
+        self.source: str = source
+        self.name: str = name
+        self.target: str = target
+
+
+def main():
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    results: List[Dict[str, object]] = [
+        _measure("unslotted, not interned", _UnslottedRelation, args),
+        _measure("slotted, interned", Relation, args)
+    ]
+    print(json.dumps({"rows": args.rows, "results": results}, indent=2))
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(description='Compare the memory footprint of relation representations')
+    general_parser.add_argument("--rows", help='Number of synthetic relations', type=int, required=False,
+                                default=10000000)
+    general_parser.add_argument("--entities", help='Number of distinct source entities', type=int, required=False,
+                                default=100000)
+    general_parser.add_argument("--properties", help='Number of distinct property labels', type=int, required=False,
+                                default=2000)
+    general_parser.add_argument("--values", help='Number of distinct value labels', type=int, required=False,
+                                default=500000)
+    return general_parser
+
+
+def _measure(representation: str, factory: Callable[[str, str, str], object], args) -> Dict[str, object]:
+    gc.collect()
+    tracemalloc.start()
+    start_time = time.perf_counter()
+
+    relations: List[object] = []
+    for row in range(args.rows):
+        # every row builds fresh strings, just like parsing the cache file or a SPARQL response does
+        relations.append(factory(f"Q{row % args.entities}",
+                                 f"property {(row * 7) % args.properties}",
+                                 f"value {(row * 13) % args.values}"))
+
+    end_time = time.perf_counter()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del relations
+
+    return {
+        "representation": representation,
+        "allocated_bytes": current,
+        "peak_bytes": peak,
+        "bytes_per_relation": round(current / max(args.rows, 1), 2),
+        "build_seconds": round(end_time - start_time, 3)
+    }
+
+
+if __name__ == "__main__":
+    main()
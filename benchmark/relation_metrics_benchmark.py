@@ -0,0 +1,86 @@
+import argparse
+import json
+import random
+import time
+from typing import List, Callable
+
+from Cluster.cluster import Cluster
+from Relation.relation import Relation
+from Relation.relation_metrics import RelationMetrics
+
+
+def main():
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    chunks: List[List[Relation]] = _generate_chunks(args)
+    cluster: Cluster = Cluster(0)
+    cluster.entities = [f"entity {i}" for i in range(args.entities)]
+
+    per_relation_metrics, per_relation_seconds = _measure(cluster, chunks, _add_per_relation)
+    batched_metrics, batched_seconds = _measure(cluster, chunks, RelationMetrics.add_relations)
+
+    print(json.dumps({
+        "relations": sum(len(chunk) for chunk in chunks),
+        "chunk_size": args.chunk_size,
+        "per_relation_seconds": round(per_relation_seconds, 3),
+        "batched_seconds": round(batched_seconds, 3),
+        "speedup": round(per_relation_seconds / batched_seconds, 2),
+        "identical_output": per_relation_metrics.to_json_object() == batched_metrics.to_json_object()
+    }, indent=2))
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(description='Compare per-relation and batched RelationMetrics aggregation')
+    general_parser.add_argument("--entities", help='Number of entities in the synthetic cluster', type=int,
+                                required=False, default=50000)
+    general_parser.add_argument("--relations-per-entity", help='Average number of relations per entity', type=int,
+                                required=False, default=40)
+    general_parser.add_argument("--properties", help='Number of distinct property labels', type=int, required=False,
+                                default=300)
+    general_parser.add_argument("--values", help='Number of distinct value labels', type=int, required=False,
+                                default=5000)
+    general_parser.add_argument("--chunk-size", help='Entities per chunk', type=int, required=False, default=500)
+    general_parser.add_argument("--seed", help='Random seed', type=int, required=False, default=0)
+    general_parser.add_argument("--ordered-by-property", help='Order each chunk by property like the SPARQL query does',
+                                action="store_true")
+    return general_parser
+
+
+def _generate_chunks(args) -> List[List[Relation]]:
+    generator: random.Random = random.Random(args.seed)
+    chunks: List[List[Relation]] = []
+
+    for start in range(0, args.entities, args.chunk_size):
+        chunk: List[Relation] = []
+        for entity in range(start, min(start + args.chunk_size, args.entities)):
+            for _ in range(generator.randint(1, 2 * args.relations_per_entity)):
+                # skewed towards few properties and values, like Wikidata statements
+                chunk.append(Relation(f"Q{entity}",
+                                      f"property {int(generator.paretovariate(1.2)) % args.properties}",
+                                      f"value {int(generator.paretovariate(1.0)) % args.values}"))
+        if args.ordered_by_property:
+            chunk.sort(key=lambda relation: relation.name)
+        chunks.append(chunk)
+
+    return chunks
+
+
+def _add_per_relation(metrics: RelationMetrics, relations: List[Relation]) -> None:
+    for relation in relations:
+        metrics.add_relation(relation)
+
+
+def _measure(cluster: Cluster, chunks: List[List[Relation]],
+             aggregate: Callable[[RelationMetrics, List[Relation]], None]) -> (RelationMetrics, float):
+    metrics: RelationMetrics = RelationMetrics(cluster)
+    start_time = time.perf_counter()
+
+    for chunk in chunks:
+        aggregate(metrics, chunk)
+
+    return metrics, time.perf_counter() - start_time
+
+
+if __name__ == "__main__":
+    main()
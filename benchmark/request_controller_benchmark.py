@@ -0,0 +1,123 @@
+import argparse
+import itertools
+import json
+import logging
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import List, Dict, Iterator
+
+from EntityLinking.entity_linkings import EntityLinkings
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationSource.abstract_relation_source import RelationSourceError
+from RelationSource.caching_wikidata_relation_source import CachingWikidataRelationSource
+from RelationSource.request_controller import RequestController, RequestControllerState
+from benchmark.fake_sparql_server import FakeSparqlServer
+from wikidata_endpoint import WikidataEndpoint, WikidataEndpointConfiguration
+
+
+def main():
+    # progress goes to stderr, stdout only carries the JSON summary
+    logging.basicConfig(format='%(asctime)s : %(message)s', level=logging.INFO)
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    server: FakeSparqlServer = FakeSparqlServer(capacity=args.capacity, latency_per_entity=args.latency_per_entity,
+                                                query_timeout=args.query_timeout).start()
+
+    with tempfile.TemporaryDirectory() as temporary_directory:
+        config_file: Path = Path(temporary_directory, "wikidata_endpoint_config.ini")
+        config_file.write_text(f"[REMOTE]\nurl = {server.url}\n\n[LIMITING]\n"
+                               f"concurrent_requests = {args.concurrent_requests}\n")
+        endpoint: WikidataEndpoint = WikidataEndpoint(WikidataEndpointConfiguration(config_file))
+        controller: RequestController = RequestController(args.concurrent_requests,
+                                                          CachingWikidataRelationSource.DEFAULT_CHUNK_SIZE,
+                                                          args.target_latency)
+        relation_cache: SqliteRelationCache = SqliteRelationCache(Path(temporary_directory, "cache.sqlite"),
+                                                                  legacy_cache_file=None)
+
+        # every chunk asks for entities which have not been requested before, so the cache never hits
+        entity_numbers: Iterator[int] = itertools.count(1)
+        entities_lock: threading.Lock = threading.Lock()
+        fetched: List[int] = [0]
+        stop: threading.Event = threading.Event()
+
+        def fetch() -> None:
+            source: CachingWikidataRelationSource = CachingWikidataRelationSource(EntityLinkings(), endpoint,
+                                                                                  relation_cache, controller)
+            while not stop.is_set():
+                with entities_lock:
+                    chunk: List[str] = [f"Q{next(entity_numbers)}" for _ in range(source.chunk_size())]
+                try:
+                    source.relations_for_knowledgebase_ids(chunk)
+                except RelationSourceError:
+                    continue
+                with entities_lock:
+                    fetched[0] += len(chunk)
+
+        workers: List[threading.Thread] = [threading.Thread(target=fetch, daemon=True) for _ in range(args.threads)]
+        for worker in workers:
+            worker.start()
+
+        phases: List[Dict[str, object]] = []
+        for name, slowdown in [("normal", 1.0), ("slowdown", args.slowdown), ("recovered", 1.0)]:
+            server.slowdown = slowdown
+            phases.append(_measure_phase(name, args.phase_duration, controller, fetched, entities_lock))
+
+        stop.set()
+        for worker in workers:
+            worker.join()
+        relation_cache.close()
+
+    server.stop()
+    print(json.dumps({"requests": server.requests, "timeouts": server.timeouts, "phases": phases}, indent=2))
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(description='Observe the request controller against a local fake SPARQL '
+                                                         'endpoint which temporarily slows down')
+    general_parser.add_argument("--threads", help='Number of fetching threads', type=int, required=False, default=8)
+    general_parser.add_argument("--concurrent-requests", help='Upper bound of concurrent requests', type=int,
+                                required=False, default=8)
+    general_parser.add_argument("--target-latency", help='Latency the controller aims for in seconds', type=float,
+                                required=False, default=1.0)
+    general_parser.add_argument("--capacity", help='Concurrent requests the fake endpoint handles without slowing '
+                                                   'down', type=int, required=False, default=4)
+    general_parser.add_argument("--latency-per-entity", help='Seconds the fake endpoint needs per entity', type=float,
+                                required=False, default=0.001)
+    general_parser.add_argument("--query-timeout", help='Seconds after which the fake endpoint gives up on a query',
+                                type=float, required=False, default=5.0)
+    general_parser.add_argument("--slowdown", help='Latency factor during the slowdown phase', type=float,
+                                required=False, default=5.0)
+    general_parser.add_argument("--phase-duration", help='Seconds per phase', type=float, required=False,
+                                default=20.0)
+    return general_parser
+
+
+def _measure_phase(name: str, duration: float, controller: RequestController, fetched: List[int],
+                   entities_lock: threading.Lock) -> Dict[str, object]:
+    with entities_lock:
+        fetched_before: int = fetched[0]
+    start_time = time.perf_counter()
+
+    while time.perf_counter() - start_time < duration:
+        time.sleep(1)
+        logging.info(f"[{name}] {controller.state()}")
+
+    with entities_lock:
+        fetched_entities: int = fetched[0] - fetched_before
+    state: RequestControllerState = controller.state()
+    return {
+        "phase": name,
+        "entities_per_second": round(fetched_entities / (time.perf_counter() - start_time), 1),
+        "chunk_size": state.chunk_size,
+        "concurrency_limit": state.concurrency_limit,
+        "p50_latency": round(state.p50_latency, 3),
+        "p95_latency": round(state.p95_latency, 3),
+        "error_rate": round(state.error_rate, 3)
+    }
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+import argparse
+import logging
+from pathlib import Path
+
+from EntityLinking.entity_linkings_snapshot import EntityLinkingsSnapshot
+from util.filesystem_validators import ReadableFile
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s : %(levelname)s : %(message)s', level=logging.INFO)
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    EntityLinkingsSnapshot.compile(args.input, args.output or EntityLinkingsSnapshot.snapshot_file_for(args.input))
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(
+        description='Compile a linkings CSV into a memory-mapped snapshot, which main.py picks up automatically')
+    general_parser.add_argument("--input", help='CSV file containing entity to wikidata linkings', action=ReadableFile,
+                                required=True, type=Path)
+    general_parser.add_argument("--output", help='Location of the snapshot (default: next to the CSV file)',
+                                required=False, type=Path, default=None)
+    return general_parser
+
+
+if __name__ == "__main__":
+    main()
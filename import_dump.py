@@ -0,0 +1,48 @@
+import argparse
+import logging
+import os
+from pathlib import Path
+from typing import Set
+
+from EntityLinking.entity_linkings import EntityLinkings
+from FileParser.EntityLinkingFileParsing.entity_linking_file_parser import EntityLinkingFileParser
+from FileParser.WikidataDumpParsing.wikidata_dump_parser import AbstractWikidataDumpParser
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.wikidata_dump_importer import WikidataDumpImporter
+from util.filesystem_validators import ReadableFile
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s : [%(processName)s] %(levelname)s : %(message)s', level=logging.INFO)
+    parser = _initialize_parser()
+    args = parser.parse_args()
+
+    logging.info("Loading linkings...")
+    entity_linkings: EntityLinkings = EntityLinkingFileParser.create_from_snapshot_or_file(args.linkings)
+    entities: Set[str] = set(entity_linkings.knowledgebase_ids())
+
+    relation_store: SqliteRelationCache = SqliteRelationCache(args.output, legacy_cache_file=None)
+    dump_parser: AbstractWikidataDumpParser = AbstractWikidataDumpParser.for_file(args.dump, args.direct_claims)
+
+    WikidataDumpImporter(dump_parser, entities, relation_store, args.processes).run()
+    relation_store.close()
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(
+        description='Build a local relation store from a Wikidata dump, restricted to linked entities')
+    general_parser.add_argument("--dump", help='Wikidata JSON (.json) or N-Triples (.nt) dump, optionally .gz or .bz2',
+                                action=ReadableFile, required=True, type=Path)
+    general_parser.add_argument("--linkings", help='CSV file containing entity to wikidata linkings',
+                                action=ReadableFile, required=True, type=Path)
+    general_parser.add_argument("--output", help='Location of the relation store to create or extend', required=True,
+                                type=Path)
+    general_parser.add_argument("--processes", help='Number of parsing processes', type=int, required=False,
+                                default=os.cpu_count())
+    general_parser.add_argument("--direct-claims", help='Read wdt: triples of a truthy N-Triples dump instead of ps: '
+                                                        'statements', action="store_true")
+    return general_parser
+
+
+if __name__ == "__main__":
+    main()
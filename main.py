@@ -1,16 +1,29 @@
 import argparse
-import json
+import functools
 import logging
 from pathlib import Path
-from typing import Iterable, List
+from typing import Dict, Iterable, List, Optional, Set
 
 from Cluster.cluster import Cluster
+from ClusterAnnotater.async_cluster_annotator import AsyncClusterAnnotator
 from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from ClusterAnnotater.pipeline_cluster_annotator import PipelineClusterAnnotator
+from ClusterAnnotater.process_pool_cluster_annotator import ProcessPoolClusterAnnotator
 from EntityLinking.entity_linkings import EntityLinkings
 from FileParser.ClusterFileParser.cluster_file_parser import ClusterFileParser
 from FileParser.EntityLinkingFileParsing.entity_linking_file_parser import EntityLinkingFileParser
-from Relation.relation_metrics import RelationMetrics
+from Relation.cluster_aggregation_state import ClusterAggregationState
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationCache.sharded_relation_cache import ShardedRelationCache
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
+from result_sink.abstract_result_sink import AbstractResultSink
+from result_sink.aggregation_state_result_sink import AggregationStateResultSink
+from result_sink.checkpoint_result_sink import CheckpointResultSink
+from result_sink.coverage_report_result_sink import CoverageReportResultSink
+from result_sink.json_lines_result_sink import JsonLinesResultSink
 from util.filesystem_validators import WriteableDirectory, ReadableFile
+from util.metrics import metrics, MetricsReporter
 
 
 def main():
@@ -18,19 +31,107 @@ def main():
     parser: argparse.ArgumentParser = _initialize_parser()
 
     args = parser.parse_args()
+    if args.stream and args.deduplicate_entities:
+        parser.error("--stream cannot be combined with --deduplicate-entities")
+    if args.relation_store is not None and args.mode == "asyncio":
+        parser.error("--relation-store cannot be combined with --mode asyncio")
+    if args.relation_store is not None and args.cache_directory is not None:
+        parser.error("--relation-store cannot be combined with --cache-directory")
+    if args.cache_format == "columnar" and args.cache_directory is None:
+        parser.error("--cache-format columnar requires --cache-directory")
+    if args.offline and args.mode == "asyncio":
+        parser.error("--offline cannot be combined with --mode asyncio")
+    if args.stream_responses and args.mode == "asyncio":
+        parser.error("--stream-responses cannot be combined with --mode asyncio")
+    if args.stream and args.resume:
+        parser.error("--resume cannot be combined with --stream")
+    if args.processes < 1:
+        parser.error("--processes must be at least 1")
+    if args.processes > 1 and (args.mode == "asyncio" or args.deduplicate_entities):
+        parser.error("--processes cannot be combined with --mode asyncio or --deduplicate-entities")
+    if args.mode == "pipeline" and (args.stream_responses or args.deduplicate_entities or args.processes > 1):
+        parser.error("--mode pipeline cannot be combined with --stream-responses, --deduplicate-entities or "
+                     "--processes")
+    if args.mode == "pipeline" and (args.offline or args.relation_store is not None):
+        parser.error("--mode pipeline cannot be combined with --offline or --relation-store")
+    if args.stage_workers and args.mode != "pipeline":
+        parser.error("--stage-workers requires --mode pipeline")
+    if args.incremental and (args.stream or args.resume or args.processes > 1 or args.mode != "threads"):
+        parser.error("--incremental cannot be combined with --stream, --resume, --processes or --mode asyncio or "
+                     "pipeline")
+    stage_workers: Dict[str, int] = _parse_stage_workers(parser, args.stage_workers)
+
+    if args.retry_quarantined:
+        _release_quarantined_entities(args)
 
     logging.info("Loading linkings...")
-    entity_linkings: EntityLinkings = EntityLinkingFileParser.create_from_file(args.linkings)
+    entity_linkings: EntityLinkings = EntityLinkingFileParser.create_from_snapshot_or_file(args.linkings)
 
     logging.info("Loading clusters...")
-    clusters: Iterable[Cluster] = ClusterFileParser.create_from_file(args.clusters)
+    if args.stream:
+        clusters: Iterable[Cluster] = ClusterFileParser.stream_from_file(args.clusters)
+        result_sink: AbstractResultSink = JsonLinesResultSink(Path(args.output, "enriched_cluster.jsonl"))
+    else:
+        clusters: Iterable[Cluster] = ClusterFileParser.create_from_file(args.clusters)
+        # every completed cluster is checkpointed, the combined result is written once all are done
+        result_sink: CheckpointResultSink = CheckpointResultSink(args.output, resume=args.resume)
+        if args.resume:
+            completed_cluster_ids: Set[int] = result_sink.completed_cluster_ids
+            clusters = [cluster for cluster in clusters if cluster.id not in completed_cluster_ids]
+            logging.info(f"Skipping {len(completed_cluster_ids)} completed clusters")
+
+    offline: bool = args.offline or args.relation_store is not None
+    if offline:
+        result_sink = CoverageReportResultSink(result_sink, entity_linkings,
+                                               Path(args.output, CoverageReportResultSink.REPORT_FILE),
+                                               append=args.resume)
+
+    previous_states: Optional[Dict[int, ClusterAggregationState]] = None
+    if args.incremental:
+        state_file: Path = Path(args.output, AggregationStateResultSink.STATE_FILE)
+        previous_states = AggregationStateResultSink.load(state_file)
+        result_sink = AggregationStateResultSink(result_sink, entity_linkings, state_file)
+
+    metrics.enabled = args.metrics_file is not None or args.metrics_interval is not None
+    metrics_reporter: MetricsReporter = MetricsReporter(metrics, args.metrics_interval, args.metrics_file)
+    metrics_reporter.start()
 
     logging.info("Annotating clusters...")
-    cluster_annotator: ClusterAnnotator = ClusterAnnotator(entity_linkings, clusters, args.threads)
-    result: List[RelationMetrics] = list(cluster_annotator.run())
+    if args.processes > 1:
+        # every process opens its own relation cache on the shared cache file
+        ProcessPoolClusterAnnotator(entity_linkings, clusters, args.processes, max(1, args.threads // args.processes),
+                                    functools.partial(_create_relation_cache, args), result_sink=result_sink,
+                                    offline=offline,
+                                    endpoint_config=args.endpoint_config,
+                                    stream_responses=args.stream_responses,
+                                    schedule_clusters=not args.stream).run()
+    else:
+        relation_cache: AbstractRelationCache = _create_relation_cache(args)
+        if args.mode == "asyncio":
+            cluster_annotator: AsyncClusterAnnotator = AsyncClusterAnnotator(entity_linkings, clusters,
+                                                                             relation_cache, result_sink=result_sink,
+                                                                             endpoint_config=args.endpoint_config)
+        elif args.mode == "pipeline":
+            cluster_annotator: PipelineClusterAnnotator = PipelineClusterAnnotator(
+                entity_linkings, clusters, relation_cache, result_sink=result_sink,
+                endpoint_config=args.endpoint_config, schedule_clusters=not args.stream, stage_workers=stage_workers)
+        else:
+            cluster_annotator: ClusterAnnotator = ClusterAnnotator(entity_linkings, clusters, args.threads,
+                                                                   relation_cache,
+                                                                   deduplicate_entities=args.deduplicate_entities,
+                                                                   result_sink=result_sink,
+                                                                   offline=offline,
+                                                                   endpoint_config=args.endpoint_config,
+                                                                   stream_responses=args.stream_responses,
+                                                                   schedule_clusters=not args.stream,
+                                                                   previous_states=previous_states)
+        cluster_annotator.run()
+        relation_cache.close()
 
-    logging.info("Printing results...")
-    _print_relations(result, args.output)
+    logging.info("Writing results...")
+    result_sink.close()
+    if metrics.enabled:
+        metrics_reporter.stop()
 
 
 def _initialize_parser():
@@ -42,16 +143,98 @@ def _initialize_parser():
                                 action=ReadableFile, required=True, type=Path)
     general_parser.add_argument("--output", help='Location for enriched clusters', action=WriteableDirectory,
                                 required=True, type=Path)
-    general_parser.add_argument("--threads", help='Number of threads', type=int, required=False, default=8)
+    general_parser.add_argument("--threads", help='Number of threads, split evenly across all processes', type=int,
+                                required=False, default=8)
+    general_parser.add_argument("--processes", help='Number of worker processes the clusters are sharded across',
+                                type=int, required=False, default=1)
+    general_parser.add_argument("--endpoint-config", help='Configuration of the Wikidata SPARQL endpoint',
+                                action=ReadableFile, required=False, type=Path,
+                                default=ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT)
+    general_parser.add_argument("--mode", help='Execution mode for fetching relations',
+                                choices=["threads", "asyncio", "pipeline"], required=False, default="threads")
+    general_parser.add_argument("--stage-workers", help='Workers of single pipeline stages as stage=count, stages are '
+                                                        f'{", ".join(PipelineClusterAnnotator.STAGES)} (default: '
+                                                        'the endpoint\'s concurrent requests for fetch, 2 for lookup '
+                                                        'and parse, 1 otherwise)',
+                                nargs="+", required=False, default=[])
+    general_parser.add_argument("--stream-responses", help='Request tab-separated results through a shared keep-alive '
+                                                           'session and build relations while they are downloaded',
+                                action="store_true")
+    general_parser.add_argument("--deduplicate-entities", help='Fetch each linked entity only once across all clusters',
+                                action="store_true")
+    general_parser.add_argument("--stream", help='Stream clusters from a clusters file grouped by cluster id and '
+                                                 'write each result as a JSON line once it is complete',
+                                action="store_true")
+    general_parser.add_argument("--empty-entity-ttl", help='Seconds after which entities without any relation are '
+                                                           'queried again (default: never)',
+                                type=float, required=False, default=None)
+    general_parser.add_argument("--cache-directory", help='Keep the relation cache sharded in this directory, which '
+                                                          'concurrent runs on one or several hosts can share '
+                                                          '(default: a SQLite file next to the package)',
+                                required=False, type=Path, default=None)
+    general_parser.add_argument("--cache-format", help='Format of relations newly written to the cache directory, '
+                                                       'columnar files are dictionary-encoded and compressed '
+                                                       '(default: csv)',
+                                choices=["csv", "columnar"], required=False, default="csv")
+    general_parser.add_argument("--relation-store", help='Relation store built by import_dump.py, annotate from it '
+                                                         'without any network access',
+                                action=ReadableFile, required=False, type=Path, default=None)
+    general_parser.add_argument("--offline", help='Annotate only from the relation cache without any network access '
+                                                  'and report the relation coverage of every cluster',
+                                action="store_true")
+    general_parser.add_argument("--incremental", help='Keep the aggregation state of every cluster in the output '
+                                                      'directory and only add or remove the relations of entities '
+                                                      'which changed since the previous run',
+                                action="store_true")
+    general_parser.add_argument("--resume", help='Continue an interrupted run from the checkpoint in the output '
+                                                 'directory and skip all clusters it already completed',
+                                action="store_true")
+    general_parser.add_argument("--metrics-file", help='Write counters and latency histograms in the Prometheus text '
+                                                       'format to this file',
+                                required=False, type=Path, default=None)
+    general_parser.add_argument("--metrics-interval", help='Seconds between metric summaries in the log, the metrics '
+                                                           'file is rewritten just as often',
+                                type=float, required=False, default=None)
+    general_parser.add_argument("--retry-quarantined", help='Query entities again which repeatedly failed in '
+                                                            'previous runs',
+                                action="store_true")
     return general_parser
 
 
-def _print_relations(result: List[RelationMetrics], output_directory: Path):
-    result_as_json: List[object] = []
-    for metric in result:
-        result_as_json.append(metric.to_json_object())
-    with Path(output_directory, f"enriched_cluster.json").open("w+") as output_file:
-        json.dump(result_as_json, output_file)
+def _parse_stage_workers(parser: argparse.ArgumentParser, values: List[str]) -> Dict[str, int]:
+    stage_workers: Dict[str, int] = {}
+    for value in values:
+        stage, _, workers = value.partition("=")
+        if stage not in PipelineClusterAnnotator.STAGES or not workers.isdigit() or int(workers) < 1:
+            parser.error(f"--stage-workers expects stage=count with a positive count and one of the stages "
+                         f"{', '.join(PipelineClusterAnnotator.STAGES)}, got {value}")
+        stage_workers[stage] = int(workers)
+    return stage_workers
+
+
+def _release_quarantined_entities(args):
+    relation_cache: AbstractRelationCache = _open_relation_cache(args)
+    logging.info(f"Released {relation_cache.clear_quarantined()} quarantined entities")
+    relation_cache.close()
+
+
+def _create_relation_cache(args) -> AbstractRelationCache:
+    if args.relation_store is not None:
+        return SqliteRelationCache(args.relation_store, legacy_cache_file=None)
+
+    if args.offline:
+        # nothing is fetched, so nothing has to be written behind
+        return _open_relation_cache(args)
+
+    return WriteBehindRelationCache(_open_relation_cache(args))
+
+
+def _open_relation_cache(args) -> AbstractRelationCache:
+    if args.cache_directory is not None:
+        return ShardedRelationCache(args.cache_directory, empty_entity_ttl=args.empty_entity_ttl,
+                                    columnar_segments=args.cache_format == "columnar")
+
+    return SqliteRelationCache(empty_entity_ttl=args.empty_entity_ttl)
 
 
 if __name__ == "__main__":
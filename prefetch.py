@@ -0,0 +1,114 @@
+import argparse
+import functools
+import logging
+from pathlib import Path
+from typing import List, Optional
+
+from ClusterAnnotater.cluster_annotator import ClusterAnnotator
+from EntityLinking.entity_linkings import EntityLinkings
+from FileParser.ClusterFileParser.cluster_file_parser import ClusterFileParser
+from FileParser.EntityLinkingFileParsing.entity_linking_file_parser import EntityLinkingFileParser
+from RelationCache.abstract_relation_cache import AbstractRelationCache
+from RelationCache.relation_cache_prefetcher import RelationCachePrefetcher
+from RelationCache.sharded_relation_cache import ShardedRelationCache
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+from RelationCache.write_behind_relation_cache import WriteBehindRelationCache
+from RelationSource.caching_wikidata_relation_source import CachingWikidataRelationSource
+from RelationSource.request_controller import RequestController
+from RelationSource.sparql_session import SparqlSession
+from util.filesystem_validators import ReadableFile, ReadableFiles
+from util.rate_limiter import RateLimiter
+from wikidata_endpoint import WikidataEndpoint
+
+
+def main():
+    logging.basicConfig(format='%(asctime)s : [%(threadName)s] %(levelname)s : %(message)s', level=logging.INFO)
+    parser = _initialize_parser()
+    args = parser.parse_args()
+    if args.threads is not None and args.threads < 1:
+        parser.error("--threads must be at least 1")
+    if args.requests_per_second is not None and args.requests_per_second <= 0:
+        parser.error("--requests-per-second must be positive")
+    if args.cache_format == "columnar" and args.cache_directory is None:
+        parser.error("--cache-format columnar requires --cache-directory")
+
+    logging.info("Loading linkings...")
+    entity_linkings: EntityLinkings = EntityLinkingFileParser.create_from_snapshot_or_file(args.linkings)
+    entities: List[str] = _entities_to_prefetch(entity_linkings, args.clusters)
+
+    wikidata_endpoint: WikidataEndpoint = ClusterAnnotator.create_wikidata_endpoint(args.endpoint_config)
+    request_controller: RequestController = ClusterAnnotator.create_request_controller(wikidata_endpoint)
+    sparql_session: Optional[SparqlSession] = SparqlSession.from_config(args.endpoint_config) \
+        if args.stream_responses else None
+    relation_store: AbstractRelationCache = SqliteRelationCache(empty_entity_ttl=args.empty_entity_ttl) \
+        if args.cache_directory is None else ShardedRelationCache(args.cache_directory,
+                                                                  empty_entity_ttl=args.empty_entity_ttl,
+                                                                  columnar_segments=args.cache_format == "columnar")
+    relation_cache: WriteBehindRelationCache = WriteBehindRelationCache(relation_store)
+
+    # by default as many threads as the endpoint accepts concurrent requests, the controller limits them further
+    threads: int = args.threads or wikidata_endpoint.config().concurrent_requests()
+    prefetcher: RelationCachePrefetcher = RelationCachePrefetcher(
+        entities, relation_cache,
+        functools.partial(CachingWikidataRelationSource, entity_linkings, wikidata_endpoint, relation_cache,
+                          request_controller, sparql_session),
+        threads, RateLimiter(args.requests_per_second) if args.requests_per_second is not None else None)
+
+    logging.info("Prefetching relations...")
+    try:
+        prefetcher.run()
+    except KeyboardInterrupt:
+        logging.info("Interrupted, run the prefetch again to continue where it stopped")
+    finally:
+        relation_cache.close()
+        if sparql_session is not None:
+            sparql_session.close()
+        logging.info(f"Request controller: {request_controller.state()}")
+
+
+def _entities_to_prefetch(entity_linkings: EntityLinkings, clusters_files: List[Path]) -> List[str]:
+    if not clusters_files:
+        return list(entity_linkings.knowledgebase_ids())
+
+    logging.info("Loading clusters...")
+    entities: List[str] = []
+    for clusters_file in clusters_files:
+        for cluster in ClusterFileParser.create_from_file(clusters_file):
+            entities.extend(entity_linkings[tag] for tag in cluster.entities if tag in entity_linkings)
+    return entities
+
+
+def _initialize_parser():
+    general_parser = argparse.ArgumentParser(
+        description='Fill the relation cache with the relations of all linked entities ahead of annotation runs')
+    general_parser.add_argument("--linkings", help='CSV file containing entity to wikidata linkings',
+                                action=ReadableFile, required=True, type=Path)
+    general_parser.add_argument("--clusters", help='CSV files containing clustered entities, only their linked '
+                                                   'entities are prefetched', action=ReadableFiles, nargs="+",
+                                required=False, type=Path, default=[])
+    general_parser.add_argument("--threads", help='Number of threads (default: concurrent requests of the endpoint)',
+                                type=int, required=False, default=None)
+    general_parser.add_argument("--requests-per-second", help='Maximum number of requests started per second '
+                                                              '(default: unlimited)',
+                                type=float, required=False, default=None)
+    general_parser.add_argument("--endpoint-config", help='Configuration of the Wikidata SPARQL endpoint',
+                                action=ReadableFile, required=False, type=Path,
+                                default=ClusterAnnotator.DEFAULT_CONFIG_WIKIDATA_ENDPOINT)
+    general_parser.add_argument("--stream-responses", help='Request tab-separated results through a shared keep-alive '
+                                                           'session and build relations while they are downloaded',
+                                action="store_true")
+    general_parser.add_argument("--cache-directory", help='Sharded relation cache to fill (default: the SQLite file '
+                                                          'next to the package)',
+                                required=False, type=Path, default=None)
+    general_parser.add_argument("--cache-format", help='Format of relations newly written to the cache directory, '
+                                                       'columnar files are dictionary-encoded and compressed '
+                                                       '(default: csv)',
+                                choices=["csv", "columnar"], required=False, default="csv")
+    general_parser.add_argument("--empty-entity-ttl", help='Seconds after which entities without any relation are '
+                                                           'queried again (default: never)',
+                                type=float, required=False, default=None)
+    return general_parser
+
+
+if __name__ == "__main__":
+    main()
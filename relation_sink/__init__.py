@@ -1,6 +1,9 @@
 from .abstract_file_relation_sink import AbstractFileRelationSink
 from .abstract_relation_sink import AbstractRelationSink
+from .buffered_relation_sink import BufferedRelationSink
+from .columnar_file_relation_sink import ColumnarRelationSink
 from .csv_file_relation_sink import CsvRelationSink
 from .null_relation_sink import NullRelationSink
 
-__all__ = ["AbstractRelationSink", "NullRelationSink", "AbstractFileRelationSink", "CsvRelationSink"]
\ No newline at end of file
+__all__ = ["AbstractRelationSink", "NullRelationSink", "AbstractFileRelationSink", "CsvRelationSink",
+           "ColumnarRelationSink", "BufferedRelationSink"]
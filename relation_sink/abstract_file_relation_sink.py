@@ -1,21 +1,36 @@
+import gzip
+import io
 from abc import abstractmethod
 from pathlib import Path
+from typing import Optional, TextIO
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
 
 from relation_sink.abstract_relation_sink import AbstractRelationSink
 
 
 class AbstractFileRelationSink(AbstractRelationSink):
+    COMPRESSIONS = ("gzip", "zstd")
 
-    def __init__(self, file_path):
+    def __init__(self, file_path, compression: Optional[str] = None):
         super().__init__()
+        if compression is not None and compression not in AbstractFileRelationSink.COMPRESSIONS:
+            raise ValueError(f"Unknown compression {compression}, expected one of "
+                             f"{', '.join(AbstractFileRelationSink.COMPRESSIONS)}")
+        if compression == "zstd" and zstandard is None:
+            raise ValueError("zstd compression requires the zstandard package")
+
         self._file_path = Path(file_path)
         self._file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._compression: Optional[str] = compression
 
     def _perform_persist(self, relations):
         file_existed = self._file_path.exists()
-        write_mode = "a" if self._file_path.exists() else "w+"
 
-        with self._file_path.open(mode=write_mode) as sink:
+        with self._open() as sink:
             if not file_existed:
                 print(*self._generate_file_headers(relations), sep="\n", end="\n", file=sink)
             else:
@@ -23,6 +38,14 @@ class AbstractFileRelationSink(AbstractRelationSink):
 
             print(*self._generate_file_content(relations), sep="\n", end="", file=sink)
 
+    def _open(self) -> TextIO:
+        # compressed files are appended to as separate gzip members or zstd frames, which decompress as one stream
+        if self._compression == "gzip":
+            return gzip.open(self._file_path, mode="at")
+        if self._compression == "zstd":
+            return io.TextIOWrapper(zstandard.ZstdCompressor().stream_writer(self._file_path.open(mode="ab")))
+        return self._file_path.open(mode="a")
+
     @abstractmethod
     def _generate_file_headers(self, relations):
         raise NotImplementedError()
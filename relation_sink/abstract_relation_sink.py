@@ -11,6 +11,20 @@ class AbstractRelationSink(ABC):
         with self._lock:
             self._perform_persist(relations)
 
+    def flush(self):
+        with self._lock:
+            self._perform_flush()
+
+    def close(self):
+        with self._lock:
+            self._perform_close()
+
     @abstractmethod
     def _perform_persist(self, relations):
         raise NotImplementedError()
+
+    def _perform_flush(self):
+        pass
+
+    def _perform_close(self):
+        pass
@@ -0,0 +1,113 @@
+import tempfile
+import threading
+from pathlib import Path
+from typing import BinaryIO, List, Optional
+
+from Relation.columnar_relations import ColumnarRelations
+from Relation.relation import Relation
+from relation_sink.abstract_relation_sink import AbstractRelationSink
+
+
+class BufferedRelationSink(AbstractRelationSink):
+    DEFAULT_BATCH_SIZE = 50000
+    DEFAULT_MAX_BUFFERED_RELATIONS = 500000
+
+    def __init__(self, relation_sink: AbstractRelationSink, batch_size: int = DEFAULT_BATCH_SIZE,
+                 max_buffered_relations: int = DEFAULT_MAX_BUFFERED_RELATIONS, spill_directory: Optional[Path] = None):
+        super().__init__()
+        self._relation_sink: AbstractRelationSink = relation_sink
+        self._batch_size: int = batch_size
+        self._max_buffered_relations: int = max_buffered_relations
+        self._spill_directory: Optional[Path] = spill_directory
+        # the writer never takes the sink's lock, thus flush and close can wait for it while holding that lock
+        self._condition: threading.Condition = threading.Condition()
+        self._buffer: List[Relation] = []
+        self._spill_file: Optional[BinaryIO] = None
+        self._spilled_relations: int = 0
+        self._requested_flushes: int = 0
+        self._completed_flushes: int = 0
+        self._closed: bool = False
+        self._error: Optional[Exception] = None
+        self._writer: threading.Thread = threading.Thread(target=self._write, name="relation-sink-writer",
+                                                          daemon=True)
+        self._writer.start()
+
+    def _perform_persist(self, relations):
+        with self._condition:
+            self._raise_writer_error()
+            if self._closed:
+                raise ValueError("Cannot persist relations, the relation sink is closed")
+            self._buffer.extend(relations)
+            if len(self._buffer) > self._max_buffered_relations:
+                self._spill()
+            if len(self._buffer) + self._spilled_relations >= self._batch_size:
+                self._condition.notify_all()
+
+    def _perform_flush(self):
+        with self._condition:
+            self._requested_flushes += 1
+            flush: int = self._requested_flushes
+            self._condition.notify_all()
+            self._condition.wait_for(lambda: self._completed_flushes >= flush or self._error is not None)
+            self._raise_writer_error()
+
+        self._relation_sink.flush()
+
+    def _perform_close(self):
+        try:
+            self._perform_flush()
+        finally:
+            with self._condition:
+                self._closed = True
+                self._condition.notify_all()
+            self._writer.join()
+            self._relation_sink.close()
+
+    def _spill(self) -> None:
+        # the writer falls behind, further relations wait on disk instead of in memory
+        if self._spill_file is None:
+            self._spill_file = tempfile.TemporaryFile(dir=self._spill_directory)
+
+        self._spill_file.write(ColumnarRelations.encode(self._buffer))
+        self._spilled_relations += len(self._buffer)
+        self._buffer = []
+
+    def _raise_writer_error(self) -> None:
+        if self._error is not None:
+            raise self._error
+
+    def _write(self) -> None:
+        while True:
+            with self._condition:
+                self._condition.wait_for(self._has_work)
+                if self._closed and not self._buffer and self._spill_file is None:
+                    return
+
+                # everything persisted before the latest flush request is part of these relations
+                flush: int = self._requested_flushes
+                buffer, self._buffer = self._buffer, []
+                spill_file, self._spill_file = self._spill_file, None
+                self._spilled_relations = 0
+
+            try:
+                # spilled relations are older than the buffered ones, so the order of all relations is kept
+                if spill_file is not None:
+                    with spill_file:
+                        spill_file.seek(0)
+                        for block in ColumnarRelations.read_blocks(spill_file):
+                            self._relation_sink.persist(block)
+                if buffer:
+                    self._relation_sink.persist(buffer)
+            except Exception as error:
+                with self._condition:
+                    self._error = error
+                    self._condition.notify_all()
+                return
+
+            with self._condition:
+                self._completed_flushes = flush
+                self._condition.notify_all()
+
+    def _has_work(self) -> bool:
+        return self._closed or self._requested_flushes > self._completed_flushes or \
+            len(self._buffer) + self._spilled_relations >= self._batch_size
@@ -0,0 +1,21 @@
+from pathlib import Path
+
+from Relation.columnar_relations import ColumnarRelations
+from relation_sink.abstract_relation_sink import AbstractRelationSink
+
+
+class ColumnarRelationSink(AbstractRelationSink):
+
+    def __init__(self, file_path):
+        super().__init__()
+        self._file_path = Path(file_path)
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+
+    def _perform_persist(self, relations):
+        relations = list(relations)
+        if not relations:
+            return
+
+        # every call appends one self-contained block, so the file never has to be rewritten
+        with self._file_path.open(mode="ab") as sink:
+            sink.write(ColumnarRelations.encode(relations))
@@ -3,8 +3,8 @@ from relation_sink.abstract_file_relation_sink import AbstractFileRelationSink
 
 class CsvRelationSink(AbstractFileRelationSink):
 
-    def __init__(self, file_path):
-        super().__init__(file_path)
+    def __init__(self, file_path, compression=None):
+        super().__init__(file_path, compression)
 
     def _generate_file_headers(self, relations):
         yield "source,name,value"
@@ -0,0 +1,8 @@
+from .abstract_result_sink import AbstractResultSink
+from .aggregation_state_result_sink import AggregationStateResultSink
+from .checkpoint_result_sink import CheckpointResultSink
+from .coverage_report_result_sink import CoverageReportResultSink
+from .json_lines_result_sink import JsonLinesResultSink
+
+__all__ = ["AbstractResultSink", "AggregationStateResultSink", "CheckpointResultSink", "CoverageReportResultSink",
+           "JsonLinesResultSink"]
@@ -0,0 +1,23 @@
+import threading
+from abc import ABC, abstractmethod
+
+
+class AbstractResultSink(ABC):
+
+    def __init__(self):
+        self._lock = threading.Lock()
+
+    def persist(self, metrics):
+        with self._lock:
+            self._perform_persist(metrics)
+
+    def close(self):
+        with self._lock:
+            self._perform_close()
+
+    @abstractmethod
+    def _perform_persist(self, metrics):
+        raise NotImplementedError()
+
+    def _perform_close(self):
+        pass
@@ -0,0 +1,49 @@
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Dict, List
+
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.cluster_aggregation_state import ClusterAggregationState
+from result_sink.abstract_result_sink import AbstractResultSink
+
+
+class AggregationStateResultSink(AbstractResultSink):
+    STATE_FILE = "aggregation_state.jsonl"
+
+    def __init__(self, result_sink: AbstractResultSink, linkings: EntityLinkings, state_file):
+        super().__init__()
+        self._result_sink: AbstractResultSink = result_sink
+        self._linkings: EntityLinkings = linkings
+        self._state_file = Path(state_file)
+        self._state_file.parent.mkdir(parents=True, exist_ok=True)
+        # the previous state is only replaced once the run completed, an aborted run can be repeated
+        self._temporary_file = self._state_file.with_name(self._state_file.name + ".tmp")
+        self._state = self._temporary_file.open(mode="w")
+
+    @staticmethod
+    def load(state_file) -> Dict[int, ClusterAggregationState]:
+        state_file = Path(state_file)
+        if not state_file.exists():
+            return {}
+
+        states: Dict[int, ClusterAggregationState] = {}
+        with state_file.open("r") as state:
+            for line in state:
+                entry = json.loads(line)
+                states[entry["cluster"]] = ClusterAggregationState(entry["entities"], entry["state"])
+
+        logging.info(f"Loaded the aggregation state of {len(states)} clusters from {state_file}")
+        return states
+
+    def _perform_persist(self, metrics):
+        entities: List[str] = [self._linkings[tag] for tag in metrics.cluster.entities if tag in self._linkings]
+        entry = {"cluster": metrics.cluster.id, "entities": entities, "state": metrics.to_state_json_object()}
+        print(json.dumps(entry), file=self._state)
+        self._result_sink.persist(metrics)
+
+    def _perform_close(self):
+        self._state.close()
+        os.replace(str(self._temporary_file), str(self._state_file))
+        self._result_sink.close()
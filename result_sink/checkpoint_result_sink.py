@@ -0,0 +1,80 @@
+import json
+import logging
+from pathlib import Path
+from typing import Dict, List, Set
+
+from result_sink.abstract_result_sink import AbstractResultSink
+
+
+class CheckpointResultSink(AbstractResultSink):
+    CHECKPOINT_FILE = "checkpoint.jsonl"
+    MANIFEST_FILE = "checkpoint_manifest.jsonl"
+    RESULT_FILE = "enriched_cluster.json"
+
+    def __init__(self, output_directory, resume=False):
+        super().__init__()
+        self._output_directory = Path(output_directory)
+        self._output_directory.mkdir(parents=True, exist_ok=True)
+        self._checkpoint_file = Path(self._output_directory, CheckpointResultSink.CHECKPOINT_FILE)
+        self._manifest_file = Path(self._output_directory, CheckpointResultSink.MANIFEST_FILE)
+        self._entries: List[Dict[str, int]] = self._recover() if resume else []
+
+        mode = "a" if resume else "w"
+        self._checkpoint = self._checkpoint_file.open(mode=mode + "b")
+        self._manifest = self._manifest_file.open(mode=mode)
+        self._offset = self._checkpoint.tell()
+
+    def _recover(self) -> List[Dict[str, int]]:
+        if not self._manifest_file.exists() or not self._checkpoint_file.exists():
+            return []
+
+        entries: List[Dict[str, int]] = []
+        manifest_size: int = 0
+        with self._manifest_file.open("r") as manifest:
+            for line in manifest:
+                # a run which died while writing leaves an incomplete last line behind
+                if not line.endswith("\n"):
+                    break
+                entries.append(json.loads(line))
+                manifest_size += len(line.encode("utf-8"))
+
+        # results without a manifest entry are incomplete and will be annotated again
+        checkpoint_size: int = max((entry["offset"] + entry["length"] for entry in entries), default=0)
+        with self._checkpoint_file.open("r+b") as checkpoint:
+            checkpoint.truncate(checkpoint_size)
+        with self._manifest_file.open("r+b") as manifest:
+            manifest.truncate(manifest_size)
+
+        logging.info(f"Resuming from {len(entries)} completed clusters")
+        return entries
+
+    @property
+    def completed_cluster_ids(self) -> Set[int]:
+        with self._lock:
+            return set(entry["cluster"] for entry in self._entries)
+
+    def _perform_persist(self, metrics):
+        line = (json.dumps(metrics.to_json_object()) + "\n").encode("utf-8")
+        self._checkpoint.write(line)
+        self._checkpoint.flush()
+
+        # the manifest entry commits the result, thus it is written once the result itself is complete
+        entry = {"cluster": metrics.cluster.id, "offset": self._offset, "length": len(line)}
+        print(json.dumps(entry), file=self._manifest, flush=True)
+        self._entries.append(entry)
+        self._offset += len(line)
+
+    def _perform_close(self):
+        self._checkpoint.close()
+        self._manifest.close()
+
+        # same format as a single json.dump of all results, without holding them in memory
+        with self._checkpoint_file.open("rb") as checkpoint, \
+                Path(self._output_directory, CheckpointResultSink.RESULT_FILE).open("w+") as output_file:
+            output_file.write("[")
+            for index, entry in enumerate(self._entries):
+                checkpoint.seek(entry["offset"])
+                if index > 0:
+                    output_file.write(", ")
+                output_file.write(checkpoint.read(entry["length"]).decode("utf-8").rstrip("\n"))
+            output_file.write("]")
@@ -0,0 +1,47 @@
+import csv
+import logging
+from pathlib import Path
+from typing import Set
+
+from EntityLinking.entity_linkings import EntityLinkings
+from result_sink.abstract_result_sink import AbstractResultSink
+
+
+class CoverageReportResultSink(AbstractResultSink):
+    REPORT_FILE = "coverage_report.csv"
+    HEADER = ["cluster_id", "entities", "linked_entities", "covered_entities", "coverage"]
+
+    def __init__(self, result_sink: AbstractResultSink, linkings: EntityLinkings, report_file, append=False):
+        super().__init__()
+        self._result_sink: AbstractResultSink = result_sink
+        self._linkings: EntityLinkings = linkings
+        self._report_file = Path(report_file)
+        self._report_file.parent.mkdir(parents=True, exist_ok=True)
+        write_header: bool = not append or not self._report_file.exists() or self._report_file.stat().st_size == 0
+        self._report = self._report_file.open(mode="a" if append else "w", newline="")
+        self._writer = csv.writer(self._report)
+        if write_header:
+            self._writer.writerow(CoverageReportResultSink.HEADER)
+        self._linked_entities: int = 0
+        self._covered_entities: int = 0
+
+    def _perform_persist(self, metrics):
+        # coverage is the fraction of distinct linked entities of which at least one relation is known
+        linked_entities: Set[str] = set(self._linkings[tag] for tag in metrics.cluster.entities
+                                        if tag in self._linkings)
+        covered_entities: int = len(linked_entities & metrics.entities_with_relations)
+        coverage: float = covered_entities / len(linked_entities) if linked_entities else 0.0
+
+        self._writer.writerow([metrics.cluster.id, metrics.number_of_entities, len(linked_entities), covered_entities,
+                               f"{coverage:.4f}"])
+        self._report.flush()
+        self._linked_entities += len(linked_entities)
+        self._covered_entities += covered_entities
+        self._result_sink.persist(metrics)
+
+    def _perform_close(self):
+        self._report.close()
+        if self._linked_entities > 0:
+            logging.info(f"Relations are known for {self._covered_entities} of {self._linked_entities} linked "
+                         f"entities ({self._covered_entities / self._linked_entities:.2%}), see {self._report_file}")
+        self._result_sink.close()
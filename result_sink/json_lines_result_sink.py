@@ -0,0 +1,19 @@
+import json
+from pathlib import Path
+
+from result_sink.abstract_result_sink import AbstractResultSink
+
+
+class JsonLinesResultSink(AbstractResultSink):
+
+    def __init__(self, file_path):
+        super().__init__()
+        self._file_path = Path(file_path)
+        self._file_path.parent.mkdir(parents=True, exist_ok=True)
+        self._sink = self._file_path.open(mode="w+")
+
+    def _perform_persist(self, metrics):
+        print(json.dumps(metrics.to_json_object()), file=self._sink, flush=True)
+
+    def _perform_close(self):
+        self._sink.close()
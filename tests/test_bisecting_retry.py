@@ -0,0 +1,80 @@
+import unittest
+from typing import List, Optional
+
+from RelationSource.abstract_relation_source import RelationSourceError, RelationSourceUnavailableError
+from RelationSource.bisecting_retry import BisectingRetry, OutageDetector
+
+
+class BisectingRetryTest(unittest.TestCase):
+
+    def setUp(self):
+        self._quarantined: List[str] = []
+        self._skipped: List[str] = []
+        self._requests: int = 0
+
+    def test_entity_whose_query_times_out_is_quarantined(self):
+        entities: List[str] = [f"Q{index}" for index in range(500)]
+
+        def retrieve(chunk: List[str]) -> List[str]:
+            self._requests += 1
+            if "Q77" in chunk:
+                raise RelationSourceError(f"Request for relations of {len(chunk)} entities timed out")
+            return chunk
+
+        retry: BisectingRetry[str] = self._retry(retrieve)
+        relations: List[str] = retry.relations_for(entities)
+
+        self.assertEqual(["Q77"], self._quarantined)
+        self.assertEqual([entity for entity in entities if entity != "Q77"], sorted(relations, key=entities.index))
+        self.assertEqual(1, retry.statistics.dropped)
+        self.assertEqual(9, retry.statistics.splits)
+        self.assertEqual([], self._skipped)
+
+    def test_unavailable_chunk_is_skipped_without_splitting(self):
+        def retrieve(chunk: List[str]) -> List[str]:
+            self._requests += 1
+            if self._requests <= BisectingRetry.MAX_NUMBER_OF_RETRIES:
+                raise RelationSourceUnavailableError("Endpoint responded with status 503")
+            return chunk
+
+        retry: BisectingRetry[str] = self._retry(retrieve)
+        self.assertEqual([], retry.relations_for(["Q1", "Q2", "Q3"]))
+        self.assertEqual(["Q4", "Q5"], retry.relations_for(["Q4", "Q5"]))
+
+        self.assertEqual(["Q1", "Q2", "Q3"], self._skipped)
+        self.assertEqual([], self._quarantined)
+        self.assertEqual(0, retry.statistics.splits)
+
+    def test_unavailability_across_chunks_aborts(self):
+        def retrieve(chunk: List[str]) -> List[str]:
+            self._requests += 1
+            raise RelationSourceUnavailableError("Connection refused")
+
+        retry: BisectingRetry[str] = self._retry(retrieve)
+        for index in range(OutageDetector.MAX_UNAVAILABLE_CHUNKS - 1):
+            retry.relations_for([f"Q{index}"])
+        with self.assertRaises(RelationSourceUnavailableError):
+            retry.relations_for(["Q100", "Q101"])
+
+        self.assertEqual([], self._quarantined)
+        self.assertEqual(OutageDetector.MAX_UNAVAILABLE_CHUNKS * BisectingRetry.MAX_NUMBER_OF_RETRIES, self._requests)
+
+    def test_successful_chunk_resets_outage_detection(self):
+        def retrieve(chunk: List[str]) -> List[str]:
+            if chunk == ["Q0"]:
+                return chunk
+            raise RelationSourceUnavailableError("Endpoint responded with status 429")
+
+        outage_detector: OutageDetector = OutageDetector()
+        for chunk in [["Q1"], ["Q2"], ["Q0"], ["Q3"], ["Q4"]]:
+            self._retry(retrieve, outage_detector).relations_for(chunk)
+
+        self.assertEqual(["Q1", "Q2", "Q3", "Q4"], self._skipped)
+
+    def _retry(self, retrieve, outage_detector: Optional[OutageDetector] = None) -> BisectingRetry[str]:
+        return BisectingRetry(retrieve, self._quarantined.extend, outage_detector=outage_detector,
+                              skip=self._skipped.extend)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,34 @@
+import unittest
+from typing import List
+
+from Relation.relation import Relation
+from relation_sink.abstract_relation_sink import AbstractRelationSink
+from relation_sink.buffered_relation_sink import BufferedRelationSink
+
+
+class ListRelationSink(AbstractRelationSink):
+
+    def __init__(self):
+        super().__init__()
+        self.relations: List[Relation] = []
+
+    def _perform_persist(self, relations):
+        self.relations.extend(relations)
+
+
+class BufferedRelationSinkTest(unittest.TestCase):
+
+    def test_persist_after_close_raises(self):
+        relation_sink: ListRelationSink = ListRelationSink()
+        buffered_sink: BufferedRelationSink = BufferedRelationSink(relation_sink, batch_size=10)
+        buffered_sink.persist([Relation("Q1", "P31", "Q5")])
+        buffered_sink.close()
+
+        with self.assertRaises(ValueError):
+            buffered_sink.persist([Relation("Q2", "P31", "Q5")])
+        self.assertEqual([("Q1", "P31", "Q5")],
+                         [(relation.source, relation.name, relation.target) for relation in relation_sink.relations])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import tempfile
+import unittest
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from Cluster.cluster import Cluster
+from ClusterAnnotater.entity_plan import EntityPlan
+from EntityLinking.entity_linkings import EntityLinkings
+from Relation.cluster_aggregation_state import ClusterAggregationState
+from Relation.relation import Relation
+from Relation.relation_metrics import RelationMetrics
+from result_sink.abstract_result_sink import AbstractResultSink
+from result_sink.aggregation_state_result_sink import AggregationStateResultSink
+
+
+class _DiscardingResultSink(AbstractResultSink):
+
+    def _perform_persist(self, metrics):
+        pass
+
+
+class EntityPlanTest(unittest.TestCase):
+    CHUNK_SIZE = 3
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._state_file: Path = Path(self._directory.name, AggregationStateResultSink.STATE_FILE)
+        self._linkings: EntityLinkings = EntityLinkings()
+        for index in range(1, 13):
+            self._linkings.add(f"e{index}", f"Q{index}")
+
+        self._relations: Dict[str, List[Relation]] = {
+            f"Q{index}": [Relation(f"Q{index}", "P31", "Q5"), Relation(f"Q{index}", f"P{index % 3}", f"Q{index % 4}")]
+            for index in range(1, 13)}
+        # Q3 failed in the first run and contributed nothing
+        self._relations["Q3"] = []
+        self._requested: List[str] = []
+
+    def tearDown(self):
+        self._directory.cleanup()
+
+    def test_incremental_run_equals_full_recompute(self):
+        self._annotate({1: ["e1", "e2", "e3", "e4", "e8"], 2: ["e1", "e5", "e6", "e7", "e12"]})
+        # the relations of Q3 are known by now, they were never added to cluster 1
+        self._relations["Q3"] = [Relation("Q3", "P31", "Q5"), Relation("Q3", "P1", "Q7")]
+        clusters: Dict[int, List[str]] = {1: ["e2", "e4", "e8", "e9", "e9"], 2: ["e1", "e1", "e5", "e6", "e7"],
+                                          3: ["e10", "e11", "e3"]}
+
+        self._requested.clear()
+        incremental: List[RelationMetrics] = self._annotate(clusters, AggregationStateResultSink.load(self._state_file))
+        # removed entities and further occurrences of known entities are not fetched
+        self.assertEqual({"Q3", "Q9", "Q10", "Q11"}, set(self._requested))
+
+        recomputed: List[RelationMetrics] = self._annotate(clusters, {})
+        self.assertEqual([metrics.to_state_json_object() for metrics in recomputed],
+                         [metrics.to_state_json_object() for metrics in incremental])
+
+    def _annotate(self, members: Dict[int, List[str]],
+                  previous_states: Optional[Dict[int, ClusterAggregationState]] = None) -> List[RelationMetrics]:
+        clusters: List[Cluster] = []
+        for cluster_id, entities in members.items():
+            cluster: Cluster = Cluster(cluster_id)
+            cluster.entities = entities
+            clusters.append(cluster)
+
+        entity_plan: EntityPlan = EntityPlan(self._linkings, clusters,
+                                             {} if previous_states is None else previous_states)
+        chunk: List[str] = entity_plan.next_chunk(EntityPlanTest.CHUNK_SIZE)
+        while chunk:
+            self._requested.extend(chunk)
+            entity_plan.distribute([relation for entity in chunk for relation in self._relations[entity]])
+            chunk = entity_plan.next_chunk(EntityPlanTest.CHUNK_SIZE)
+
+        result_sink: AggregationStateResultSink = AggregationStateResultSink(_DiscardingResultSink(), self._linkings,
+                                                                             self._state_file)
+        for metrics in entity_plan.metrics:
+            result_sink.persist(metrics)
+        result_sink.close()
+        return entity_plan.metrics
+
+
+if __name__ == "__main__":
+    unittest.main()
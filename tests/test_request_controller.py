@@ -0,0 +1,90 @@
+import unittest
+from typing import List
+
+from RelationSource.async_sparql_client import SparqlRequestError
+from RelationSource.request_controller import RequestController, RequestControllerState
+from RelationSource.sparql_session import SparqlSession, SparqlTimeoutError
+from benchmark.fake_sparql_server import FakeSparqlServer
+from resources import constant
+
+
+class RequestControllerTest(unittest.TestCase):
+    MAX_CONCURRENT_REQUESTS = 4
+    TARGET_LATENCY = 0.2
+    MAX_REQUESTS_PER_PHASE = 50
+
+    def setUp(self):
+        # a chunk of about 300 entities takes the target latency while the endpoint is not slowed down
+        self._server: FakeSparqlServer = FakeSparqlServer(base_latency=0.005, latency_per_entity=0.0005,
+                                                          capacity=RequestControllerTest.MAX_CONCURRENT_REQUESTS,
+                                                          query_timeout=0.5).start()
+        self._session: SparqlSession = SparqlSession(self._server.url, RequestControllerTest.MAX_CONCURRENT_REQUESTS)
+        self._next_entity: int = 1
+
+    def tearDown(self):
+        self._session.close()
+        self._server.stop()
+
+    def test_chunk_size_and_concurrency_follow_slowdown(self):
+        controller: RequestController = RequestController(RequestControllerTest.MAX_CONCURRENT_REQUESTS, 50,
+                                                          RequestControllerTest.TARGET_LATENCY)
+
+        self._request_until(controller, lambda state: state.chunk_size >= 200)
+        normal: RequestControllerState = controller.state()
+        self.assertEqual(RequestControllerTest.MAX_CONCURRENT_REQUESTS, normal.concurrency_limit)
+
+        self._server.slowdown = 10.0
+        self._request_until(controller, lambda state: state.chunk_size <= 40)
+        slowed_down: RequestControllerState = controller.state()
+        self.assertLess(slowed_down.concurrency_limit, normal.concurrency_limit)
+
+        self._server.slowdown = 1.0
+        self._request_until(controller, lambda state: state.chunk_size >= 200 and
+                            state.concurrency_limit == RequestControllerTest.MAX_CONCURRENT_REQUESTS)
+
+    def test_failures_within_retry_scope_back_off_once(self):
+        self._server.timeout_rate = 1.0
+        self._server.query_timeout = 0.25
+        controller: RequestController = RequestController(RequestControllerTest.MAX_CONCURRENT_REQUESTS, 1000,
+                                                          RequestControllerTest.TARGET_LATENCY)
+
+        # the failed chunk and its failing parts while a bad entity is isolated
+        with controller.retry_scope():
+            for entities in [100, 50, 25, 12]:
+                self._request(controller, entities)
+        self.assertEqual(750, controller.chunk_size())
+        self.assertEqual(3, controller.state().concurrency_limit)
+
+        # independent chunks back off one after another
+        for entities in [100, 100]:
+            self._request(controller, entities)
+        self.assertEqual(421, controller.chunk_size())
+        self.assertEqual(1, controller.state().concurrency_limit)
+
+    def _request_until(self, controller: RequestController, condition) -> None:
+        for _ in range(RequestControllerTest.MAX_REQUESTS_PER_PHASE):
+            if condition(controller.state()):
+                return
+            self._request(controller, controller.chunk_size())
+
+        self.fail(f"Request controller did not adjust: {controller.state()}")
+
+    def _request(self, controller: RequestController, number_of_entities: int) -> None:
+        entities: List[str] = [f"Q{number}" for number in range(self._next_entity,
+                                                                self._next_entity + number_of_entities)]
+        self._next_entity += number_of_entities
+
+        with controller.request(len(entities)) as measurement:
+            try:
+                result_size: int = sum(1 for _ in self._session.relations(
+                    constant.named_entity_relations_sparql_query(entities)))
+            except SparqlTimeoutError:
+                measurement.fail(timed_out=True)
+            except SparqlRequestError:
+                measurement.fail()
+            else:
+                measurement.succeed(result_size)
+
+
+if __name__ == "__main__":
+    unittest.main()
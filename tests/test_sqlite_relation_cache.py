@@ -0,0 +1,35 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from Relation.relation import Relation
+from RelationCache.sqlite_relation_cache import SqliteRelationCache
+
+
+class SqliteRelationCacheTest(unittest.TestCase):
+
+    def setUp(self):
+        self._directory = tempfile.TemporaryDirectory()
+        self._cache: SqliteRelationCache = SqliteRelationCache(Path(self._directory.name, "relations.sqlite"),
+                                                               legacy_cache_file=None)
+
+    def tearDown(self):
+        self._cache.close()
+        self._directory.cleanup()
+
+    def test_relations_are_returned_in_insertion_order(self):
+        self._cache.add([Relation("Q1", "P31", target) for target in ("zeta", "alpha", "mid")])
+        self._cache.add([Relation("Q2", "P31", "Q5"), Relation("Q1", "P17", "Q183")])
+
+        self.assertEqual([("P31", "zeta"), ("P31", "alpha"), ("P31", "mid"), ("P17", "Q183")],
+                         [(relation.name, relation.target) for relation in self._cache.relations_for(["Q1"])["Q1"]])
+
+    def test_relations_are_stored_once(self):
+        self._cache.add([Relation("Q1", "P31", "Q5")])
+        self._cache.add([Relation("Q1", "P31", "Q5"), Relation("Q1", "P17", "Q183")])
+
+        self.assertEqual(2, len(self._cache.relations_for(["Q1"])["Q1"]))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,7 @@
 import argparse
 import os
 from pathlib import Path
-from typing import Optional
+from typing import List, Optional
 
 
 class ReadableFile(argparse.Action):
@@ -17,6 +17,20 @@ class ReadableFile(argparse.Action):
         setattr(parser_namespace, self.dest, values)
 
 
+class ReadableFiles(argparse.Action):
+
+    def __call__(self, parser: argparse.ArgumentParser, parser_namespace: object, values: List[Path],
+                 option_string: Optional[str] = None) -> None:
+        for value in values:
+            if not value.is_file():
+                raise argparse.ArgumentError(self, "{0} is not a valid file".format(value.absolute()))
+
+            if not os.access(str(value.absolute()), os.R_OK):
+                raise argparse.ArgumentError(self, "Permission denied to read from {0}".format(value.absolute()))
+
+        setattr(parser_namespace, self.dest, values)
+
+
 class WriteableDirectory(argparse.Action):
 
     def __call__(self, parser: argparse.ArgumentParser, parser_namespace: object, values: Path,
@@ -0,0 +1,213 @@
+import bisect
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+
+class Counter:
+
+    def __init__(self):
+        self._lock: threading.Lock = threading.Lock()
+        self.value: float = 0
+
+    def increment(self, amount: float) -> None:
+        with self._lock:
+            self.value += amount
+
+
+class Histogram:
+    DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 30.0, 60.0)
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        self._lock: threading.Lock = threading.Lock()
+        self.buckets: Tuple[float, ...] = buckets
+        # the last count belongs to the implicit +Inf bucket
+        self.counts: List[int] = [0] * (len(buckets) + 1)
+        self.sum: float = 0.0
+        self.count: int = 0
+
+    def observe(self, value: float) -> None:
+        index: int = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self.counts[index] += 1
+            self.sum += value
+            self.count += 1
+
+    def snapshot(self) -> Tuple[List[int], float, int]:
+        with self._lock:
+            return list(self.counts), self.sum, self.count
+
+    def merge(self, counts: List[int], total: float, count: int) -> None:
+        with self._lock:
+            self.counts = [own + other for own, other in zip(self.counts, counts)]
+            self.sum += total
+            self.count += count
+
+    def quantile(self, quantile: float) -> float:
+        # upper bound of the bucket containing the quantile, precise enough for a summary
+        counts, _, count = self.snapshot()
+        seen: int = 0
+        for index, bucket_count in enumerate(counts):
+            seen += bucket_count
+            if count > 0 and seen >= quantile * count:
+                return self.buckets[index] if index < len(self.buckets) else float("inf")
+        return 0.0
+
+
+class _Timer:
+
+    def __init__(self, histogram: Histogram):
+        self._histogram: Histogram = histogram
+        self._start_time: float = 0.0
+
+    def __enter__(self):
+        self._start_time = time.perf_counter()
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        self._histogram.observe(time.perf_counter() - self._start_time)
+
+
+class _NullTimer:
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exception_type, exception, traceback):
+        pass
+
+
+class MetricsRegistry:
+    PREFIX = "cluster_annotation_"
+
+    def __init__(self):
+        self.enabled: bool = False
+        self._lock: threading.Lock = threading.Lock()
+        self._counters: Dict[str, Counter] = {}
+        self._histograms: Dict[str, Histogram] = {}
+        self._null_timer: _NullTimer = _NullTimer()
+
+    def increment(self, name: str, amount: float = 1) -> None:
+        if not self.enabled:
+            return
+
+        counter: Optional[Counter] = self._counters.get(name)
+        if counter is None:
+            with self._lock:
+                counter = self._counters.setdefault(name, Counter())
+        counter.increment(amount)
+
+    def observe(self, name: str, value: float) -> None:
+        if not self.enabled:
+            return
+
+        self._histogram(name).observe(value)
+
+    def timer(self, name: str):
+        if not self.enabled:
+            return self._null_timer
+
+        return _Timer(self._histogram(name))
+
+    def _histogram(self, name: str) -> Histogram:
+        histogram: Optional[Histogram] = self._histograms.get(name)
+        if histogram is None:
+            with self._lock:
+                histogram = self._histograms.setdefault(name, Histogram())
+        return histogram
+
+    def drain(self) -> Dict[str, Dict[str, object]]:
+        # hands the metrics over to another registry, e.g. from a worker process to its parent
+        with self._lock:
+            counters, self._counters = self._counters, {}
+            histograms, self._histograms = self._histograms, {}
+
+        return {"counters": {name: counter.value for name, counter in counters.items()},
+                "histograms": {name: histogram.snapshot() for name, histogram in histograms.items()}}
+
+    def merge(self, drained: Dict[str, Dict[str, object]]) -> None:
+        if not self.enabled:
+            return
+
+        for name, value in drained["counters"].items():
+            self.increment(name, value)
+
+        for name, (counts, total, count) in drained["histograms"].items():
+            self._histogram(name).merge(counts, total, count)
+
+    def summary(self) -> str:
+        with self._lock:
+            counters: List[Tuple[str, Counter]] = sorted(self._counters.items())
+            histograms: List[Tuple[str, Histogram]] = sorted(self._histograms.items())
+
+        lines: List[str] = [f"{name}: {counter.value:g}" for name, counter in counters]
+        for name, histogram in histograms:
+            _, total, count = histogram.snapshot()
+            lines.append(f"{name}: {count} observations, {total:.3f} s in total, "
+                         f"p50 <= {histogram.quantile(0.5):g} s, p95 <= {histogram.quantile(0.95):g} s")
+        return "\n".join(lines)
+
+    def to_prometheus(self) -> str:
+        with self._lock:
+            counters: List[Tuple[str, Counter]] = sorted(self._counters.items())
+            histograms: List[Tuple[str, Histogram]] = sorted(self._histograms.items())
+
+        lines: List[str] = []
+        for name, counter in counters:
+            lines.append(f"# TYPE {MetricsRegistry.PREFIX}{name} counter")
+            lines.append(f"{MetricsRegistry.PREFIX}{name} {counter.value:g}")
+
+        for name, histogram in histograms:
+            counts, total, count = histogram.snapshot()
+            lines.append(f"# TYPE {MetricsRegistry.PREFIX}{name} histogram")
+            cumulative_count: int = 0
+            for bucket, bucket_count in zip(histogram.buckets + (float("inf"),), counts):
+                cumulative_count += bucket_count
+                bound: str = "+Inf" if bucket == float("inf") else f"{bucket:g}"
+                lines.append(f'{MetricsRegistry.PREFIX}{name}_bucket{{le="{bound}"}} {cumulative_count}')
+            lines.append(f"{MetricsRegistry.PREFIX}{name}_sum {total:g}")
+            lines.append(f"{MetricsRegistry.PREFIX}{name}_count {count}")
+
+        return "\n".join(lines) + "\n"
+
+    def write_prometheus(self, metrics_file: Path) -> None:
+        # replaced atomically, so a scraper never reads a partially written file
+        temporary_file: Path = metrics_file.with_name(metrics_file.name + ".tmp")
+        temporary_file.write_text(self.to_prometheus())
+        os.replace(str(temporary_file), str(metrics_file))
+
+
+class MetricsReporter:
+
+    def __init__(self, registry: MetricsRegistry, interval: Optional[float], metrics_file: Optional[Path]):
+        self._registry: MetricsRegistry = registry
+        self._interval: Optional[float] = interval
+        self._metrics_file: Optional[Path] = metrics_file
+        self._stopped: threading.Event = threading.Event()
+        self._reporter: threading.Thread = threading.Thread(target=self._report_periodically, name="metrics",
+                                                            daemon=True)
+
+    def start(self) -> None:
+        if self._interval is not None:
+            self._reporter.start()
+
+    def stop(self) -> None:
+        self._stopped.set()
+        if self._reporter.is_alive():
+            self._reporter.join()
+        self._report()
+
+    def _report_periodically(self) -> None:
+        while not self._stopped.wait(self._interval):
+            self._report()
+
+    def _report(self) -> None:
+        logging.info(f"Metrics:\n{self._registry.summary()}")
+        if self._metrics_file is not None:
+            self._registry.write_prometheus(self._metrics_file)
+
+
+metrics: MetricsRegistry = MetricsRegistry()
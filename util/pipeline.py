@@ -0,0 +1,182 @@
+import logging
+import queue
+import threading
+import time
+from typing import Any, Callable, List, Optional
+
+from util.metrics import metrics
+
+
+class StageStatistics:
+
+    def __init__(self, name: str, workers: int):
+        self._lock: threading.Lock = threading.Lock()
+        self.name: str = name
+        self.workers: int = workers
+        self.items: int = 0
+        self.busy_seconds: float = 0.0
+        self.blocked_seconds: float = 0.0
+        self.queue_depth_total: int = 0
+        self.queue_depth_samples: int = 0
+        self.max_queue_depth: int = 0
+
+    def record_item(self, busy_seconds: float, blocked_seconds: float) -> None:
+        with self._lock:
+            self.items += 1
+            self.busy_seconds += busy_seconds
+            self.blocked_seconds += blocked_seconds
+
+    def sample_queue_depth(self, depth: int) -> None:
+        with self._lock:
+            self.queue_depth_total += depth
+            self.queue_depth_samples += 1
+            self.max_queue_depth = max(self.max_queue_depth, depth)
+
+    def format(self, seconds: float) -> str:
+        with self._lock:
+            utilization: float = self.busy_seconds / (self.workers * seconds) if seconds > 0 else 0.0
+            average_queue_depth: float = self.queue_depth_total / self.queue_depth_samples \
+                if self.queue_depth_samples > 0 else 0.0
+            return f"{self.name}: {self.items} items by {self.workers} workers, {self.busy_seconds:.3f} s busy " \
+                   f"({utilization:.0%} utilized), {self.blocked_seconds:.3f} s blocked by the next stage, " \
+                   f"queue depth {average_queue_depth:.1f} on average and {self.max_queue_depth} at most"
+
+
+class PipelineStage:
+
+    def __init__(self, name: str, handler_factory: Callable[[], Callable[[Any], List[Any]]], workers: int,
+                 queue_size: int):
+        self.name: str = name
+        # every worker creates its own handler, so handlers may keep per-thread state
+        self._handler_factory: Callable[[], Callable[[Any], List[Any]]] = handler_factory
+        self._queue: queue.Queue = queue.Queue(maxsize=queue_size)
+        self._workers: List[threading.Thread] = [
+            threading.Thread(target=self._work, name=f"{name}-{i}", daemon=True) for i in range(workers)]
+        self._lock: threading.Lock = threading.Lock()
+        self._active_workers: int = workers
+        self._next_stage: Optional[PipelineStage] = None
+        self._failed: threading.Event = threading.Event()
+        self.error: Optional[Exception] = None
+        self.statistics: StageStatistics = StageStatistics(name, workers)
+
+    def connect(self, next_stage: Optional["PipelineStage"], failed: threading.Event) -> None:
+        self._next_stage = next_stage
+        self._failed = failed
+
+    def start(self) -> None:
+        for worker in self._workers:
+            worker.start()
+
+    def put(self, item: Any) -> None:
+        # blocks while the queue is full, which throttles every stage in front of this one
+        self._queue.put(item)
+
+    def close(self) -> None:
+        for _ in self._workers:
+            self._queue.put(None)
+
+    def join(self) -> None:
+        for worker in self._workers:
+            worker.join()
+
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def _work(self) -> None:
+        handler: Optional[Callable[[Any], List[Any]]] = None
+        try:
+            handler = self._handler_factory()
+        except Exception as error:
+            self._fail(error)
+
+        while True:
+            item: Any = self._queue.get()
+            if item is None:
+                break
+
+            if self._failed.is_set():
+                # items are still taken from the queue, so that no stage in front of this one blocks forever
+                continue
+
+            try:
+                self._process(handler, item)
+            except Exception as error:
+                self._fail(error)
+
+        with self._lock:
+            self._active_workers -= 1
+            last_worker: bool = self._active_workers == 0
+
+        if last_worker and self._next_stage is not None:
+            self._next_stage.close()
+
+    def _process(self, handler: Callable[[Any], List[Any]], item: Any) -> None:
+        start_time: float = time.perf_counter()
+        with metrics.timer(f"pipeline_{self.name}_seconds"):
+            results: List[Any] = handler(item)
+        busy_seconds: float = time.perf_counter() - start_time
+
+        start_time = time.perf_counter()
+        if self._next_stage is not None:
+            for result in results:
+                self._next_stage.put(result)
+        self.statistics.record_item(busy_seconds, time.perf_counter() - start_time)
+
+    def _fail(self, error: Exception) -> None:
+        logging.exception(f"Pipeline stage {self.name} failed")
+        with self._lock:
+            if self.error is None:
+                self.error = error
+        self._failed.set()
+
+
+class Pipeline:
+    SAMPLING_INTERVAL = 0.1
+
+    def __init__(self, stages: List[PipelineStage]):
+        self._stages: List[PipelineStage] = stages
+        self._failed: threading.Event = threading.Event()
+        for stage, next_stage in zip(stages, stages[1:] + [None]):
+            stage.connect(next_stage, self._failed)
+
+        self._stopped: threading.Event = threading.Event()
+        self._monitor: threading.Thread = threading.Thread(target=self._sample_queue_depths, name="pipeline-monitor",
+                                                           daemon=True)
+        self._start_time: float = 0.0
+
+    def start(self) -> None:
+        self._start_time = time.perf_counter()
+        for stage in self._stages:
+            stage.start()
+        self._monitor.start()
+
+    def put(self, item: Any) -> bool:
+        if self._failed.is_set():
+            return False
+
+        self._stages[0].put(item)
+        return True
+
+    def join(self) -> None:
+        # closing the first stage shuts down every other stage once its predecessor drained
+        self._stages[0].close()
+        for stage in self._stages:
+            stage.join()
+
+        self._stopped.set()
+        self._monitor.join()
+        self._log_statistics()
+
+        for stage in self._stages:
+            if stage.error is not None:
+                raise stage.error
+
+    def _sample_queue_depths(self) -> None:
+        while not self._stopped.wait(Pipeline.SAMPLING_INTERVAL):
+            for stage in self._stages:
+                stage.statistics.sample_queue_depth(stage.queue_depth())
+
+    def _log_statistics(self) -> None:
+        seconds: float = time.perf_counter() - self._start_time
+        logging.info(f"Pipeline finished after {seconds:.3f} s\n" +
+                     "\n".join(stage.statistics.format(seconds) for stage in self._stages))
@@ -0,0 +1,19 @@
+import threading
+import time
+
+
+class RateLimiter:
+
+    def __init__(self, requests_per_second: float):
+        self._interval: float = 1.0 / requests_per_second
+        self._lock: threading.Lock = threading.Lock()
+        self._next_request_time: float = time.monotonic()
+
+    def acquire(self) -> None:
+        # reserves the next free slot and sleeps outside of the lock until it has come
+        with self._lock:
+            now: float = time.monotonic()
+            request_time: float = max(now, self._next_request_time)
+            self._next_request_time = request_time + self._interval
+
+        time.sleep(request_time - now)
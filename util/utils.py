@@ -1,11 +1,11 @@
-import logging
-import time
+import threading
+from typing import Iterable, Iterator, TypeVar
 
+T = TypeVar("T")
 
-def measure(comment, method, *args):
-    start_time = time.perf_counter()
-    result = method(*args)
-    end_time = time.perf_counter()
-    logging.info(f"{comment} executed in {end_time - start_time} s")
 
-    return result
+def bounded(iterable: Iterable[T], semaphore: threading.BoundedSemaphore) -> Iterator[T]:
+    # the consumer releases the semaphore for every processed item
+    for item in iterable:
+        semaphore.acquire()
+        yield item